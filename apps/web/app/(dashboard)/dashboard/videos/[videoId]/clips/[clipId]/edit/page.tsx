@@ -4,10 +4,10 @@ import Link from 'next/link';
 import { prisma } from '@clipmaker/db';
 import { generateDownloadUrl } from '@clipmaker/s3';
 import { ClipEditor } from './clip-editor';
+import { resolveClipSubtitles } from '@/lib/clip-subtitles';
 import type { ClipData } from '@/lib/stores/clip-editor-store';
 import type {
   ViralityScore,
-  SubtitleSegment,
   CTA,
   ClipFormat,
   ClipStatus,
@@ -49,7 +49,10 @@ export default async function ClipEditorPage({ params }: PageProps) {
     notFound();
   }
 
-  const videoSourceUrl = await generateDownloadUrl(clip.video.filePath);
+  const [videoSourceUrl, subtitleSegments] = await Promise.all([
+    generateDownloadUrl(clip.video.filePath),
+    resolveClipSubtitles(prisma, clip),
+  ]);
 
   const clipData: ClipData = {
     id: clip.id,
@@ -60,7 +63,7 @@ export default async function ClipEditorPage({ params }: PageProps) {
     endTime: clip.endTime,
     duration: clip.duration,
     format: clip.format as ClipFormat,
-    subtitleSegments: (clip.subtitleSegments as SubtitleSegment[]) ?? [],
+    subtitleSegments,
     cta: (clip.cta as CTA) ?? null,
     viralityScore: clip.viralityScore as ViralityScore,
     status: clip.status as ClipStatus,
@@ -5,6 +5,8 @@ import { trpc } from '@/lib/trpc/client';
 import { SegmentEditor } from './segment-editor';
 import type { TranscriptSegment } from '@clipmaker/types';
 
+const SEGMENT_PAGE_SIZE = 200;
+
 type TranscriptViewerProps = {
   videoId: string;
   videoStatus: string;
@@ -36,22 +38,36 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
   const containerRef = useRef<HTMLDivElement>(null);
   const saveTimerRef = useRef<ReturnType<typeof setTimeout>>(undefined);
 
+  // Paged loading: long transcripts are fetched SEGMENT_PAGE_SIZE segments at a time
   const {
     data,
     isLoading,
     error,
-  } = trpc.transcript.getSegments.useQuery(
-    { videoId },
-    { enabled: videoStatus === 'analyzing' || videoStatus === 'completed' },
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = trpc.transcript.getSegmentsPage.useInfiniteQuery(
+    { videoId, limit: SEGMENT_PAGE_SIZE },
+    {
+      enabled: videoStatus === 'analyzing' || videoStatus === 'completed',
+      getNextPageParam: (lastPage) => lastPage.nextCursor,
+    },
+  );
+
+  // Pages are contiguous from offset 0, so the flat index is the global segment index
+  const segments = useMemo(
+    () => data?.pages.flatMap((page) => page.segments) ?? [],
+    [data],
   );
+  const firstPage = data?.pages[0];
 
   const updateMutation = trpc.transcript.updateSegments.useMutation();
   const utils = trpc.useUtils();
 
   // Find active segment index via binary search (memoized)
   const activeIndex = useMemo(
-    () => (data ? findActiveSegment(data.segments, currentTime) : -1),
-    [data, currentTime],
+    () => findActiveSegment(segments, currentTime),
+    [segments, currentTime],
   );
 
   // Auto-scroll active segment into view
@@ -91,7 +107,7 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
       await updateMutation.mutateAsync({ videoId, edits });
       setPendingEdits(new Map());
       setSaveStatus('success');
-      await utils.transcript.getSegments.invalidate({ videoId });
+      await utils.transcript.getSegmentsPage.invalidate({ videoId });
       saveTimerRef.current = setTimeout(() => setSaveStatus('idle'), 2000);
     } catch {
       setSaveStatus('error');
@@ -138,7 +154,7 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
     );
   }
 
-  if (error || !data) {
+  if (error || !firstPage) {
     return (
       <TranscriptShell>
         <p className="text-gray-500">Транскрипт ещё не готов</p>
@@ -156,7 +172,7 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
         <div className="flex items-center gap-3">
           <h2 className="font-semibold">Субтитры</h2>
           <span className="text-xs text-gray-400">
-            {data.segments.length} сегментов &middot; {data.sttModel}
+            {firstPage.total} сегментов &middot; {firstPage.sttModel}
           </span>
         </div>
         <svg
@@ -195,7 +211,7 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
           )}
 
           <div ref={containerRef} className="max-h-[500px] overflow-y-auto divide-y">
-            {data.segments.map((segment, i) => (
+            {segments.map((segment, i) => (
               <SegmentEditor
                 key={`${segment.start}-${i}`}
                 segment={segment}
@@ -204,6 +220,20 @@ export function TranscriptViewer({ videoId, videoStatus, currentTime = 0 }: Tran
                 onSave={handleSegmentSave}
               />
             ))}
+            {hasNextPage && (
+              <div className="flex justify-center py-3">
+                <button
+                  type="button"
+                  onClick={() => fetchNextPage()}
+                  disabled={isFetchingNextPage}
+                  className="text-sm px-3 py-1 rounded border text-gray-600 hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+                >
+                  {isFetchingNextPage
+                    ? 'Загрузка...'
+                    : `Загрузить ещё (${segments.length} из ${firstPage.total})`}
+                </button>
+              </div>
+            )}
           </div>
         </>
       )}
@@ -0,0 +1,46 @@
+import type { PrismaClient } from '@clipmaker/db';
+import type { SubtitleSegment } from '@clipmaker/types';
+
+type ClipSubtitleSource = {
+  videoId: string;
+  startTime: number;
+  endTime: number;
+  subtitleSegments: unknown;
+};
+
+/**
+ * Returns a clip's subtitle segments, relative to the clip start.
+ *
+ * Clips created by the LLM worker store `subtitleSegments = null`, meaning
+ * "the transcript range [startTime, endTime]" -- the text lives only in the
+ * transcript. Those are read from transcript_segments with a range scan on
+ * (transcript_id, start_time). Because the reference is live, a transcript
+ * edit also changes the subtitles of every clip the user has not edited
+ * (intended: fixing a misheard word fixes it everywhere). Already rendered
+ * files keep their burned-in text until the clip is re-rendered. Clips whose
+ * subtitles were edited store their own array, which is returned as-is.
+ */
+export async function resolveClipSubtitles(
+  prisma: PrismaClient,
+  clip: ClipSubtitleSource,
+): Promise<SubtitleSegment[]> {
+  if (Array.isArray(clip.subtitleSegments)) {
+    return clip.subtitleSegments as SubtitleSegment[];
+  }
+
+  const rows = await prisma.transcriptSegment.findMany({
+    where: {
+      transcript: { videoId: clip.videoId },
+      startTime: { gte: clip.startTime, lte: clip.endTime },
+      endTime: { lte: clip.endTime },
+    },
+    orderBy: { startTime: 'asc' },
+    select: { startTime: true, endTime: true, text: true },
+  });
+
+  return rows.map((s) => ({
+    start: s.startTime - clip.startTime,
+    end: s.endTime - clip.startTime,
+    text: s.text,
+  }));
+}
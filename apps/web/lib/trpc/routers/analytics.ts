@@ -1,67 +1,87 @@
 import { z } from 'zod';
+import { TRPCError } from '@trpc/server';
+import type { PrismaClient } from '@clipmaker/db';
 import { router, protectedProcedure } from '../trpc';
 
+/**
+ * Aggregates are read from the daily rollup tables (analytics_user_daily /
+ * analytics_team_daily), maintained by the publish and stats-collector workers.
+ * Cost scales with days x platforms, not with the number of publications.
+ */
+const scopeSchema = z.enum(['user', 'team']).default('user');
+
+type RollupOwner = { userId: string } | { teamId: string };
+
+async function resolveRollupOwner(
+  prisma: PrismaClient,
+  userId: string,
+  scope: 'user' | 'team',
+): Promise<RollupOwner> {
+  if (scope === 'user') return { userId };
+
+  const user = await prisma.user.findUnique({
+    where: { id: userId },
+    select: { teamId: true },
+  });
+  if (!user?.teamId) {
+    throw new TRPCError({ code: 'NOT_FOUND', message: 'У вас нет команды' });
+  }
+  return { teamId: user.teamId };
+}
+
+const SUM_FIELDS = { views: true, likes: true, shares: true, published: true } as const;
+
 export const analyticsRouter = router({
   /**
    * Aggregate overview: total views, likes, shares, published count
    */
-  overview: protectedProcedure.query(async ({ ctx }) => {
-    const userId = ctx.session.user.id;
-
-    const result = await ctx.prisma.publication.aggregate({
-      where: {
-        status: 'published',
-        clip: { userId },
-      },
-      _sum: {
-        views: true,
-        likes: true,
-        shares: true,
-      },
-      _count: true,
-    });
-
-    return {
-      totalViews: result._sum.views ?? 0,
-      totalLikes: result._sum.likes ?? 0,
-      totalShares: result._sum.shares ?? 0,
-      publishedCount: result._count,
-    };
-  }),
+  overview: protectedProcedure
+    .input(z.object({ scope: scopeSchema }).optional())
+    .query(async ({ ctx, input }) => {
+      const owner = await resolveRollupOwner(ctx.prisma, ctx.session.user.id, input?.scope ?? 'user');
+
+      const result = 'teamId' in owner
+        ? await ctx.prisma.analyticsTeamDaily.aggregate({ where: owner, _sum: SUM_FIELDS })
+        : await ctx.prisma.analyticsUserDaily.aggregate({ where: owner, _sum: SUM_FIELDS });
+
+      return {
+        totalViews: result._sum.views ?? 0,
+        totalLikes: result._sum.likes ?? 0,
+        totalShares: result._sum.shares ?? 0,
+        publishedCount: result._sum.published ?? 0,
+      };
+    }),
 
   /**
    * Per-platform aggregation: publication count, views, likes, shares per platform
    */
-  byPlatform: protectedProcedure.query(async ({ ctx }) => {
-    const userId = ctx.session.user.id;
-
-    const groups = await ctx.prisma.publication.groupBy({
-      by: ['platform'],
-      where: {
-        status: 'published',
-        clip: { userId },
-      },
-      _sum: {
-        views: true,
-        likes: true,
-        shares: true,
-      },
-      _count: true,
-      orderBy: {
-        _sum: {
-          views: 'desc',
-        },
-      },
-    });
-
-    return groups.map((g) => ({
-      platform: g.platform,
-      publicationCount: g._count,
-      totalViews: g._sum.views ?? 0,
-      totalLikes: g._sum.likes ?? 0,
-      totalShares: g._sum.shares ?? 0,
-    }));
-  }),
+  byPlatform: protectedProcedure
+    .input(z.object({ scope: scopeSchema }).optional())
+    .query(async ({ ctx, input }) => {
+      const owner = await resolveRollupOwner(ctx.prisma, ctx.session.user.id, input?.scope ?? 'user');
+
+      const groups = 'teamId' in owner
+        ? await ctx.prisma.analyticsTeamDaily.groupBy({
+            by: ['platform'],
+            where: owner,
+            _sum: SUM_FIELDS,
+            orderBy: { _sum: { views: 'desc' } },
+          })
+        : await ctx.prisma.analyticsUserDaily.groupBy({
+            by: ['platform'],
+            where: owner,
+            _sum: SUM_FIELDS,
+            orderBy: { _sum: { views: 'desc' } },
+          });
+
+      return groups.map((g) => ({
+        platform: g.platform,
+        publicationCount: g._sum.published ?? 0,
+        totalViews: g._sum.views ?? 0,
+        totalLikes: g._sum.likes ?? 0,
+        totalShares: g._sum.shares ?? 0,
+      }));
+    }),
 
   /**
    * Top clips by views
@@ -78,10 +98,11 @@ export const analyticsRouter = router({
       const userId = ctx.session.user.id;
       const limit = input?.limit ?? 10;
 
+      // Served by the (user_id, status, views DESC) index: reads `limit` rows
       const publications = await ctx.prisma.publication.findMany({
         where: {
+          userId,
           status: 'published',
-          clip: { userId },
         },
         orderBy: {
           views: 'desc',
@@ -118,66 +139,51 @@ export const analyticsRouter = router({
     }),
 
   /**
-   * Timeline: daily views over the last N days
+   * Timeline: views gained per day over the last N days (UTC days)
    */
   timeline: protectedProcedure
     .input(
       z
         .object({
           days: z.number().int().min(7).max(90).default(30),
+          scope: scopeSchema,
         })
         .optional(),
     )
     .query(async ({ ctx, input }) => {
-      const userId = ctx.session.user.id;
       const days = input?.days ?? 30;
-
-      const endDate = new Date();
-      endDate.setHours(23, 59, 59, 999);
-      const startDate = new Date();
-      startDate.setDate(startDate.getDate() - days + 1);
-      startDate.setHours(0, 0, 0, 0);
-
-      const publications = await ctx.prisma.publication.findMany({
-        where: {
-          status: 'published',
-          clip: { userId },
-          publishedAt: {
-            gte: startDate,
-            lte: endDate,
-          },
-        },
-        select: {
-          publishedAt: true,
-          views: true,
-        },
-      });
-
-      // Aggregate views by day
-      const byDay = new Map<string, number>();
+      const owner = await resolveRollupOwner(ctx.prisma, ctx.session.user.id, input?.scope ?? 'user');
+
+      const now = new Date();
+      const startDate = new Date(Date.UTC(now.getUTCFullYear(), now.getUTCMonth(), now.getUTCDate() - days + 1));
+
+      const rows = 'teamId' in owner
+        ? await ctx.prisma.analyticsTeamDaily.groupBy({
+            by: ['day'],
+            where: { teamId: owner.teamId, day: { gte: startDate } },
+            _sum: { views: true },
+          })
+        : await ctx.prisma.analyticsUserDaily.groupBy({
+            by: ['day'],
+            where: { userId: owner.userId, day: { gte: startDate } },
+            _sum: { views: true },
+          });
 
       // Initialize all days with 0
+      const byDay = new Map<string, number>();
       for (let i = 0; i < days; i++) {
         const d = new Date(startDate);
-        d.setDate(d.getDate() + i);
-        const key = d.toISOString().slice(0, 10);
-        byDay.set(key, 0);
+        d.setUTCDate(d.getUTCDate() + i);
+        byDay.set(d.toISOString().slice(0, 10), 0);
       }
 
-      // Sum views per day
-      for (const pub of publications) {
-        if (!pub.publishedAt) continue;
-        const key = pub.publishedAt.toISOString().slice(0, 10);
+      for (const row of rows) {
+        const key = row.day.toISOString().slice(0, 10);
         if (byDay.has(key)) {
-          byDay.set(key, (byDay.get(key) ?? 0) + pub.views);
+          byDay.set(key, row._sum.views ?? 0);
         }
       }
 
-      // Convert to sorted array
-      const timeline = Array.from(byDay.entries())
-        .sort(([a], [b]) => a.localeCompare(b))
-        .map(([date, views]) => ({ date, views }));
-
-      return timeline;
+      return Array.from(byDay.entries()).map(([date, views]) => ({ date, views }));
     }),
 });
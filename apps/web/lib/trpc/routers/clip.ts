@@ -8,6 +8,7 @@ import { QUEUE_NAMES, DEFAULT_JOB_OPTIONS } from '@clipmaker/queue';
 import { createQueue } from '@clipmaker/queue/src/queues';
 import { PLANS } from '@clipmaker/types';
 import type { PlanId, PublishJobData } from '@clipmaker/types';
+import { resolveClipSubtitles } from '@/lib/clip-subtitles';
 
 // M5: Select only safe fields to avoid exposing internal paths
 const CLIP_PUBLIC_SELECT = {
@@ -42,6 +43,12 @@ const CLIP_PUBLIC_SELECT = {
   },
 } as const;
 
+// Clip lists don't show subtitles; skip them to keep list payloads small
+const CLIP_LIST_SELECT = {
+  ...CLIP_PUBLIC_SELECT,
+  subtitleSegments: false,
+} as const;
+
 /** Max file size per platform (bytes) */
 const PLATFORM_FILE_SIZE_LIMITS: Record<string, number> = {
   vk: 256 * 1024 * 1024,       // 256 MB
@@ -69,7 +76,7 @@ export const clipRouter = router({
 
       const clips = await ctx.prisma.clip.findMany({
         where: { videoId: input.videoId },
-        select: CLIP_PUBLIC_SELECT,
+        select: CLIP_LIST_SELECT,
         take: 50,
       });
 
@@ -92,7 +99,7 @@ export const clipRouter = router({
       });
 
       if (!clip) throw new TRPCError({ code: 'NOT_FOUND', message: 'Клип не найден' });
-      return clip;
+      return { ...clip, subtitleSegments: await resolveClipSubtitles(ctx.prisma, clip) };
     }),
 
   update: protectedProcedure
@@ -158,7 +165,8 @@ export const clipRouter = router({
             startTime: fullClip.startTime,
             endTime: fullClip.endTime,
             format: fullClip.format,
-            subtitleSegments: fullClip.subtitleSegments,
+            // Transcript-range clips pick up the subtitles of the new time range
+            subtitleSegments: await resolveClipSubtitles(ctx.prisma, fullClip),
             cta: fullClip.cta,
             watermark: renderUser?.planId === 'free',
           }, DEFAULT_JOB_OPTIONS);
@@ -340,7 +348,7 @@ export const clipRouter = router({
               startTime: fullClip.startTime,
               endTime: fullClip.endTime,
               format: fullClip.format,
-              subtitleSegments: fullClip.subtitleSegments,
+              subtitleSegments: await resolveClipSubtitles(ctx.prisma, fullClip),
               cta: fullClip.cta,
               watermark: renderUser?.planId === 'free',
             },
@@ -349,7 +357,10 @@ export const clipRouter = router({
         }
       }
 
-      return updatedClip;
+      return {
+        ...updatedClip,
+        subtitleSegments: await resolveClipSubtitles(ctx.prisma, updatedClip),
+      };
     }),
 
   publish: protectedProcedure
@@ -477,6 +488,7 @@ export const clipRouter = router({
           ctx.prisma.publication.create({
             data: {
               clipId: clip.id,
+              userId: clip.userId,
               platform: platform as 'vk' | 'rutube' | 'dzen' | 'telegram',
               status: input.scheduleAt ? 'scheduled' : 'publishing',
               scheduledAt: input.scheduleAt ? new Date(input.scheduleAt) : null,
@@ -2,7 +2,10 @@ import { z } from 'zod';
 import { router, protectedProcedure } from '../trpc';
 import { TRPCError } from '@trpc/server';
 import { checkRateLimit } from '@/lib/auth/rate-limit';
-import type { TranscriptSegment } from '@clipmaker/types';
+import type { TranscriptSegment, TranscriptSegmentPage } from '@clipmaker/types';
+
+const SEGMENT_PAGE_DEFAULT = 200;
+const SEGMENT_PAGE_MAX = 500;
 
 /** Strip HTML tags from user-edited subtitle text (defense-in-depth) */
 function stripHtml(text: string): string {
@@ -36,6 +39,67 @@ export const transcriptRouter = router({
       };
     }),
 
+  /**
+   * One page of transcript segments, read from transcript_segments by primary
+   * key range (transcript_id, idx), so a multi-hour transcript is never loaded
+   * or serialized whole. `offset` is the global segment index used by
+   * updateSegments edits.
+   */
+  getSegmentsPage: protectedProcedure
+    .input(
+      z.object({
+        videoId: z.string().uuid(),
+        cursor: z.number().int().min(0).nullish(),
+        limit: z.number().int().min(1).max(SEGMENT_PAGE_MAX).default(SEGMENT_PAGE_DEFAULT),
+      }),
+    )
+    .query(async ({ ctx, input }) => {
+      const userId = ctx.session.user.id;
+      const video = await ctx.prisma.video.findFirst({
+        where: { id: input.videoId, userId },
+        select: { id: true },
+      });
+      if (!video) {
+        throw new TRPCError({ code: 'NOT_FOUND', message: 'Видео не найдено' });
+      }
+
+      const transcript = await ctx.prisma.transcript.findUnique({
+        where: { videoId: input.videoId },
+        select: {
+          id: true,
+          language: true,
+          sttModel: true,
+          sttProvider: true,
+          _count: { select: { segmentRows: true } },
+        },
+      });
+      if (!transcript) {
+        throw new TRPCError({ code: 'NOT_FOUND', message: 'Транскрипт ещё не готов' });
+      }
+
+      const offset = input.cursor ?? 0;
+      const rows = await ctx.prisma.transcriptSegment.findMany({
+        where: { transcriptId: transcript.id, idx: { gte: offset, lt: offset + input.limit } },
+        orderBy: { idx: 'asc' },
+        select: { startTime: true, endTime: true, text: true, confidence: true },
+      });
+
+      const total = transcript._count.segmentRows;
+      const end = offset + rows.length;
+      const page: TranscriptSegmentPage = {
+        segments: rows.map((r) => ({ start: r.startTime, end: r.endTime, text: r.text, confidence: r.confidence })),
+        offset,
+        total,
+        nextCursor: end < total ? end : null,
+      };
+      return {
+        ...page,
+        language: transcript.language,
+        sttModel: transcript.sttModel,
+        sttProvider: transcript.sttProvider,
+      };
+    }),
+
   updateSegments: protectedProcedure
     .input(
       z.object({
@@ -87,10 +151,20 @@ export const transcriptRouter = router({
       // ~2.5 tokens per word for Russian text (heuristic for LLM routing, not billing)
       const tokenCount = Math.ceil(wordCount * 2.5);
 
-      await ctx.prisma.transcript.update({
-        where: { videoId: input.videoId },
-        data: { segments, fullText, tokenCount },
-      });
+      // Edits also change the subtitles of clips that reference the transcript
+      // range (see resolveClipSubtitles)
+      await ctx.prisma.$transaction([
+        ctx.prisma.transcript.update({
+          where: { videoId: input.videoId },
+          data: { segments, fullText, tokenCount },
+        }),
+        ...input.edits.map((edit) =>
+          ctx.prisma.transcriptSegment.update({
+            where: { transcriptId_idx: { transcriptId: transcript.id, idx: edit.index } },
+            data: { text: segments[edit.index]!.text },
+          }),
+        ),
+      ]);
 
       return { success: true as const };
     }),
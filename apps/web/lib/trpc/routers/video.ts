@@ -257,6 +257,7 @@ export const videoRouter = router({
         filePath: video.filePath,
         strategy,
         language: 'ru',
+        reprocess: true,
       }, DEFAULT_JOB_OPTIONS);
 
       return { status: 'transcribing' as const };
@@ -361,6 +362,7 @@ export const videoRouter = router({
           videoId: video.id,
           task: 'moment_selection' as const,
           strategy,
+          reprocess: true,
           input: {
             fullText: video.transcript!.fullText,
             tokenCount: video.transcript!.tokenCount,
@@ -389,6 +391,7 @@ export const videoRouter = router({
         filePath: video.filePath,
         strategy,
         language: 'ru',
+        reprocess: true,
       }, DEFAULT_JOB_OPTIONS);
 
       return { status: 'reprocessing' as const, stage: 'transcribing' as const };
@@ -0,0 +1,31 @@
+import { describe, it, expect } from 'vitest';
+import { targetConcurrency, type ConcurrencyProfile } from '../lib/adaptive-concurrency';
+
+const GB = 1024 * 1024 * 1024;
+
+const render: ConcurrencyProfile = { threadsPerJob: 2, memoryPerJobBytes: 1 * GB, maxConcurrency: 8 };
+
+describe('targetConcurrency', () => {
+  it('fills the cores minus one reserved for the event loop', () => {
+    expect(targetConcurrency({ cpus: 9, availableMemoryBytes: 64 * GB, loadAvg1: 0 }, 0, render)).toBe(4);
+  });
+
+  it('is bounded by memory, counting memory held by running jobs as available', () => {
+    const host = { cpus: 16, availableMemoryBytes: 2 * GB, loadAvg1: null };
+    expect(targetConcurrency(host, 0, render)).toBe(2);
+    expect(targetConcurrency(host, 3, render)).toBe(5);
+  });
+
+  it('backs off for load that our own jobs do not explain', () => {
+    const host = { cpus: 9, availableMemoryBytes: 64 * GB };
+    // 2 jobs x 2 threads = 4 of our own; 4 more from elsewhere leaves 4 cores
+    expect(targetConcurrency({ ...host, loadAvg1: 8 }, 2, render)).toBe(2);
+    // Fully explained by our own jobs: keep the full core budget
+    expect(targetConcurrency({ ...host, loadAvg1: 8 }, 4, render)).toBe(4);
+  });
+
+  it('respects maxConcurrency and never drops below one', () => {
+    expect(targetConcurrency({ cpus: 64, availableMemoryBytes: 256 * GB, loadAvg1: null }, 0, render)).toBe(8);
+    expect(targetConcurrency({ cpus: 2, availableMemoryBytes: 0, loadAvg1: 40 }, 0, render)).toBe(1);
+  });
+});
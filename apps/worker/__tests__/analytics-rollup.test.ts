@@ -0,0 +1,84 @@
+import { describe, it, expect, vi } from 'vitest';
+import type { Prisma } from '@clipmaker/db';
+import { applyRollupDelta, rollupDay, statsDelta } from '../lib/analytics-rollup';
+
+describe('rollupDay', () => {
+  it('truncates to UTC midnight', () => {
+    expect(rollupDay(new Date('2026-03-05T23:59:59.999Z')).toISOString()).toBe('2026-03-05T00:00:00.000Z');
+  });
+});
+
+describe('statsDelta', () => {
+  const previous = { views: 100, likes: 10, shares: 2 };
+
+  it('returns the gain since the stored snapshot', () => {
+    expect(statsDelta(previous, { views: 150, likes: 12, shares: 5 })).toEqual({
+      views: 50,
+      likes: 2,
+      shares: 3,
+      published: 0,
+    });
+  });
+
+  it('treats counters the platform does not report as unchanged', () => {
+    expect(statsDelta(previous, { views: 120, likes: null, shares: undefined })).toEqual({
+      views: 20,
+      likes: 0,
+      shares: 0,
+      published: 0,
+    });
+  });
+
+  it('passes through decreases (e.g. platform-side view corrections)', () => {
+    expect(statsDelta(previous, { views: 90 }).views).toBe(-10);
+  });
+});
+
+describe('applyRollupDelta', () => {
+  function fakeTx() {
+    return {
+      analyticsUserDaily: { upsert: vi.fn() },
+      analyticsTeamDaily: { upsert: vi.fn() },
+    };
+  }
+  const day = rollupDay(new Date('2026-03-05T12:00:00Z'));
+  const delta = { views: 5, likes: 1, shares: 0, published: 0 };
+
+  it('upserts the user row and the team row', async () => {
+    const tx = fakeTx();
+    await applyRollupDelta(tx as unknown as Prisma.TransactionClient, { userId: 'u1', teamId: 't1' }, 'vk', day, delta);
+
+    expect(tx.analyticsUserDaily.upsert).toHaveBeenCalledWith({
+      where: { userId_day_platform: { userId: 'u1', day, platform: 'vk' } },
+      create: { userId: 'u1', day, platform: 'vk', ...delta },
+      update: {
+        views: { increment: 5 },
+        likes: { increment: 1 },
+        shares: { increment: 0 },
+        published: { increment: 0 },
+      },
+    });
+    expect(tx.analyticsTeamDaily.upsert).toHaveBeenCalledTimes(1);
+  });
+
+  it('skips the team rollup for personal videos', async () => {
+    const tx = fakeTx();
+    await applyRollupDelta(tx as unknown as Prisma.TransactionClient, { userId: 'u1', teamId: null }, 'vk', day, delta);
+
+    expect(tx.analyticsUserDaily.upsert).toHaveBeenCalledTimes(1);
+    expect(tx.analyticsTeamDaily.upsert).not.toHaveBeenCalled();
+  });
+
+  it('does not write an all-zero delta', async () => {
+    const tx = fakeTx();
+    await applyRollupDelta(
+      tx as unknown as Prisma.TransactionClient,
+      { userId: 'u1', teamId: 't1' },
+      'vk',
+      day,
+      { views: 0, likes: 0, shares: 0, published: 0 },
+    );
+
+    expect(tx.analyticsUserDaily.upsert).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,129 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import { EventEmitter } from 'events';
+import { PassThrough } from 'stream';
+
+vi.mock('child_process', async (importOriginal) => ({
+  ...(await importOriginal<typeof import('child_process')>()),
+  spawn: vi.fn(),
+}));
+
+import { spawn } from 'child_process';
+import { chooseCutPoints, mapAudioChunks, CHUNK_DURATION } from '../lib/audio-chunker';
+
+const spawnMock = vi.mocked(spawn);
+
+describe('chooseCutPoints', () => {
+  it('returns no cuts for audio shorter than one chunk', () => {
+    expect(chooseCutPoints(120)).toEqual([]);
+  });
+
+  it('returns no cuts for audio exactly one chunk long', () => {
+    expect(chooseCutPoints(CHUNK_DURATION)).toEqual([]);
+  });
+
+  it('cuts every CHUNK_DURATION seconds without silences', () => {
+    expect(chooseCutPoints(600)).toEqual([180, 360, 540]);
+  });
+
+  it('snaps a cut back to the latest silence inside the window', () => {
+    const silences = [
+      { start: 100, end: 101 },
+      { start: 165, end: 166 }, // mid 165.5, inside [160, 180]
+      { start: 172, end: 173 }, // mid 172.5, latest inside window
+    ];
+    expect(chooseCutPoints(300, silences, 180, 20)).toEqual([172.5]);
+  });
+
+  it('ignores silences outside the window', () => {
+    const silences = [{ start: 100, end: 101 }, { start: 185, end: 186 }];
+    expect(chooseCutPoints(300, silences, 180, 20)).toEqual([180]);
+  });
+
+  it('measures the next chunk from the snapped cut', () => {
+    const silences = [{ start: 169, end: 171 }]; // mid 170
+    expect(chooseCutPoints(400, silences, 180, 20)).toEqual([170, 350]);
+  });
+
+  it('never produces a chunk longer than chunkDuration', () => {
+    const silences = Array.from({ length: 200 }, (_, i) => ({ start: i * 7.3, end: i * 7.3 + 0.5 }));
+    const total = 1500;
+    const cuts = chooseCutPoints(total, silences, 180, 20);
+    const bounds = [0, ...cuts, total];
+    for (let i = 1; i < bounds.length; i++) {
+      expect(bounds[i]! - bounds[i - 1]!).toBeLessThanOrEqual(180);
+    }
+  });
+});
+
+describe('mapAudioChunks', () => {
+  /** Fake ffmpeg: writes segment-list lines to stdout; honours spawn's `signal` like node does */
+  function fakeFFmpeg(lines: string[], opts: { exit?: boolean } = {}) {
+    const stdout = new PassThrough();
+    const proc = Object.assign(new EventEmitter(), {
+      stdout,
+      stderr: new EventEmitter(),
+      exitCode: null as number | null,
+      signalCode: null as string | null,
+      kill: vi.fn((signal: string) => {
+        if (proc.exitCode !== null || proc.signalCode !== null) return false;
+        proc.signalCode = signal;
+        stdout.end();
+        setImmediate(() => proc.emit('close', null));
+        return true;
+      }),
+    });
+    spawnMock.mockImplementation(((_cmd: string, _args: string[], options: { signal?: AbortSignal }) => {
+      options.signal?.addEventListener('abort', () => proc.kill('SIGKILL'));
+      setImmediate(() => {
+        lines.forEach((line) => stdout.write(`${line}\n`));
+        if (opts.exit) {
+          stdout.end();
+          proc.exitCode = 0;
+          setImmediate(() => proc.emit('close', 0));
+        }
+      });
+      return proc;
+    }) as never);
+    return proc;
+  }
+
+  beforeEach(() => {
+    spawnMock.mockReset();
+  });
+
+  it('returns mapped results in chunk order', async () => {
+    fakeFFmpeg(['chunk_0000.mp3,0.000,180.000', 'chunk_0001.mp3,180.000,300.000'], { exit: true });
+
+    const results = await mapAudioChunks('/src.mp4', '/tmp/stt', 300, [180], async (chunk) => chunk.offsetSeconds, {
+      concurrency: 2,
+    });
+
+    expect(results).toEqual([0, 180]);
+  });
+
+  it('caps ffmpeg threads for the decode and the encoder', async () => {
+    fakeFFmpeg(['chunk_0000.mp3,0.000,60.000'], { exit: true });
+
+    await mapAudioChunks('/src.mp4', '/tmp/stt', 60, [], async () => null, { concurrency: 1 });
+
+    const args = spawnMock.mock.calls[0]![1] as string[];
+    const inputIndex = args.indexOf('-i');
+    expect(args.indexOf('-threads')).toBeGreaterThan(-1);
+    expect(args.indexOf('-threads')).toBeLessThan(inputIndex);
+    expect(args[args.indexOf('-threads') + 1]).toBe('1');
+    expect(args.lastIndexOf('-threads')).toBeGreaterThan(inputIndex);
+  });
+
+  it('kills ffmpeg when a consumer fails while it is still encoding', async () => {
+    const proc = fakeFFmpeg(['chunk_0000.mp3,0.000,180.000']);
+
+    await expect(
+      mapAudioChunks('/src.mp4', '/tmp/stt', 600, [180, 360], async () => {
+        throw new Error('STT provider down');
+      }, { concurrency: 2 }),
+    ).rejects.toThrow('STT provider down');
+
+    expect(proc.kill).toHaveBeenCalledWith('SIGKILL');
+    expect(proc.signalCode).toBe('SIGKILL');
+  });
+});
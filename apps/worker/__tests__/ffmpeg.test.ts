@@ -0,0 +1,99 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import { EventEmitter } from 'events';
+
+vi.mock('child_process', async (importOriginal) => ({
+  ...(await importOriginal<typeof import('child_process')>()),
+  spawn: vi.fn(),
+}));
+
+import { spawn } from 'child_process';
+import { renderClipGroup, FFMPEG_THREADS } from '../lib/ffmpeg';
+
+const spawnMock = vi.mocked(spawn);
+
+/** Fake ffmpeg process that exits with `code` on the next tick */
+function fakeProcess(code: number) {
+  const proc = Object.assign(new EventEmitter(), { stderr: new EventEmitter(), kill: vi.fn() });
+  setImmediate(() => proc.emit('close', code));
+  return proc;
+}
+
+function spawnedArgs(): string[] {
+  return spawnMock.mock.calls[0]![1] as string[];
+}
+
+function argAfter(args: string[], flag: string): string | undefined {
+  return args[args.indexOf(flag) + 1];
+}
+
+const outputs = [
+  { outputPath: '/tmp/a.mp4', startTime: 100, endTime: 130, filterChain: 'scale=1080:1920' },
+  { outputPath: '/tmp/b.mp4', startTime: 120, endTime: 160, filterChain: 'scale=1080:1080' },
+];
+
+describe('renderClipGroup', () => {
+  beforeEach(() => {
+    spawnMock.mockReset();
+    spawnMock.mockImplementation(() => fakeProcess(0) as never);
+  });
+
+  it('does not spawn ffmpeg for an empty group', async () => {
+    await renderClipGroup({ inputPath: '/src.mp4', outputs: [], hasAudio: true });
+    expect(spawnMock).not.toHaveBeenCalled();
+  });
+
+  it('seeks once and decodes the span covering every clip', async () => {
+    await renderClipGroup({ inputPath: '/src.mp4', outputs, hasAudio: true });
+
+    expect(spawnMock).toHaveBeenCalledTimes(1);
+    const args = spawnedArgs();
+    expect(argAfter(args, '-ss')).toBe('100');
+    expect(argAfter(args, '-t')).toBe('60');
+    expect(argAfter(args, '-i')).toBe('/src.mp4');
+    expect(args.indexOf('-ss')).toBeLessThan(args.indexOf('-i'));
+  });
+
+  it('splits the decode into per-clip trims relative to the group start', async () => {
+    await renderClipGroup({ inputPath: '/src.mp4', outputs, hasAudio: true });
+
+    expect(argAfter(spawnedArgs(), '-filter_complex')!.split(';')).toEqual([
+      '[0:v]split=2[vs0][vs1]',
+      '[0:a]asplit=2[as0][as1]',
+      '[vs0]trim=start=0:duration=30,setpts=PTS-STARTPTS,scale=1080:1920[v0]',
+      '[as0]atrim=start=0:duration=30,asetpts=PTS-STARTPTS[a0]',
+      '[vs1]trim=start=20:duration=40,setpts=PTS-STARTPTS,scale=1080:1080[v1]',
+      '[as1]atrim=start=20:duration=40,asetpts=PTS-STARTPTS[a1]',
+    ]);
+  });
+
+  it('maps each output to its own streams and splits the thread budget', async () => {
+    await renderClipGroup({ inputPath: '/src.mp4', outputs, hasAudio: true });
+
+    const args = spawnedArgs();
+    const perOutput = args.slice(args.indexOf('-filter_complex') + 2);
+    const encoderThreads = String(Math.max(1, Math.floor(FFMPEG_THREADS / 2)));
+    const first = perOutput.slice(0, perOutput.indexOf('/tmp/a.mp4') + 1);
+    const second = perOutput.slice(first.length);
+
+    expect(first.slice(0, 4)).toEqual(['-map', '[v0]', '-map', '[a0]']);
+    expect(argAfter(first, '-threads')).toBe(encoderThreads);
+    expect(second.slice(0, 4)).toEqual(['-map', '[v1]', '-map', '[a1]']);
+    expect(second[second.length - 1]).toBe('/tmp/b.mp4');
+  });
+
+  it('leaves audio out of the graph and maps for silent sources', async () => {
+    await renderClipGroup({ inputPath: '/src.mp4', outputs, hasAudio: false });
+
+    const args = spawnedArgs();
+    expect(argAfter(args, '-filter_complex')).not.toContain('asplit');
+    expect(args.filter((a) => a.startsWith('[a'))).toEqual([]);
+    expect(args.filter((a) => a === '-map')).toHaveLength(2);
+  });
+
+  it('rejects when ffmpeg exits non-zero', async () => {
+    spawnMock.mockImplementation(() => fakeProcess(1) as never);
+    await expect(renderClipGroup({ inputPath: '/src.mp4', outputs, hasAudio: true })).rejects.toThrow(
+      'FFmpeg exited with code 1',
+    );
+  });
+});
@@ -0,0 +1,152 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import { LLMResponseCache, llmCacheKey, createLLMResponseCacheFromEnv, type CachedCompletion } from '../lib/llm-cache';
+import { llmCacheRequests, llmCacheSavedKopecks, resetMetrics } from '../lib/metrics';
+
+type Store = ConstructorParameters<typeof LLMResponseCache>[0];
+
+function createFakeStore() {
+  const data = new Map<string, string>();
+  const store = {
+    get: vi.fn(async (key: string) => data.get(key) ?? null),
+    // STORE_SCRIPT args: script, numKeys, entryKey, indexKey, value, ...
+    eval: vi.fn(async (_script: string, _numKeys: number, key: string, _index: string, value: string) => {
+      data.set(key, value);
+      return 0;
+    }),
+  };
+  return { data, store: store as unknown as Store, raw: store };
+}
+
+const completion = (content: string, costKopecks = 12): CachedCompletion => ({
+  content,
+  model: 'test-model',
+  inputTokens: 100,
+  outputTokens: 20,
+  costKopecks,
+});
+
+const keyInput = {
+  scope: 'server',
+  model: 'test-model',
+  tier: 1,
+  temperature: 0.3,
+  maxTokens: 4096,
+  jsonMode: true,
+  messages: [
+    { role: 'system', content: 'sys' },
+    { role: 'user', content: 'hello' },
+  ],
+};
+
+describe('llmCacheKey', () => {
+  it('is stable for identical input', () => {
+    expect(llmCacheKey(keyInput)).toBe(llmCacheKey({ ...keyInput, messages: [...keyInput.messages] }));
+  });
+
+  it('differs by scope so BYOK results never cross users', () => {
+    expect(llmCacheKey({ ...keyInput, scope: 'byok:user-a' })).not.toBe(
+      llmCacheKey({ ...keyInput, scope: 'byok:user-b' }),
+    );
+  });
+
+  it('differs by sampling options and messages', () => {
+    const base = llmCacheKey(keyInput);
+    expect(llmCacheKey({ ...keyInput, temperature: 0.5 })).not.toBe(base);
+    expect(llmCacheKey({ ...keyInput, tier: 2 })).not.toBe(base);
+    expect(llmCacheKey({ ...keyInput, messages: [{ role: 'user', content: 'other' }] })).not.toBe(base);
+  });
+});
+
+describe('LLMResponseCache', () => {
+  let fake: ReturnType<typeof createFakeStore>;
+
+  beforeEach(() => {
+    fake = createFakeStore();
+    resetMetrics();
+  });
+
+  it('calls the provider once and serves repeats from the store', async () => {
+    const cache = new LLMResponseCache(fake.store);
+    const compute = vi.fn(async () => completion('{"ok":true}'));
+
+    const first = await cache.getOrCompute('k', compute);
+    const second = await cache.getOrCompute('k', compute);
+
+    expect(compute).toHaveBeenCalledTimes(1);
+    expect(first.cached).toBe(false);
+    expect(second).toEqual({ value: completion('{"ok":true}'), cached: true });
+    expect(cache.getStats()).toMatchObject({ hits: 1, misses: 1, savedKopecks: 12, hitRate: 0.5 });
+  });
+
+  it('coalesces concurrent identical requests into one provider call', async () => {
+    const cache = new LLMResponseCache(fake.store);
+    let resolve!: (value: CachedCompletion) => void;
+    const compute = vi.fn(() => new Promise<CachedCompletion>((r) => { resolve = r; }));
+
+    const a = cache.getOrCompute('k', compute);
+    const b = cache.getOrCompute('k', compute);
+    await vi.waitFor(() => expect(compute).toHaveBeenCalled());
+    resolve(completion('x'));
+
+    const [ra, rb] = await Promise.all([a, b]);
+    expect(compute).toHaveBeenCalledTimes(1);
+    expect(ra.cached).toBe(false);
+    expect(rb.cached).toBe(true);
+    expect(cache.getStats()).toMatchObject({ misses: 1, coalesced: 1, savedKopecks: 12 });
+  });
+
+  it('refresh skips the lookup and overwrites the entry', async () => {
+    const cache = new LLMResponseCache(fake.store);
+    await cache.getOrCompute('k', async () => completion('old'));
+
+    const refreshed = await cache.getOrCompute('k', async () => completion('new'), { refresh: true });
+    const after = await cache.getOrCompute('k', async () => completion('unused'));
+
+    expect(refreshed).toEqual({ value: completion('new'), cached: false });
+    expect(after.value.content).toBe('new');
+  });
+
+  it('does not store content rejected by storeIf', async () => {
+    const cache = new LLMResponseCache(fake.store);
+    const storeIf = (content: string) => content.startsWith('{');
+
+    await cache.getOrCompute('k', async () => completion('not json'), { storeIf });
+
+    expect(fake.data.size).toBe(0);
+  });
+
+  it('falls back to the provider when the store fails', async () => {
+    fake.raw.get.mockRejectedValueOnce(new Error('connection lost'));
+    fake.raw.eval.mockRejectedValueOnce(new Error('connection lost'));
+    const cache = new LLMResponseCache(fake.store);
+
+    const result = await cache.getOrCompute('k', async () => completion('x'));
+
+    expect(result).toEqual({ value: completion('x'), cached: false });
+    expect(cache.getStats().errors).toBe(2);
+  });
+
+  it('exports lookups and saved kopecks as counters', async () => {
+    const cache = new LLMResponseCache(fake.store);
+    await cache.getOrCompute('k', async () => completion('x', 30));
+    await cache.getOrCompute('k', async () => completion('unused'));
+    await cache.getOrCompute('k', async () => completion('y'), { refresh: true });
+
+    expect(llmCacheRequests.render()).toEqual([
+      'clipmaker_llm_cache_requests_total{result="miss"} 1',
+      'clipmaker_llm_cache_requests_total{result="hit"} 1',
+      'clipmaker_llm_cache_requests_total{result="refresh"} 1',
+    ]);
+    expect(llmCacheSavedKopecks.render()).toEqual(['clipmaker_llm_cache_saved_kopecks_total 30']);
+  });
+});
+
+describe('createLLMResponseCacheFromEnv', () => {
+  it('is off unless a TTL is configured', () => {
+    vi.stubEnv('LLM_CACHE_TTL_SECONDS', '');
+    expect(createLLMResponseCacheFromEnv()).toBeUndefined();
+    vi.stubEnv('LLM_CACHE_TTL_SECONDS', '0');
+    expect(createLLMResponseCacheFromEnv()).toBeUndefined();
+    vi.unstubAllEnvs();
+  });
+});
@@ -0,0 +1,63 @@
+import { describe, it, expect } from 'vitest';
+import { Counter, Histogram, timed } from '../lib/metrics';
+
+describe('Counter', () => {
+  it('accumulates per label set regardless of key order', () => {
+    const counter = new Counter('test_bytes_total', 'test');
+    counter.inc({ direction: 'upload', bucket: 'a' }, 10);
+    counter.inc({ bucket: 'a', direction: 'upload' }, 5);
+    counter.inc({ direction: 'download', bucket: 'a' });
+
+    expect(counter.render()).toEqual([
+      'test_bytes_total{bucket="a",direction="upload"} 15',
+      'test_bytes_total{bucket="a",direction="download"} 1',
+    ]);
+  });
+
+  it('ignores negative increments', () => {
+    const counter = new Counter('test_negative_total', 'test');
+    counter.inc({}, -1);
+    expect(counter.snapshot()).toEqual([]);
+  });
+
+  it('escapes label values', () => {
+    const counter = new Counter('test_escape_total', 'test');
+    counter.inc({ task: 'a"b\\c' });
+    expect(counter.render()).toEqual(['test_escape_total{task="a\\"b\\\\c"} 1']);
+  });
+});
+
+describe('Histogram', () => {
+  it('renders cumulative buckets, sum and count', () => {
+    const histogram = new Histogram('test_seconds', 'test', [1, 5]);
+    histogram.observe({ stage: 'render' }, 0.5);
+    histogram.observe({ stage: 'render' }, 3);
+    histogram.observe({ stage: 'render' }, 10);
+
+    expect(histogram.render()).toEqual([
+      'test_seconds_bucket{stage="render",le="1"} 1',
+      'test_seconds_bucket{stage="render",le="5"} 2',
+      'test_seconds_bucket{stage="render",le="+Inf"} 3',
+      'test_seconds_sum{stage="render"} 13.5',
+      'test_seconds_count{stage="render"} 3',
+    ]);
+  });
+
+  it('renders unlabelled series without an empty label set', () => {
+    const histogram = new Histogram('test_plain_seconds', 'test', [1]);
+    histogram.observe({}, 2);
+
+    expect(histogram.render()).toEqual([
+      'test_plain_seconds_bucket{le="1"} 0',
+      'test_plain_seconds_bucket{le="+Inf"} 1',
+      'test_plain_seconds_sum 2',
+      'test_plain_seconds_count 1',
+    ]);
+  });
+
+  it('timed() observes failures too and rethrows', async () => {
+    const histogram = new Histogram('test_timed_seconds', 'test');
+    await expect(timed(histogram, {}, () => Promise.reject(new Error('boom')))).rejects.toThrow('boom');
+    expect(histogram.snapshot()).toEqual([{ labels: '', count: 1, sum: expect.any(Number) }]);
+  });
+});
@@ -0,0 +1,104 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+
+vi.mock('../lib/ffmpeg', async (importOriginal) => ({
+  ...(await importOriginal<typeof import('../lib/ffmpeg')>()),
+  generateCtaEndCard: vi.fn(),
+}));
+
+import { generateCtaEndCard } from '../lib/ffmpeg';
+import { groupClipsForBatch, CtaCardCache } from '../lib/render-batch';
+
+const generateCard = vi.mocked(generateCtaEndCard);
+
+const clip = (id: string, startTime: number, endTime: number) => ({ id, startTime, endTime });
+
+describe('groupClipsForBatch', () => {
+  it('returns no groups for no clips', () => {
+    expect(groupClipsForBatch([])).toEqual([]);
+  });
+
+  it('merges overlapping and nearby clips into one group', () => {
+    const groups = groupClipsForBatch([
+      clip('a', 0, 40),
+      clip('b', 30, 70),
+      clip('c', 78, 120), // 8s gap after b
+    ]);
+    expect(groups.map((g) => g.map((c) => c.id))).toEqual([['a', 'b', 'c']]);
+  });
+
+  it('splits clips separated by more than the max gap', () => {
+    const groups = groupClipsForBatch([
+      clip('a', 0, 40),
+      clip('b', 600, 640),
+    ]);
+    expect(groups.map((g) => g.map((c) => c.id))).toEqual([['a'], ['b']]);
+  });
+
+  it('sorts clips by start time before grouping', () => {
+    const groups = groupClipsForBatch([
+      clip('b', 50, 80),
+      clip('a', 0, 40),
+    ]);
+    expect(groups[0]!.map((c) => c.id)).toEqual(['a', 'b']);
+  });
+
+  it('caps clips per group', () => {
+    const clips = Array.from({ length: 6 }, (_, i) => clip(String(i), i * 10, i * 10 + 30));
+    const groups = groupClipsForBatch(clips, { maxClips: 4 });
+    expect(groups.map((g) => g.length)).toEqual([4, 2]);
+  });
+
+  it('caps the decoded span per group', () => {
+    const groups = groupClipsForBatch(
+      [clip('a', 0, 60), clip('b', 70, 130), clip('c', 140, 200)],
+      { maxSpanSeconds: 150 },
+    );
+    expect(groups.map((g) => g.map((c) => c.id))).toEqual([['a', 'b'], ['c']]);
+  });
+});
+
+describe('CtaCardCache', () => {
+  const cta = { text: 'Подписывайтесь', position: 'end' as const, duration: 3 };
+
+  beforeEach(() => {
+    generateCard.mockReset();
+    generateCard.mockResolvedValue(undefined);
+  });
+
+  it('encodes an identical card once, including concurrent requests', async () => {
+    const cache = new CtaCardCache('/tmp/batch');
+
+    const [first, second] = await Promise.all([cache.get(cta, 'portrait'), cache.get(cta, 'portrait')]);
+    const third = await cache.get({ ...cta }, 'portrait');
+
+    expect(generateCard).toHaveBeenCalledTimes(1);
+    expect(generateCard).toHaveBeenCalledWith(cta, 1080, 1920, first);
+    expect(second).toBe(first);
+    expect(third).toBe(first);
+    expect(cache.size).toBe(1);
+  });
+
+  it('encodes separate cards per format, text and duration', async () => {
+    const cache = new CtaCardCache('/tmp/batch');
+
+    const paths = await Promise.all([
+      cache.get(cta, 'portrait'),
+      cache.get(cta, 'square'),
+      cache.get({ ...cta, text: 'Другой текст' }, 'portrait'),
+      cache.get({ ...cta, duration: 5 }, 'portrait'),
+    ]);
+
+    expect(generateCard).toHaveBeenCalledTimes(4);
+    expect(new Set(paths).size).toBe(4);
+    expect(generateCard).toHaveBeenCalledWith(cta, 1080, 1080, paths[1]);
+  });
+
+  it('does not cache a failed encode', async () => {
+    const cache = new CtaCardCache('/tmp/batch');
+    generateCard.mockRejectedValueOnce(new Error('ffmpeg failed'));
+
+    await expect(cache.get(cta, 'portrait')).rejects.toThrow('ffmpeg failed');
+    await expect(cache.get(cta, 'portrait')).resolves.toMatch(/cta-[0-9a-f]{16}\.mp4$/);
+    expect(generateCard).toHaveBeenCalledTimes(2);
+  });
+});
@@ -0,0 +1,166 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+import { mkdtemp, rm, writeFile, access } from 'fs/promises';
+import path from 'path';
+import os from 'os';
+
+vi.mock('../lib/s3-download', () => ({ downloadFromS3: vi.fn() }));
+
+import { SourceCache } from '../lib/source-cache';
+
+async function exists(filePath: string): Promise<boolean> {
+  return access(filePath).then(() => true, () => false);
+}
+
+describe('SourceCache', () => {
+  let dir: string;
+  let downloads: string[];
+
+  // Fake downloader: writes `size` bytes (encoded in the key as "name:size")
+  const fakeDownload = async (s3Key: string, localPath: string) => {
+    downloads.push(s3Key);
+    const size = parseInt(s3Key.split(':')[1] ?? '10', 10);
+    await new Promise((r) => setTimeout(r, 5));
+    await writeFile(localPath, Buffer.alloc(size));
+  };
+
+  beforeEach(async () => {
+    dir = await mkdtemp(path.join(os.tmpdir(), 'source-cache-test-'));
+    downloads = [];
+  });
+
+  afterEach(async () => {
+    await rm(dir, { recursive: true, force: true });
+  });
+
+  it('downloads once and serves subsequent acquires from disk', async () => {
+    const cache = new SourceCache(dir, 1000, fakeDownload);
+
+    const a = await cache.acquire('videos/a.mp4:10');
+    a.release();
+    const b = await cache.acquire('videos/a.mp4:10');
+
+    expect(b.path).toBe(a.path);
+    expect(downloads).toHaveLength(1);
+    expect(cache.getStats()).toMatchObject({ hits: 1, misses: 1, entries: 1, bytes: 10 });
+    b.release();
+  });
+
+  it('coalesces concurrent acquires into one download', async () => {
+    const cache = new SourceCache(dir, 1000, fakeDownload);
+
+    const handles = await Promise.all([
+      cache.acquire('videos/a.mp4:10'),
+      cache.acquire('videos/a.mp4:10'),
+      cache.acquire('videos/a.mp4:10'),
+    ]);
+
+    expect(downloads).toHaveLength(1);
+    expect(new Set(handles.map((h) => h.path)).size).toBe(1);
+    expect(cache.getStats()).toMatchObject({ misses: 1, inflightHits: 2 });
+    handles.forEach((h) => h.release());
+  });
+
+  it('evicts least-recently-used unreferenced entries over budget', async () => {
+    const cache = new SourceCache(dir, 25, fakeDownload);
+
+    const a = await cache.acquire('a.mp4:10');
+    a.release();
+    const b = await cache.acquire('b.mp4:10');
+    b.release();
+    // Touch a so b becomes least recently used
+    (await cache.acquire('a.mp4:10')).release();
+    const c = await cache.acquire('c.mp4:10');
+    c.release();
+
+    expect(await exists(a.path)).toBe(true);
+    expect(await exists(b.path)).toBe(false);
+    expect(cache.getStats()).toMatchObject({ evictions: 1, entries: 2, bytes: 20 });
+  });
+
+  it('never evicts an entry while it is referenced', async () => {
+    const cache = new SourceCache(dir, 15, fakeDownload);
+
+    const a = await cache.acquire('a.mp4:10');
+    const b = await cache.acquire('b.mp4:10');
+
+    expect(await exists(a.path)).toBe(true);
+    expect(await exists(b.path)).toBe(true);
+
+    a.release();
+    // Give the async marker removal + eviction scan time to complete
+    await new Promise((r) => setTimeout(r, 50));
+    expect(await exists(a.path)).toBe(false);
+    expect(await exists(b.path)).toBe(true);
+    b.release();
+  });
+
+  it('release is idempotent', async () => {
+    const cache = new SourceCache(dir, 15, fakeDownload);
+
+    const a1 = await cache.acquire('a.mp4:10');
+    const a2 = await cache.acquire('a.mp4:10');
+    a1.release();
+    a1.release();
+    await cache.acquire('b.mp4:10');
+
+    // a2 still holds a ref, so a must survive despite the double release
+    expect(await exists(a2.path)).toBe(true);
+  });
+
+  it('shares files and the byte budget with other processes on the node', async () => {
+    // Two caches on one directory stand in for two worker processes
+    const render = new SourceCache(dir, 15, fakeDownload);
+    const stt = new SourceCache(dir, 15, fakeDownload);
+
+    const a = await render.acquire('a.mp4:10');
+    const shared = await stt.acquire('a.mp4:10');
+    expect(shared.path).toBe(a.path);
+    expect(downloads).toEqual(['a.mp4:10']);
+    expect(stt.getStats()).toMatchObject({ hits: 1, misses: 0 });
+
+    // stt goes over the node budget, but a is still held by both processes
+    const b = await stt.acquire('b.mp4:10');
+    expect(await exists(a.path)).toBe(true);
+
+    shared.release();
+    await new Promise((r) => setTimeout(r, 50));
+    expect(await exists(a.path)).toBe(true);
+
+    a.release();
+    await new Promise((r) => setTimeout(r, 50));
+    expect(await exists(a.path)).toBe(false);
+    expect(await exists(b.path)).toBe(true);
+    b.release();
+  });
+
+  it('waits for another process that is downloading the same key', async () => {
+    const first = new SourceCache(dir, 1000, fakeDownload);
+    const second = new SourceCache(dir, 1000, fakeDownload);
+
+    const [h1, h2] = await Promise.all([first.acquire('a.mp4:10'), second.acquire('a.mp4:10')]);
+
+    expect(downloads).toHaveLength(1);
+    expect(h2.path).toBe(h1.path);
+    h1.release();
+    h2.release();
+  });
+
+  it('propagates download errors to all waiters and allows retry', async () => {
+    let fail = true;
+    const cache = new SourceCache(dir, 1000, async (key, localPath) => {
+      if (fail) throw new Error('S3 unavailable');
+      await fakeDownload(key, localPath);
+    });
+
+    const results = await Promise.allSettled([
+      cache.acquire('a.mp4:10'),
+      cache.acquire('a.mp4:10'),
+    ]);
+    expect(results.every((r) => r.status === 'rejected')).toBe(true);
+
+    fail = false;
+    const handle = await cache.acquire('a.mp4:10');
+    expect(await exists(handle.path)).toBe(true);
+    handle.release();
+  });
+});
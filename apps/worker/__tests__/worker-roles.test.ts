@@ -0,0 +1,22 @@
+import { describe, it, expect } from 'vitest';
+import { resolveWorkerRoles, WORKER_ROLES } from '../lib/worker-roles';
+
+describe('resolveWorkerRoles', () => {
+  it('defaults to every role', () => {
+    expect(resolveWorkerRoles(undefined)).toEqual([...WORKER_ROLES]);
+    expect(resolveWorkerRoles(' ')).toEqual([...WORKER_ROLES]);
+  });
+
+  it('expands groups and de-duplicates in canonical order', () => {
+    expect(resolveWorkerRoles('render,cpu')).toEqual(['stt', 'render']);
+    expect(resolveWorkerRoles('io')).toEqual(['llm', 'publish', 'stats', 'billing', 'download']);
+  });
+
+  it('accepts individual roles case-insensitively', () => {
+    expect(resolveWorkerRoles('Publish, stt')).toEqual(['stt', 'publish']);
+  });
+
+  it('rejects unknown roles', () => {
+    expect(() => resolveWorkerRoles('render,renderer')).toThrow('Unknown worker role "renderer"');
+  });
+});
@@ -0,0 +1,135 @@
+import { createServer, type IncomingMessage, type Server, type ServerResponse } from 'http';
+import { setTimeout as sleep } from 'timers/promises';
+import { SYSTEM_PROMPT as MOMENT_SELECTION_PROMPT } from '../../lib/prompts/moment-selection';
+import { SYSTEM_PROMPT as VIRALITY_SCORING_PROMPT } from '../../lib/prompts/virality-scoring';
+import { SYSTEM_PROMPT as TITLE_GENERATION_PROMPT } from '../../lib/prompts/title-generation';
+import { SYSTEM_PROMPT as CTA_SUGGESTION_PROMPT } from '../../lib/prompts/cta-suggestion';
+
+export type OpenAIStubOptions = {
+  /** Added to every /audio/transcriptions response (simulated provider latency) */
+  sttLatencyMs?: number;
+  /** Added to every /chat/completions response */
+  llmLatencyMs?: number;
+};
+
+/** Seconds of transcript returned per STT call; the caller clamps to the real chunk length */
+export const STUB_TRANSCRIPT_SECONDS = 180;
+const STUB_SEGMENT_SECONDS = 5;
+
+const PHRASE = 'сегодня разберём как сделать вебинар который продаёт без лишних усилий';
+
+/**
+ * OpenAI-compatible stand-in for the STT and LLM providers:
+ * - POST /v1/audio/transcriptions: verbose_json transcript of STUB_TRANSCRIPT_SECONDS
+ * - POST /v1/chat/completions: schema-valid JSON for each llm-analyze prompt,
+ *   picked by the system prompt (moments are spread evenly over the video duration)
+ */
+export async function startOpenAIStub(options: OpenAIStubOptions = {}): Promise<{ baseUrl: string; server: Server }> {
+  const server = createServer((req, res) => {
+    handle(req, res, options).catch((err: Error) => {
+      if (!res.headersSent) sendJson(res, 500, { error: { message: err.message } });
+    });
+  });
+
+  await new Promise<void>((resolve) => server.listen(0, '127.0.0.1', resolve));
+  const { port } = server.address() as { port: number };
+  return { baseUrl: `http://127.0.0.1:${port}/v1`, server };
+}
+
+async function handle(req: IncomingMessage, res: ServerResponse, options: OpenAIStubOptions): Promise<void> {
+  const body = await readBody(req);
+  const route = new URL(req.url ?? '/', 'http://localhost').pathname;
+
+  if (req.method === 'POST' && route === '/v1/audio/transcriptions') {
+    await sleep(options.sttLatencyMs ?? 0);
+    return sendJson(res, 200, transcription());
+  }
+
+  if (req.method === 'POST' && route === '/v1/chat/completions') {
+    await sleep(options.llmLatencyMs ?? 0);
+    const request = JSON.parse(body.toString('utf-8')) as {
+      model: string;
+      messages: Array<{ role: string; content: string }>;
+    };
+    const system = request.messages.find((m) => m.role === 'system')?.content ?? '';
+    const user = request.messages.find((m) => m.role === 'user')?.content ?? '';
+    const content = JSON.stringify(completionFor(system, user));
+    return sendJson(res, 200, {
+      id: 'chatcmpl-bench',
+      object: 'chat.completion',
+      created: Math.floor(Date.now() / 1000),
+      model: request.model,
+      choices: [{ index: 0, message: { role: 'assistant', content }, finish_reason: 'stop' }],
+      usage: {
+        prompt_tokens: Math.ceil(body.length / 4),
+        completion_tokens: Math.ceil(content.length / 4),
+        total_tokens: Math.ceil((body.length + content.length) / 4),
+      },
+    });
+  }
+
+  sendJson(res, 404, { error: { message: `No stub for ${req.method} ${route}` } });
+}
+
+function transcription() {
+  const segments = [];
+  for (let start = 0; start < STUB_TRANSCRIPT_SECONDS; start += STUB_SEGMENT_SECONDS) {
+    segments.push({
+      id: segments.length,
+      start,
+      end: start + STUB_SEGMENT_SECONDS,
+      text: PHRASE,
+      avg_logprob: -0.2,
+      no_speech_prob: 0.01,
+    });
+  }
+  return {
+    task: 'transcribe',
+    language: 'russian',
+    duration: STUB_TRANSCRIPT_SECONDS,
+    text: segments.map((s) => s.text).join(' '),
+    segments,
+  };
+}
+
+function completionFor(system: string, user: string): unknown {
+  switch (system) {
+    case MOMENT_SELECTION_PROMPT: {
+      const duration = Number(/Длительность видео: ([\d.]+)/.exec(user)?.[1] ?? 0);
+      return { moments: spreadMoments(duration) };
+    }
+    case VIRALITY_SCORING_PROMPT:
+      return { hook: 18, engagement: 16, flow: 15, trend: 12, total: 61, tips: ['Сократите вступление'] };
+    case TITLE_GENERATION_PROMPT:
+      return { title: 'Как продавать на вебинаре', alternatives: ['Вебинар, который продаёт'] };
+    case CTA_SUGGESTION_PROMPT:
+      return { text: 'Записывайтесь на курс сегодня', position: 'end', duration: 4 };
+    default:
+      return {};
+  }
+}
+
+/** One 30s moment per 90s of video (max 10), evenly spaced and non-overlapping */
+function spreadMoments(durationSeconds: number) {
+  const count = Math.max(1, Math.min(10, Math.floor(durationSeconds / 90)));
+  const slot = durationSeconds / count;
+  const length = Math.min(30, slot);
+  return Array.from({ length: count }, (_, i) => ({
+    start: Math.round(i * slot),
+    end: Math.round(i * slot + length),
+    title: `Момент ${i + 1}`,
+    reason: 'Сильный хук и практический совет',
+    hook_strength: 15,
+  }));
+}
+
+async function readBody(req: IncomingMessage): Promise<Buffer> {
+  const chunks: Buffer[] = [];
+  for await (const chunk of req) chunks.push(chunk as Buffer);
+  return Buffer.concat(chunks);
+}
+
+function sendJson(res: ServerResponse, status: number, payload: unknown): void {
+  res.writeHead(status, { 'Content-Type': 'application/json' });
+  res.end(JSON.stringify(payload));
+}
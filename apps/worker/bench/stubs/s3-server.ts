@@ -0,0 +1,119 @@
+import { createServer, type IncomingMessage, type Server, type ServerResponse } from 'http';
+import { createReadStream, createWriteStream } from 'fs';
+import { mkdir, readdir, rm, stat } from 'fs/promises';
+import { randomUUID } from 'crypto';
+import path from 'path';
+import { pipeline } from 'stream/promises';
+
+/**
+ * Filesystem-backed stand-in for the S3 subset the worker uses (path-style):
+ * GetObject, HeadObject, PutObject, DeleteObject and multipart upload
+ * (Create / UploadPart / Complete / Abort). Objects live under `root/<bucket>/<key>`.
+ * No auth, no checksums -- benchmark use only.
+ */
+export async function startS3Stub(root: string): Promise<{ endpoint: string; server: Server }> {
+  const uploadsDir = path.join(root, '.uploads');
+  await mkdir(uploadsDir, { recursive: true });
+
+  const server = createServer((req, res) => {
+    handle(req, res, root, uploadsDir).catch((err: Error) => {
+      if (!res.headersSent) sendError(res, 500, 'InternalError', err.message);
+      else res.destroy(err);
+    });
+  });
+
+  await new Promise<void>((resolve) => server.listen(0, '127.0.0.1', resolve));
+  const { port } = server.address() as { port: number };
+  return { endpoint: `http://127.0.0.1:${port}`, server };
+}
+
+async function handle(req: IncomingMessage, res: ServerResponse, root: string, uploadsDir: string): Promise<void> {
+  const url = new URL(req.url ?? '/', 'http://localhost');
+  const [bucket = '', ...keyParts] = url.pathname.slice(1).split('/');
+  const key = keyParts.map(decodeURIComponent).join('/');
+  const objectPath = path.join(root, bucket, key);
+  const uploadId = url.searchParams.get('uploadId');
+
+  if (!key || path.relative(root, objectPath).startsWith('..')) {
+    return sendError(res, 400, 'InvalidRequest', 'Bucket-level operations are not supported');
+  }
+
+  switch (req.method) {
+    case 'GET':
+    case 'HEAD': {
+      const info = await stat(objectPath).catch(() => null);
+      if (!info) return sendError(res, 404, 'NoSuchKey', 'The specified key does not exist.');
+      res.writeHead(200, {
+        'Content-Length': info.size,
+        'Content-Type': 'application/octet-stream',
+        ETag: `"${info.mtimeMs}"`,
+      });
+      if (req.method === 'HEAD') return void res.end();
+      await pipeline(createReadStream(objectPath), res);
+      return;
+    }
+
+    case 'PUT': {
+      const partNumber = url.searchParams.get('partNumber');
+      const target = uploadId && partNumber
+        ? path.join(uploadsDir, uploadId, partNumber.padStart(5, '0'))
+        : objectPath;
+      await mkdir(path.dirname(target), { recursive: true });
+      await pipeline(req, createWriteStream(target));
+      res.writeHead(200, { ETag: `"${randomUUID()}"` }).end();
+      return;
+    }
+
+    case 'POST': {
+      if (url.searchParams.has('uploads')) {
+        const id = randomUUID();
+        await mkdir(path.join(uploadsDir, id), { recursive: true });
+        req.resume();
+        return sendXml(res, 'InitiateMultipartUploadResult', { Bucket: bucket, Key: key, UploadId: id });
+      }
+      if (uploadId) {
+        req.resume();
+        const partsDir = path.join(uploadsDir, uploadId);
+        // Part files are zero-padded, so lexical order is part order
+        const parts = (await readdir(partsDir)).sort();
+        await mkdir(path.dirname(objectPath), { recursive: true });
+        const out = createWriteStream(objectPath);
+        for (const part of parts) {
+          await pipeline(createReadStream(path.join(partsDir, part)), out, { end: false });
+        }
+        await new Promise<void>((resolve, reject) => out.end((err?: Error | null) => (err ? reject(err) : resolve())));
+        await rm(partsDir, { recursive: true, force: true });
+        return sendXml(res, 'CompleteMultipartUploadResult', {
+          Location: `/${bucket}/${key}`,
+          Bucket: bucket,
+          Key: key,
+          ETag: `"${randomUUID()}"`,
+        });
+      }
+      return sendError(res, 400, 'InvalidRequest', 'Unsupported POST');
+    }
+
+    case 'DELETE':
+      await rm(uploadId ? path.join(uploadsDir, uploadId) : objectPath, { recursive: true, force: true });
+      res.writeHead(204).end();
+      return;
+
+    default:
+      return sendError(res, 405, 'MethodNotAllowed', `Unsupported method ${req.method}`);
+  }
+}
+
+function sendXml(res: ServerResponse, root: string, fields: Record<string, string>): void {
+  const body = Object.entries(fields).map(([k, v]) => `<${k}>${escapeXml(v)}</${k}>`).join('');
+  res.writeHead(200, { 'Content-Type': 'application/xml' });
+  res.end(`<?xml version="1.0" encoding="UTF-8"?>\n<${root}>${body}</${root}>`);
+}
+
+function sendError(res: ServerResponse, status: number, code: string, message: string): void {
+  res.writeHead(status, { 'Content-Type': 'application/xml' });
+  res.end(`<?xml version="1.0" encoding="UTF-8"?>\n<Error><Code>${code}</Code><Message>${escapeXml(message)}</Message></Error>`);
+}
+
+function escapeXml(value: string): string {
+  return value.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
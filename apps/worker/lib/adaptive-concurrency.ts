@@ -0,0 +1,165 @@
+import { readFileSync } from 'fs';
+import os from 'os';
+import path from 'path';
+import type { Worker } from 'bullmq';
+import { QUEUE_NAMES } from '@clipmaker/queue';
+import { createLogger } from './logger';
+import { FFMPEG_THREADS } from './ffmpeg';
+import { STT_FFMPEG_THREADS } from './audio-chunker';
+
+const logger = createLogger('adaptive-concurrency');
+
+const MB = 1024 * 1024;
+const CGROUP_ROOT = '/sys/fs/cgroup';
+const ADJUST_INTERVAL_MS = 15_000;
+
+export type HostSample = {
+  /** Cores this process may use (cgroup quota if set) */
+  cpus: number;
+  /** Memory that can still be allocated (cgroup limit if set) */
+  availableMemoryBytes: number;
+  /** 1-minute load average; null when it does not describe our share (cgroup quota, Windows) */
+  loadAvg1: number | null;
+};
+
+export type ConcurrencyProfile = {
+  /** CPU threads one job keeps busy */
+  threadsPerJob: number;
+  /** Peak resident memory of one job (ffmpeg + buffers) */
+  memoryPerJobBytes: number;
+  maxConcurrency: number;
+};
+
+/** ffmpeg-bound queues; everything else keeps its fixed concurrency */
+export const FFMPEG_QUEUE_PROFILES: Record<string, ConcurrencyProfile> = {
+  [QUEUE_NAMES.VIDEO_RENDER]: {
+    threadsPerJob: FFMPEG_THREADS,
+    memoryPerJobBytes: parseInt(process.env.RENDER_JOB_MEMORY_MB || '1024', 10) * MB,
+    maxConcurrency: parseInt(process.env.RENDER_MAX_CONCURRENCY || '8', 10),
+  },
+  // One audio-only ffmpeg per job; the rest of the job waits on the STT provider
+  [QUEUE_NAMES.STT]: {
+    threadsPerJob: STT_FFMPEG_THREADS,
+    memoryPerJobBytes: parseInt(process.env.STT_JOB_MEMORY_MB || '256', 10) * MB,
+    maxConcurrency: parseInt(process.env.STT_MAX_CONCURRENCY || '4', 10),
+  },
+};
+
+/**
+ * Jobs that fit on this node right now: the minimum of the core budget, the memory
+ * budget and the cores left over by other load. One core is kept for the event loop
+ * and lightweight queues on nodes with more than two. Never below 1.
+ */
+export function targetConcurrency(host: HostSample, activeJobs: number, profile: ConcurrencyProfile): number {
+  const usableCores = Math.max(1, host.cpus - (host.cpus > 2 ? 1 : 0));
+  let slots = Math.floor(usableCores / profile.threadsPerJob);
+
+  // Memory held by our running jobs comes back when they finish
+  const memory = host.availableMemoryBytes + activeJobs * profile.memoryPerJobBytes;
+  slots = Math.min(slots, Math.floor(memory / profile.memoryPerJobBytes));
+
+  if (host.loadAvg1 !== null) {
+    // Load not explained by our own jobs (other queues, other processes)
+    const foreignLoad = Math.max(0, host.loadAvg1 - activeJobs * profile.threadsPerJob);
+    slots = Math.min(slots, Math.floor(Math.max(0, usableCores - foreignLoad) / profile.threadsPerJob));
+  }
+
+  return Math.max(1, Math.min(profile.maxConcurrency, slots));
+}
+
+function readCgroupFile(name: string): string | null {
+  try {
+    return readFileSync(path.join(CGROUP_ROOT, name), 'utf-8').trim();
+  } catch {
+    return null;
+  }
+}
+
+/** cgroup v2 cpu.max: "<quota> <period>" or "max <period>" */
+function cgroupCpuLimit(): number | null {
+  const [quota, period] = (readCgroupFile('cpu.max') ?? '').split(/\s+/);
+  if (!quota || quota === 'max' || !period) return null;
+  const cores = Number(quota) / Number(period);
+  return Number.isFinite(cores) && cores > 0 ? cores : null;
+}
+
+function cgroupAvailableMemory(): number | null {
+  const max = readCgroupFile('memory.max');
+  const current = Number(readCgroupFile('memory.current'));
+  if (!max || max === 'max' || !Number.isFinite(current)) return null;
+  // Page cache is reclaimable; don't count it as used
+  const inactiveFile = Number(/^inactive_file (\d+)$/m.exec(readCgroupFile('memory.stat') ?? '')?.[1] ?? 0);
+  return Math.max(0, Number(max) - (current - inactiveFile));
+}
+
+export function sampleHost(): HostSample {
+  const cpuLimit = cgroupCpuLimit();
+  const cgroupMemory = cgroupAvailableMemory();
+  return {
+    cpus: cpuLimit ?? os.availableParallelism(),
+    availableMemoryBytes: Math.min(os.freemem(), cgroupMemory ?? Infinity),
+    // Host-wide load says nothing about a CPU-quota'd container's share
+    loadAvg1: cpuLimit === null && os.platform() !== 'win32' ? os.loadavg()[0] ?? null : null,
+  };
+}
+
+/**
+ * Re-sizes a BullMQ worker's concurrency from host capacity every ADJUST_INTERVAL_MS.
+ * Shrinks immediately (memory pressure must not wait) but grows one slot per tick,
+ * since the load average lags behind newly started jobs. Running jobs are never
+ * interrupted -- a lower concurrency only stops the worker fetching more.
+ */
+export class AdaptiveConcurrency {
+  private activeJobs = 0;
+  private timer: NodeJS.Timeout | undefined;
+
+  constructor(
+    private readonly worker: Worker,
+    private readonly profile: ConcurrencyProfile,
+    private readonly sample: () => HostSample = sampleHost,
+  ) {
+    worker.on('active', () => {
+      this.activeJobs++;
+    });
+    const finished = () => {
+      this.activeJobs = Math.max(0, this.activeJobs - 1);
+    };
+    worker.on('completed', finished);
+    worker.on('failed', finished);
+  }
+
+  start(): void {
+    this.apply(targetConcurrency(this.sample(), this.activeJobs, this.profile));
+    this.timer = setInterval(() => this.adjust(), ADJUST_INTERVAL_MS);
+    this.timer.unref();
+  }
+
+  stop(): void {
+    clearInterval(this.timer);
+    this.timer = undefined;
+  }
+
+  private adjust(): void {
+    try {
+      const target = targetConcurrency(this.sample(), this.activeJobs, this.profile);
+      const current = this.worker.concurrency;
+      this.apply(target < current ? target : Math.min(target, current + 1), target);
+    } catch (err) {
+      logger.warn({ event: 'concurrency_adjust_failed', queue: this.worker.name, error: String(err) });
+    }
+  }
+
+  private apply(next: number, target = next): void {
+    const current = this.worker.concurrency;
+    if (next === current) return;
+    this.worker.concurrency = next;
+    logger.info({
+      event: 'worker_concurrency_adjusted',
+      queue: this.worker.name,
+      from: current,
+      to: next,
+      target,
+      activeJobs: this.activeJobs,
+    });
+  }
+}
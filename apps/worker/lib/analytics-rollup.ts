@@ -0,0 +1,70 @@
+import type { Prisma, PublicationPlatform } from '@clipmaker/db';
+
+export type RollupOwner = {
+  userId: string;
+  /** Team of the source video; null = personal video, no team rollup */
+  teamId: string | null;
+};
+
+export type RollupDelta = {
+  views: number;
+  likes: number;
+  shares: number;
+  published: number;
+};
+
+/** UTC midnight of `date` -- the bucket key of the daily rollup tables */
+export function rollupDay(date: Date = new Date()): Date {
+  return new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth(), date.getUTCDate()));
+}
+
+/**
+ * Engagement gained between two stat snapshots. Null counters (platform does not
+ * report them) keep their previous value, i.e. contribute 0.
+ */
+export function statsDelta(
+  previous: { views: number; likes: number; shares: number },
+  next: { views: number; likes?: number | null; shares?: number | null },
+): RollupDelta {
+  return {
+    views: next.views - previous.views,
+    likes: next.likes != null ? next.likes - previous.likes : 0,
+    shares: next.shares != null ? next.shares - previous.shares : 0,
+    published: 0,
+  };
+}
+
+/**
+ * Add `delta` to the owner's daily rollup rows (user, and team if any).
+ * Must run in the same transaction as the publication write it mirrors.
+ */
+export async function applyRollupDelta(
+  tx: Prisma.TransactionClient,
+  owner: RollupOwner,
+  platform: PublicationPlatform,
+  day: Date,
+  delta: RollupDelta,
+): Promise<void> {
+  if (!delta.views && !delta.likes && !delta.shares && !delta.published) return;
+
+  const update = {
+    views: { increment: delta.views },
+    likes: { increment: delta.likes },
+    shares: { increment: delta.shares },
+    published: { increment: delta.published },
+  };
+
+  await tx.analyticsUserDaily.upsert({
+    where: { userId_day_platform: { userId: owner.userId, day, platform } },
+    create: { userId: owner.userId, day, platform, ...delta },
+    update,
+  });
+
+  if (owner.teamId) {
+    await tx.analyticsTeamDaily.upsert({
+      where: { teamId_day_platform: { teamId: owner.teamId, day, platform } },
+      create: { teamId: owner.teamId, day, platform, ...delta },
+      update,
+    });
+  }
+}
@@ -1,45 +1,234 @@
+import { spawn, execFile as execFileCb } from 'child_process';
+import { createInterface } from 'readline';
+import { promisify } from 'util';
 import path from 'path';
-import { execFFmpeg } from './ffmpeg';
+import pMap from 'p-map';
+import { createLogger } from './logger';
+import { audioExtractSeconds } from './metrics';
+
+const execFileAsync = promisify(execFileCb);
+const logger = createLogger('audio-chunker');
 
 export const CHUNK_DURATION = 180; // 3 minutes in seconds
 
+// Silence snapping: look back at most this far from each nominal cut point
+export const SILENCE_SNAP_WINDOW = 20;
+const SILENCE_NOISE_DB = -35;
+const SILENCE_MIN_DURATION = 0.3;
+
+/**
+ * Thread cap for the audio-only ffmpeg passes (silencedetect, chunk encode).
+ * Without it ffmpeg sizes its pools from the host core count, and STT concurrency
+ * is sized assuming one busy core per job (see adaptive-concurrency.ts).
+ */
+export const STT_FFMPEG_THREADS = Math.max(1, parseInt(process.env.STT_FFMPEG_THREADS || '1', 10) || 1);
+
+/** Decoder + filter graph thread cap; goes before -i */
+const THREAD_ARGS = ['-threads', String(STT_FFMPEG_THREADS), '-filter_threads', String(STT_FFMPEG_THREADS)];
+
 export type AudioChunk = {
   path: string;
   offsetSeconds: number;
+  durationSeconds: number;
+};
+
+export type Silence = {
+  start: number;
+  end: number;
 };
 
 /**
- * Split audio into MP3 chunks for STT upload.
+ * Picks chunk cut points (seconds) for a file of totalDuration.
+ * Without silences, cuts land every chunkDuration seconds. With silences, each cut
+ * moves back to the middle of the latest silence within `window` seconds before
+ * the nominal cut, so words are not split and no chunk exceeds chunkDuration.
+ */
+export function chooseCutPoints(
+  totalDuration: number,
+  silences: Silence[] = [],
+  chunkDuration = CHUNK_DURATION,
+  window = SILENCE_SNAP_WINDOW,
+): number[] {
+  const cuts: number[] = [];
+  let chunkStart = 0;
+
+  while (chunkStart + chunkDuration < totalDuration) {
+    const target = chunkStart + chunkDuration;
+    let cut = target;
+
+    for (const silence of silences) {
+      const mid = (silence.start + silence.end) / 2;
+      if (mid > target) break;
+      if (mid >= target - window && mid > chunkStart) cut = mid;
+    }
+
+    cuts.push(Math.round(cut * 1000) / 1000);
+    chunkStart = cut;
+  }
+
+  return cuts;
+}
+
+/**
+ * Runs an audio-only silencedetect pass and returns detected silences, sorted.
+ * Decoding audio alone is far cheaper than the encode, but it is still a full
+ * read of the source -- only worth it when chunk boundaries matter.
+ */
+export async function detectSilences(inputPath: string, maxDurationSeconds: number): Promise<Silence[]> {
+  const args = [
+    '-hide_banner', '-nostats',
+    ...THREAD_ARGS,
+    '-i', inputPath,
+    '-t', String(maxDurationSeconds),
+    '-vn',
+    '-af', `silencedetect=noise=${SILENCE_NOISE_DB}dB:d=${SILENCE_MIN_DURATION}`,
+    '-f', 'null', '-',
+  ];
+
+  let stderr: string;
+  try {
+    const result = await execFileAsync('ffmpeg', args, {
+      timeout: Math.max(60_000, maxDurationSeconds * 50),
+      maxBuffer: 32 * 1024 * 1024,
+    });
+    stderr = result.stderr;
+  } catch (error) {
+    const err = error as { stderr?: string };
+    throw new Error(`FFmpeg silencedetect failed: ${(err.stderr ?? '').slice(-200)}`);
+  }
+
+  const silences: Silence[] = [];
+  let pendingStart: number | null = null;
+  for (const line of stderr.split('\n')) {
+    const startMatch = line.match(/silence_start: (-?[\d.]+)/);
+    if (startMatch) {
+      pendingStart = Math.max(0, parseFloat(startMatch[1]!));
+      continue;
+    }
+    const endMatch = line.match(/silence_end: ([\d.]+)/);
+    if (endMatch && pendingStart !== null) {
+      silences.push({ start: pendingStart, end: parseFloat(endMatch[1]!) });
+      pendingStart = null;
+    }
+  }
+  return silences;
+}
+
+/**
+ * Streams MP3 chunks for STT straight from the source video in a single ffmpeg pass
+ * (segment muxer, no intermediate WAV). Each chunk is yielded as soon as ffmpeg
+ * closes it, so transcription of chunk 0 overlaps encoding of chunk 1+.
+ *
+ * Offsets come from the segment list ffmpeg writes (actual segment start times),
+ * so transcript timestamps line up with the source exactly.
  * MP3 is ~10-15x smaller than WAV, reducing upload time and Cloud.ru timeouts.
- * Reference: https://github.com/dzhechko/stt-rag-app converts to MP3 before STT.
  */
-export async function splitAudio(
-  audioPath: string,
+export async function* streamAudioChunks(
+  inputPath: string,
   tmpDir: string,
   totalDuration: number,
-): Promise<AudioChunk[]> {
-  if (totalDuration <= CHUNK_DURATION) {
-    const mp3Path = path.join(tmpDir, 'chunk_0.mp3');
-    await execFFmpeg(
-      ['-i', audioPath, '-acodec', 'libmp3lame', '-q:a', '2', '-y', mp3Path],
-      60_000,
-    );
-    return [{ path: mp3Path, offsetSeconds: 0 }];
+  cutPoints: number[] = chooseCutPoints(totalDuration),
+  signal?: AbortSignal,
+): AsyncGenerator<AudioChunk> {
+  const args = [
+    '-y', '-hide_banner', '-nostdin', '-loglevel', 'error',
+    ...THREAD_ARGS,
+    '-i', inputPath,
+    '-t', String(totalDuration),
+    '-vn', '-ac', '1', '-ar', '16000',
+    '-acodec', 'libmp3lame', '-q:a', '2',
+    '-threads', String(STT_FFMPEG_THREADS),
+    '-f', 'segment',
+    '-reset_timestamps', '1',
+    '-segment_list', 'pipe:1',
+    '-segment_list_type', 'csv',
+  ];
+  if (cutPoints.length > 0) {
+    args.push('-segment_times', cutPoints.join(','));
+  } else {
+    // Single chunk: segment time past the end
+    args.push('-segment_time', String(Math.ceil(totalDuration) + 1));
   }
+  args.push(path.join(tmpDir, 'chunk_%04d.mp3'));
+
+  // Scale timeout: 120s minimum, +200ms per second of audio for large files
+  const timeoutMs = Math.max(120_000, totalDuration * 200);
+  // Aborting kills ffmpeg, which also ends a consumer's pending next()
+  const proc = spawn('ffmpeg', args, { stdio: ['ignore', 'pipe', 'pipe'], signal, killSignal: 'SIGKILL' });
+  const endTimer = audioExtractSeconds.startTimer({ mode: 'chunks' });
+
+  let stderr = '';
+  proc.stderr.on('data', (data: Buffer) => {
+    stderr = (stderr + data.toString()).slice(-4096);
+  });
+
+  const exited = new Promise<number | null>((resolve, reject) => {
+    proc.on('close', (code) => {
+      // Encode time of the whole pass, independent of how fast chunks are consumed
+      if (code === 0) endTimer();
+      resolve(code);
+    });
+    proc.on('error', reject);
+  });
+  // Surfaced via `await exited` below; avoid unhandled rejection if the consumer bails early
+  exited.catch(() => {});
 
-  const numChunks = Math.ceil(totalDuration / CHUNK_DURATION);
-  const chunks: AudioChunk[] = [];
-
-  for (let i = 0; i < numChunks; i++) {
-    const chunkPath = path.join(tmpDir, `chunk_${i}.mp3`);
-    const startSec = i * CHUNK_DURATION;
-    await execFFmpeg(
-      ['-i', audioPath, '-ss', String(startSec), '-t', String(CHUNK_DURATION),
-       '-acodec', 'libmp3lame', '-q:a', '2', '-y', chunkPath],
-      60_000,
-    );
-    chunks.push({ path: chunkPath, offsetSeconds: startSec });
+  const timeout = setTimeout(() => proc.kill('SIGKILL'), timeoutMs);
+  let count = 0;
+
+  try {
+    const lines = createInterface({ input: proc.stdout });
+    for await (const line of lines) {
+      // CSV entry: <filename>,<start_time>,<end_time>
+      const [file, start, end] = line.trim().split(',');
+      if (!file || start === undefined || end === undefined) continue;
+
+      const offsetSeconds = parseFloat(start);
+      const chunk: AudioChunk = {
+        path: path.join(tmpDir, path.basename(file)),
+        offsetSeconds,
+        durationSeconds: parseFloat(end) - offsetSeconds,
+      };
+      count++;
+      logger.debug({ event: 'audio_chunk_ready', index: count - 1, offsetSeconds });
+      yield chunk;
+    }
+
+    const code = await exited;
+    if (code !== 0) {
+      logger.error({ event: 'audio_chunk_ffmpeg_error', code, stderr: stderr.slice(-500) });
+      throw new Error(`FFmpeg chunking failed: ${stderr.slice(-200)}`);
+    }
+    logger.info({ event: 'audio_chunks_complete', count, totalDuration });
+  } finally {
+    clearTimeout(timeout);
+    // Consumer stopped early or errored: don't leave ffmpeg running
+    if (proc.exitCode === null && proc.signalCode === null) {
+      proc.kill('SIGKILL');
+    }
   }
+}
 
-  return chunks;
+/**
+ * Maps chunks from streamAudioChunks with bounded concurrency, results in chunk order.
+ * p-map does not close the source iterator when a mapper rejects, so the
+ * generator's cleanup would never run and ffmpeg would keep encoding. On any
+ * exit ffmpeg is killed and the generator closed before this settles.
+ */
+export async function mapAudioChunks<T>(
+  inputPath: string,
+  tmpDir: string,
+  totalDuration: number,
+  cutPoints: number[],
+  mapper: (chunk: AudioChunk) => Promise<T>,
+  options: { concurrency: number },
+): Promise<T[]> {
+  const abort = new AbortController();
+  const chunks = streamAudioChunks(inputPath, tmpDir, totalDuration, cutPoints, abort.signal);
+  try {
+    return await pMap(chunks, mapper, options);
+  } finally {
+    abort.abort();
+    await chunks.return(undefined);
+  }
 }
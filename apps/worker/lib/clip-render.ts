@@ -0,0 +1,116 @@
+import { writeFile, unlink, rename } from 'fs/promises';
+import path from 'path';
+import { createLogger } from './logger';
+import { uploadToS3 } from './s3-upload';
+import {
+  generateSubtitleFile,
+  buildFilterChain,
+  concatClipAndCta,
+  generateThumbnail,
+  type ClipFormat,
+  type CTA,
+  type SubtitleSegment,
+} from './ffmpeg';
+import type { CtaCardCache } from './render-batch';
+
+const logger = createLogger('clip-render');
+
+// Per-clip file steps shared by the single and batch render handlers (and the bench).
+// Database and queue state stay in workers/video-render.ts.
+
+export type ClipRenderSpec = {
+  clipId: string;
+  startTime: number;
+  endTime: number;
+  format: ClipFormat;
+  subtitleSegments: SubtitleSegment[];
+  cta?: CTA;
+};
+
+/**
+ * Writes the clip's ASS subtitle file (if it has segments) and builds its filter chain.
+ */
+export async function prepareFilterChain(tmpDir: string, clip: ClipRenderSpec, watermark: boolean): Promise<string> {
+  const clipDuration = clip.endTime - clip.startTime;
+
+  let assFilePath: string | null = null;
+  if (clip.subtitleSegments.length > 0) {
+    const assContent = generateSubtitleFile(clip.subtitleSegments, clipDuration, clip.format);
+    assFilePath = path.join(tmpDir, `subtitles-${clip.clipId}.ass`);
+    await writeFile(assFilePath, assContent, 'utf-8');
+    logger.info({ event: 'ass_generated', clipId: clip.clipId, segments: clip.subtitleSegments.length });
+  }
+
+  return buildFilterChain(clip.format, assFilePath, clip.cta ?? null, watermark, clipDuration);
+}
+
+export type ClipFilesInput = {
+  clipId: string;
+  renderedPath: string;
+  tmpDir: string;
+  clipDuration: number;
+  format: ClipFormat;
+  cta?: CTA;
+  ctaCards: CtaCardCache;
+  clipKey: string;
+  thumbnailKey: string;
+};
+
+/**
+ * Appends the CTA end card, generates the thumbnail and uploads both, then
+ * deletes the local files. Returns the thumbnail key, or null if the
+ * thumbnail could not be generated (non-fatal).
+ */
+export async function finishClipFiles(input: ClipFilesInput): Promise<string | null> {
+  const { clipId, renderedPath, tmpDir, clipDuration } = input;
+  const thumbnailLocal = path.join(tmpDir, `thumb-${clipId}.jpg`);
+
+  // CTA end card (if cta.position === 'end': reuse or generate card and concat)
+  if (input.cta && input.cta.position === 'end') {
+    const ctaCardPath = await input.ctaCards.get(input.cta, input.format);
+    const finalPath = path.join(tmpDir, `final-${clipId}.mp4`);
+
+    await concatClipAndCta(renderedPath, ctaCardPath, finalPath);
+
+    // Replace rendered clip with the final concatenated version
+    await unlink(renderedPath).catch(() => {});
+    await rename(finalPath, renderedPath);
+
+    logger.info({
+      event: 'cta_end_card_appended',
+      clipId,
+      ctaDuration: input.cta.duration,
+    });
+  }
+
+  // Generate thumbnail (non-fatal — proceed without if it fails)
+  const thumbnailTimeOffset = clipDuration * 0.25;
+  let thumbnailGenerated = false;
+  try {
+    await generateThumbnail(renderedPath, thumbnailLocal, thumbnailTimeOffset);
+    thumbnailGenerated = true;
+    logger.info({ event: 'thumbnail_generated', clipId });
+  } catch (thumbnailError) {
+    logger.warn({
+      event: 'thumbnail_failed',
+      clipId,
+      error: thumbnailError instanceof Error ? thumbnailError.message : thumbnailError,
+    });
+  }
+
+  // Upload rendered clip + thumbnail to S3
+  // Streamed from disk in bounded parts: memory per job is flat regardless of clip size
+  const upload = await uploadToS3(input.clipKey, renderedPath, { contentType: 'video/mp4' });
+  logger.info({ event: 's3_upload_clip', key: input.clipKey, sizeBytes: upload.sizeBytes, parts: upload.parts });
+
+  if (thumbnailGenerated) {
+    await uploadToS3(input.thumbnailKey, thumbnailLocal, { contentType: 'image/jpeg' });
+    logger.info({ event: 's3_upload_thumbnail', key: input.thumbnailKey });
+  }
+
+  // Free disk early — batch jobs keep the tmpdir for the whole video
+  await unlink(renderedPath).catch(() => {});
+  await unlink(thumbnailLocal).catch(() => {});
+
+  return thumbnailGenerated ? input.thumbnailKey : null;
+}
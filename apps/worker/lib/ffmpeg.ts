@@ -2,6 +2,14 @@ import { spawn, execFile as execFileCb } from 'child_process';
 import { promisify } from 'util';
 import { writeFile, unlink } from 'fs/promises';
 import { createLogger } from './logger';
+import {
+  timed,
+  ffprobeSeconds,
+  audioExtractSeconds,
+  renderSeconds,
+  renderedClips,
+  thumbnailSeconds,
+} from './metrics';
 
 const execFileAsync = promisify(execFileCb);
 const logger = createLogger('ffmpeg');
@@ -20,6 +28,19 @@ export const FORMAT_DIMENSIONS: Record<ClipFormat, { width: number; height: numb
 
 const FFMPEG_TIMEOUT = 5 * 60 * 1000; // 5 min
 
+/**
+ * Threads per render ffmpeg process (decode + filters + encode). Without a cap
+ * x264 and the filter graph each size themselves to every core on the node, so
+ * concurrent renders oversubscribe the CPU. Render concurrency is sized from this
+ * (see adaptive-concurrency.ts).
+ */
+export const FFMPEG_THREADS = Math.max(1, parseInt(process.env.FFMPEG_THREADS || '2', 10) || 2);
+
+/** Decoder + filter graph thread cap; goes before -i */
+function inputThreadArgs(): string[] {
+  return ['-threads', String(FFMPEG_THREADS), '-filter_threads', String(FFMPEG_THREADS)];
+}
+
 export type SubtitleSegment = {
   start: number;
   end: number;
@@ -44,6 +65,34 @@ type RenderOptions = {
   filterChain?: string;
 };
 
+export type ClipGroupOutput = {
+  outputPath: string;
+  startTime: number;
+  endTime: number;
+  filterChain: string;
+};
+
+type ClipGroupOptions = {
+  inputPath: string;
+  outputs: ClipGroupOutput[];
+  hasAudio: boolean;
+};
+
+// Shared by renderClip and renderClipGroup so end cards and concat stay stream-copyable
+const ENCODE_ARGS = [
+  '-c:v', 'libx264',
+  '-preset', 'fast',
+  '-crf', '23',
+  '-profile:v', 'high',
+  '-level', '4.1',
+  '-pix_fmt', 'yuv420p',
+  '-c:a', 'aac',
+  '-b:a', '128k',
+  '-ar', '44100',
+  '-ac', '2',
+  '-movflags', '+faststart',
+];
+
 // ---------------------------------------------------------------------------
 // Text Escaping Helpers
 // ---------------------------------------------------------------------------
@@ -394,7 +443,7 @@ export async function generateThumbnail(
     outputPath,
   ];
 
-  await execFFmpeg(args, 15_000);
+  await timed(thumbnailSeconds, {}, () => execFFmpeg(args, 15_000));
 }
 
 // ---------------------------------------------------------------------------
@@ -422,11 +471,11 @@ export async function execFFmpeg(args: string[], timeoutMs = 30_000): Promise<vo
 export async function ffprobeGetDuration(filePath: string): Promise<number> {
   let stdout: string;
   try {
-    const result = await execFileAsync(
+    const result = await timed(ffprobeSeconds, { probe: 'duration' }, () => execFileAsync(
       'ffprobe',
       ['-v', 'error', '-print_format', 'json', '-show_format', filePath],
       { timeout: 10_000 },
-    );
+    ));
     stdout = result.stdout;
   } catch (err: unknown) {
     const e = err as { stderr?: string; message?: string };
@@ -440,6 +489,25 @@ export async function ffprobeGetDuration(filePath: string): Promise<number> {
   return duration;
 }
 
+/**
+ * Checks whether a media file has at least one audio stream via ffprobe.
+ */
+export async function ffprobeHasAudio(filePath: string): Promise<boolean> {
+  let stdout: string;
+  try {
+    const result = await timed(ffprobeSeconds, { probe: 'audio' }, () => execFileAsync(
+      'ffprobe',
+      ['-v', 'error', '-select_streams', 'a', '-show_entries', 'stream=index', '-of', 'csv=p=0', filePath],
+      { timeout: 10_000 },
+    ));
+    stdout = result.stdout;
+  } catch (err: unknown) {
+    const e = err as { stderr?: string; message?: string };
+    throw new Error(`ffprobe failed: ${e.stderr || e.message}`);
+  }
+  return stdout.trim().length > 0;
+}
+
 /**
  * Extracts audio from a video file as 16kHz mono PCM WAV.
  * Timeout scales with file duration.
@@ -458,7 +526,7 @@ export async function extractAudio(
   const timeoutMs = maxDurationSeconds
     ? Math.max(120_000, maxDurationSeconds * 200)
     : 120_000;
-  await execFFmpeg(args, timeoutMs);
+  await timed(audioExtractSeconds, { mode: 'wav' }, () => execFFmpeg(args, timeoutMs));
 }
 
 /**
@@ -466,45 +534,104 @@ export async function extractAudio(
  * Supports an optional filterChain that replaces the default scale-only filter.
  * Uses bounded stderr buffer and configurable timeout.
  */
-export function renderClip(options: RenderOptions): Promise<void> {
-  return new Promise((resolve, reject) => {
-    const vf = options.filterChain ?? getScaleFilter(options.format);
-
-    const duration = options.endTime - options.startTime;
-    const args: string[] = [
-      '-y',
-      '-ss', String(options.startTime),
-      '-t', String(duration),
-      '-i', options.inputPath,
-      '-vf', vf,
-      '-c:v', 'libx264',
-      '-preset', 'fast',
-      '-crf', '23',
-      '-profile:v', 'high',
-      '-level', '4.1',
-      '-pix_fmt', 'yuv420p',
-      '-c:a', 'aac',
-      '-b:a', '128k',
-      '-ar', '44100',
-      '-ac', '2',
-      '-movflags', '+faststart',
-      options.outputPath,
-    ];
-
-    logger.info({
-      event: 'ffmpeg_start',
-      input: options.inputPath,
-      output: options.outputPath,
-      format: options.format,
-      duration: options.endTime - options.startTime,
-    });
+export async function renderClip(options: RenderOptions): Promise<void> {
+  const vf = options.filterChain ?? getScaleFilter(options.format);
+
+  const duration = options.endTime - options.startTime;
+  const args: string[] = [
+    '-y',
+    ...inputThreadArgs(),
+    '-ss', String(options.startTime),
+    '-t', String(duration),
+    '-i', options.inputPath,
+    '-vf', vf,
+    ...ENCODE_ARGS,
+    '-threads', String(FFMPEG_THREADS),
+    options.outputPath,
+  ];
+
+  logger.info({
+    event: 'ffmpeg_start',
+    input: options.inputPath,
+    output: options.outputPath,
+    format: options.format,
+    duration,
+  });
+
+  await timed(renderSeconds, { mode: 'single' }, () => spawnFFmpeg(args, FFMPEG_TIMEOUT));
+  renderedClips.inc({ mode: 'single' });
+  logger.info({ event: 'ffmpeg_complete', output: options.outputPath });
+}
+
+/**
+ * Renders several clips from one decode of the source.
+ * Seeks once to the earliest clip start, decodes the span covering all clips,
+ * and splits the decoded stream into per-clip trim + filter chains, each
+ * encoded to its own output. Clips must be close together in the source
+ * (see groupClipsForBatch) -- decoding a long gap costs more than a seek.
+ */
+export async function renderClipGroup(options: ClipGroupOptions): Promise<void> {
+  const { outputs } = options;
+  if (outputs.length === 0) return;
+
+  const groupStart = Math.min(...outputs.map((o) => o.startTime));
+  const groupEnd = Math.max(...outputs.map((o) => o.endTime));
+  const n = outputs.length;
+
+  const graph: string[] = [];
+  graph.push(`[0:v]split=${n}${outputs.map((_, i) => `[vs${i}]`).join('')}`);
+  if (options.hasAudio) {
+    graph.push(`[0:a]asplit=${n}${outputs.map((_, i) => `[as${i}]`).join('')}`);
+  }
+  outputs.forEach((o, i) => {
+    const trim = `start=${o.startTime - groupStart}:duration=${o.endTime - o.startTime}`;
+    graph.push(`[vs${i}]trim=${trim},setpts=PTS-STARTPTS,${o.filterChain}[v${i}]`);
+    if (options.hasAudio) {
+      graph.push(`[as${i}]atrim=${trim},asetpts=PTS-STARTPTS[a${i}]`);
+    }
+  });
 
+  const args: string[] = [
+    '-y',
+    ...inputThreadArgs(),
+    '-filter_complex_threads', String(FFMPEG_THREADS),
+    '-ss', String(groupStart),
+    '-t', String(groupEnd - groupStart),
+    '-i', options.inputPath,
+    '-filter_complex', graph.join(';'),
+  ];
+  // All encoders share the process budget so a group stays at ~FFMPEG_THREADS
+  const encoderThreads = String(Math.max(1, Math.floor(FFMPEG_THREADS / n)));
+  outputs.forEach((o, i) => {
+    args.push('-map', `[v${i}]`);
+    if (options.hasAudio) args.push('-map', `[a${i}]`);
+    args.push(...ENCODE_ARGS, '-threads', encoderThreads, o.outputPath);
+  });
+
+  logger.info({
+    event: 'ffmpeg_group_start',
+    input: options.inputPath,
+    clips: n,
+    spanSeconds: groupEnd - groupStart,
+  });
+
+  // Every output is encoded in the same process: budget the timeout per clip
+  await timed(renderSeconds, { mode: 'group' }, () => spawnFFmpeg(args, FFMPEG_TIMEOUT * n));
+  renderedClips.inc({ mode: 'group' }, n);
+  logger.info({ event: 'ffmpeg_group_complete', clips: n });
+}
+
+/**
+ * Spawns a long-running FFmpeg process with a bounded stderr buffer and a hard timeout.
+ */
+function spawnFFmpeg(args: string[], timeoutMs: number): Promise<void> {
+  return new Promise((resolve, reject) => {
     const proc = spawn('ffmpeg', args, { stdio: 'pipe' });
 
     const timeout = setTimeout(() => {
       proc.kill('SIGKILL');
       reject(new Error('FFmpeg timeout exceeded'));
-    }, FFMPEG_TIMEOUT);
+    }, timeoutMs);
 
     let stderr = '';
     const STDERR_MAX = 65536; // 64KB max — only need last ~500 chars for logging
@@ -518,7 +645,6 @@ export function renderClip(options: RenderOptions): Promise<void> {
     proc.on('close', (code) => {
       clearTimeout(timeout);
       if (code === 0) {
-        logger.info({ event: 'ffmpeg_complete', output: options.outputPath });
         resolve();
       } else {
         logger.error({ event: 'ffmpeg_error', code, stderr: stderr.slice(-500) });
@@ -0,0 +1,227 @@
+/**
+ * LLM Response Cache -- content-addressed completions in Redis
+ *
+ * Key: sha256 of (scope, model, tier, sampling options, messages). Scope is
+ * 'server' for platform keys and `byok:<userId>` for BYOK calls, so a user's
+ * BYOK results are never served to anyone else.
+ * Bounded by a per-entry TTL and a max entry count (oldest evicted first).
+ * Identical requests in flight in this process are coalesced into one call.
+ *
+ * Fail-open: Redis errors are logged and the request goes to the provider.
+ *
+ * Opt-in (LLM_CACHE_TTL_SECONDS > 0): a hit replays the stored answer even for
+ * sampled (temperature > 0) requests, so identical inputs stop producing
+ * varied results. Callers that want a new answer pass `refresh`.
+ */
+
+import { createHash } from 'crypto';
+import { Redis } from 'ioredis';
+import { createLogger } from './logger';
+import { llmCacheRequests, llmCacheSavedKopecks } from './metrics';
+
+const logger = createLogger('llm-cache');
+
+const CACHE_KEY_PREFIX = 'llmcache:';
+const CACHE_INDEX_KEY = 'llmcache:index'; // ZSET: key -> stored-at ms, for size bound
+const DEFAULT_TTL_SECONDS = 7 * 24 * 3600;
+const DEFAULT_MAX_ENTRIES = 20_000;
+
+// Atomic store + size bound: drop index entries whose values already expired,
+// then evict the oldest entries above maxEntries.
+// KEYS: [entry, index]  ARGV: [value, ttlSeconds, nowMs, maxEntries]
+const STORE_SCRIPT = `
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[3]) - tonumber(ARGV[2]) * 1000)
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if excess > 0 then
+  local evicted = redis.call('ZPOPMIN', KEYS[2], excess)
+  for i = 1, #evicted, 2 do
+    redis.call('DEL', evicted[i])
+  end
+end
+return excess
+`;
+
+export type CachedCompletion = {
+  content: string;
+  model: string;
+  inputTokens: number;
+  outputTokens: number;
+  /** Cost of the original provider call (what a cache hit saves) */
+  costKopecks: number;
+};
+
+export type LLMCacheKeyInput = {
+  scope: string;
+  model: string;
+  tier: number;
+  temperature: number;
+  maxTokens: number;
+  jsonMode: boolean;
+  messages: Array<{ role: string; content: string }>;
+};
+
+export type LLMCacheLookupOptions = {
+  /** Skip lookup and coalescing, always call the provider; the fresh result replaces the entry */
+  refresh?: boolean;
+  /** Only store results whose content passes this check (e.g. parses as the expected JSON) */
+  storeIf?: (content: string) => boolean;
+};
+
+export type LLMCacheStats = {
+  hits: number;
+  misses: number;
+  coalesced: number;
+  errors: number;
+  savedKopecks: number;
+  hitRate: number;
+};
+
+type CacheStore = Pick<Redis, 'get' | 'eval'>;
+
+export function llmCacheKey(input: LLMCacheKeyInput): string {
+  // Positional array: stable serialization regardless of object key order
+  const payload = JSON.stringify([
+    input.scope,
+    input.model,
+    input.tier,
+    input.temperature,
+    input.maxTokens,
+    input.jsonMode,
+    input.messages.map((m) => [m.role, m.content]),
+  ]);
+  return CACHE_KEY_PREFIX + createHash('sha256').update(payload).digest('hex');
+}
+
+export class LLMResponseCache {
+  private inflight = new Map<string, Promise<{ value: CachedCompletion; fromCache: boolean }>>();
+  private hits = 0;
+  private misses = 0;
+  private coalesced = 0;
+  private errors = 0;
+  private savedKopecks = 0;
+
+  constructor(
+    private store: CacheStore,
+    private ttlSeconds = DEFAULT_TTL_SECONDS,
+    private maxEntries = DEFAULT_MAX_ENTRIES,
+  ) {}
+
+  /**
+   * Returns the cached completion for `key`, or runs `compute` and stores the result.
+   * `cached` is true when no provider call was paid for by this caller
+   * (Redis hit or joined an identical in-flight request).
+   */
+  async getOrCompute(
+    key: string,
+    compute: () => Promise<CachedCompletion>,
+    options: LLMCacheLookupOptions = {},
+  ): Promise<{ value: CachedCompletion; cached: boolean }> {
+    if (options.refresh) {
+      const value = await compute();
+      this.misses++;
+      llmCacheRequests.inc({ result: 'refresh' });
+      await this.put(key, value, options.storeIf);
+      return { value, cached: false };
+    }
+
+    const pending = this.inflight.get(key);
+    if (pending) {
+      const { value } = await pending;
+      this.coalesced++;
+      this.savedKopecks += value.costKopecks;
+      llmCacheRequests.inc({ result: 'coalesced' });
+      llmCacheSavedKopecks.inc({}, value.costKopecks);
+      logger.debug({ event: 'llm_cache_coalesced', savedKopecks: value.costKopecks });
+      return { value, cached: true };
+    }
+
+    // Registered before the Redis lookup so concurrent callers join this request
+    const task = (async () => {
+      const hit = await this.get(key);
+      if (hit) return { value: hit, fromCache: true };
+      const value = await compute();
+      await this.put(key, value, options.storeIf);
+      return { value, fromCache: false };
+    })();
+    this.inflight.set(key, task);
+
+    try {
+      const { value, fromCache } = await task;
+      if (fromCache) {
+        this.hits++;
+        this.savedKopecks += value.costKopecks;
+        llmCacheRequests.inc({ result: 'hit' });
+        llmCacheSavedKopecks.inc({}, value.costKopecks);
+        logger.info({ event: 'llm_cache_hit', model: value.model, savedKopecks: value.costKopecks });
+      } else {
+        this.misses++;
+        llmCacheRequests.inc({ result: 'miss' });
+      }
+      return { value, cached: fromCache };
+    } finally {
+      this.inflight.delete(key);
+    }
+  }
+
+  getStats(): LLMCacheStats {
+    const served = this.hits + this.coalesced;
+    const total = served + this.misses;
+    return {
+      hits: this.hits,
+      misses: this.misses,
+      coalesced: this.coalesced,
+      errors: this.errors,
+      savedKopecks: this.savedKopecks,
+      hitRate: total > 0 ? served / total : 0,
+    };
+  }
+
+  private async get(key: string): Promise<CachedCompletion | null> {
+    try {
+      const raw = await this.store.get(key);
+      return raw ? (JSON.parse(raw) as CachedCompletion) : null;
+    } catch (error) {
+      this.errors++;
+      logger.warn({ event: 'llm_cache_read_failed', error: error instanceof Error ? error.message : String(error) });
+      return null;
+    }
+  }
+
+  private async put(
+    key: string,
+    value: CachedCompletion,
+    storeIf?: (content: string) => boolean,
+  ): Promise<void> {
+    if (!value.content || (storeIf && !storeIf(value.content))) return;
+    try {
+      await this.store.eval(
+        STORE_SCRIPT,
+        2,
+        key,
+        CACHE_INDEX_KEY,
+        JSON.stringify(value),
+        this.ttlSeconds,
+        Date.now(),
+        this.maxEntries,
+      );
+    } catch (error) {
+      this.errors++;
+      logger.warn({ event: 'llm_cache_write_failed', error: error instanceof Error ? error.message : String(error) });
+    }
+  }
+}
+
+/**
+ * Build the cache from env. Off unless LLM_CACHE_TTL_SECONDS is set above 0.
+ */
+export function createLLMResponseCacheFromEnv(): LLMResponseCache | undefined {
+  const ttlSeconds = parseInt(process.env.LLM_CACHE_TTL_SECONDS || '0', 10);
+  if (!(ttlSeconds > 0)) return undefined;
+  const maxEntries = parseInt(process.env.LLM_CACHE_MAX_ENTRIES || String(DEFAULT_MAX_ENTRIES), 10);
+
+  const url = process.env.REDIS_URL || 'redis://localhost:6379';
+  const redis = new Redis(url, { maxRetriesPerRequest: 3 });
+  return new LLMResponseCache(redis, ttlSeconds, maxEntries > 0 ? maxEntries : DEFAULT_MAX_ENTRIES);
+}
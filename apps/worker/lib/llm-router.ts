@@ -3,6 +3,9 @@ import type { LLMTask, LLMTier, LLMStrategy, LLMModelConfig, ByokKeys } from '@c
 import { LLM_PROVIDER_TO_BYOK } from '@clipmaker/types';
 import { LLM_PROVIDERS, OPENROUTER_MODEL_MAP, OPENROUTER_BASE_URL } from '@clipmaker/config';
 import { createLogger } from './logger';
+import { llmCacheKey } from './llm-cache';
+import { llmRequestSeconds, llmCostKopecks } from './metrics';
+import type { LLMResponseCache, CachedCompletion, LLMCacheStats } from './llm-cache';
 
 const logger = createLogger('llm-router');
 
@@ -12,6 +15,21 @@ type RoutingContext = {
   tokenCount?: number;
   planId?: string;
   previousScore?: number;
+  /** Owner of the request; required to cache BYOK calls (cache entries are per user) */
+  userId?: string;
+};
+
+/** 'refresh': skip the cache lookup and call the provider; the new result replaces the entry */
+export type LLMCacheMode = 'default' | 'refresh';
+
+type CompleteOptions = {
+  temperature?: number;
+  maxTokens?: number;
+  jsonMode?: boolean;
+  /** 'refresh': skip the cache lookup (e.g. retry after a parse failure), store the new result */
+  cache?: LLMCacheMode;
+  /** Only cache responses whose content passes this check */
+  cacheIf?: (content: string) => boolean;
 };
 
 type ResolvedKey = {
@@ -29,6 +47,9 @@ type LLMResponse = {
   durationMs: number;
   usedByokKey: boolean;
   viaOpenRouter?: boolean;
+  /** Served from the response cache: costKopecks is 0, savedKopecks is the original cost */
+  cached: boolean;
+  savedKopecks: number;
 };
 
 export class LLMRouter {
@@ -37,8 +58,13 @@ export class LLMRouter {
   constructor(
     private cloudruApiKey?: string,
     private globalKeys?: { gemini?: string; anthropic?: string; openai?: string; openrouter?: string },
+    private cache?: LLMResponseCache,
   ) {}
 
+  getCacheStats(): LLMCacheStats | null {
+    return this.cache?.getStats() ?? null;
+  }
+
   /** Check if a native (non-OpenRouter) server key exists for a provider */
   private hasNativeServerKey(provider: string): boolean {
     switch (provider) {
@@ -173,7 +199,7 @@ export class LLMRouter {
   async complete(
     context: RoutingContext,
     messages: Array<{ role: 'system' | 'user' | 'assistant'; content: string }>,
-    options?: { temperature?: number; maxTokens?: number; jsonMode?: boolean },
+    options?: CompleteOptions,
     byokKeys?: ByokKeys,
   ): Promise<LLMResponse> {
     const tier = context.task === 'transcription' ? 1 : (context as RoutingContext & { forceTier?: LLMTier }).forceTier ?? this.selectTier(context);
@@ -197,16 +223,19 @@ export class LLMRouter {
     // Anthropic does not support response_format via OpenAI-compatible API
     const supportsJsonMode = modelConfig.provider !== 'anthropic';
 
-    try {
+    const temperature = options?.temperature ?? 0.3;
+    const maxTokens = options?.maxTokens ?? 4096;
+    const jsonMode = !!options?.jsonMode && supportsJsonMode;
+
+    const callProvider = async (): Promise<CachedCompletion> => {
       const response = await client.chat.completions.create({
         model: modelName,
         messages,
-        temperature: options?.temperature ?? 0.3,
-        max_tokens: options?.maxTokens ?? 4096,
-        ...(options?.jsonMode && supportsJsonMode ? { response_format: { type: 'json_object' as const } } : {}),
+        temperature,
+        max_tokens: maxTokens,
+        ...(jsonMode ? { response_format: { type: 'json_object' as const } } : {}),
       });
 
-      const durationMs = Date.now() - startTime;
       const usage = response.usage;
       const inputTokens = usage?.prompt_tokens ?? 0;
       const outputTokens = usage?.completion_tokens ?? 0;
@@ -218,30 +247,62 @@ export class LLMRouter {
             (inputTokens * modelConfig.costInput + outputTokens * modelConfig.costOutput) / 1_000_000,
           );
 
+      return {
+        content: response.choices[0]?.message?.content || '',
+        model: modelName,
+        inputTokens,
+        outputTokens,
+        costKopecks,
+      };
+    };
+
+    // BYOK results are cached per user; without a userId they are not cached at all
+    const cacheScope = !usedByokKey ? 'server' : context.userId ? `byok:${context.userId}` : null;
+
+    try {
+      const { value, cached } = this.cache && cacheScope
+        ? await this.cache.getOrCompute(
+            llmCacheKey({ scope: cacheScope, model: modelName, tier, temperature, maxTokens, jsonMode, messages }),
+            callProvider,
+            { refresh: options?.cache === 'refresh', storeIf: options?.cacheIf },
+          )
+        : { value: await callProvider(), cached: false };
+
+      const durationMs = Date.now() - startTime;
+      const costKopecks = cached ? 0 : value.costKopecks;
+      const savedKopecks = cached ? value.costKopecks : 0;
+
+      llmRequestSeconds.observe({ task: context.task, tier, cached }, durationMs / 1000);
+      llmCostKopecks.inc({ task: context.task, tier }, costKopecks);
+
       logger.info({
         event: 'llm_complete',
         model: modelName,
         tier,
         strategy: context.strategy,
         task: context.task,
-        inputTokens,
-        outputTokens,
+        inputTokens: value.inputTokens,
+        outputTokens: value.outputTokens,
         costKopecks,
         durationMs,
         usedByokKey,
         viaOpenRouter: useOpenRouter,
+        cached,
+        savedKopecks,
       });
 
       return {
-        content: response.choices[0]?.message?.content || '',
+        content: value.content,
         model: modelName,
         tier,
-        inputTokens,
-        outputTokens,
+        inputTokens: value.inputTokens,
+        outputTokens: value.outputTokens,
         costKopecks,
         durationMs,
         usedByokKey,
         viaOpenRouter: useOpenRouter,
+        cached,
+        savedKopecks,
       };
     } catch (error) {
       const errInfo = error instanceof Error
@@ -0,0 +1,28 @@
+import { createServer, type Server } from 'http';
+import { renderMetrics } from './metrics';
+import { createLogger } from './logger';
+
+const logger = createLogger('metrics-server');
+
+/**
+ * Serves GET /metrics (Prometheus text format) for this worker process.
+ * Bind to an internal interface only -- there is no authentication.
+ */
+export function startMetricsServer(port: number, host = '0.0.0.0'): Server {
+  const server = createServer((req, res) => {
+    if (req.method === 'GET' && req.url?.split('?')[0] === '/metrics') {
+      res.writeHead(200, { 'Content-Type': 'text/plain; version=0.0.4; charset=utf-8' });
+      res.end(renderMetrics());
+      return;
+    }
+    res.writeHead(404).end();
+  });
+
+  server.on('error', (err) => {
+    logger.error({ event: 'metrics_server_error', port, error: err.message });
+  });
+  server.listen(port, host, () => {
+    logger.info({ event: 'metrics_server_listening', host, port });
+  });
+  return server;
+}
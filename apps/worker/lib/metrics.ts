@@ -0,0 +1,245 @@
+/**
+ * In-process pipeline metrics (Prometheus text exposition format).
+ *
+ * Counters and histograms are plain in-memory maps keyed by label set; the
+ * worker serves them from GET /metrics (see metrics-server.ts) and the offline
+ * benchmark reads them via metricsSnapshot(). No external client library:
+ * the worker only needs counters, histograms and the text format.
+ */
+
+import type { Job, Worker } from 'bullmq';
+
+type LabelValue = string | number | boolean;
+export type Labels = Record<string, LabelValue>;
+
+type Metric = Counter | Histogram;
+
+const registry: Metric[] = [];
+
+/** Seconds; spans a thumbnail (~0.1s) up to a multi-hour STT job */
+const DURATION_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600];
+
+function labelKey(labels: Labels): string {
+  return Object.keys(labels)
+    .sort()
+    .map((k) => `${k}="${String(labels[k]).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`)
+    .join(',');
+}
+
+function withLabels(name: string, key: string): string {
+  return key ? `${name}{${key}}` : name;
+}
+
+export type SeriesSnapshot = { labels: string; value: number } | { labels: string; count: number; sum: number };
+
+export class Counter {
+  readonly type = 'counter';
+  private values = new Map<string, number>();
+
+  constructor(readonly name: string, readonly help: string) {
+    registry.push(this);
+  }
+
+  inc(labels: Labels = {}, value = 1): void {
+    if (value < 0) return;
+    const key = labelKey(labels);
+    this.values.set(key, (this.values.get(key) ?? 0) + value);
+  }
+
+  render(): string[] {
+    return Array.from(this.values, ([key, value]) => `${withLabels(this.name, key)} ${value}`);
+  }
+
+  snapshot(): SeriesSnapshot[] {
+    return Array.from(this.values, ([labels, value]) => ({ labels, value }));
+  }
+
+  reset(): void {
+    this.values.clear();
+  }
+}
+
+type HistogramSeries = { counts: number[]; sum: number; count: number };
+
+export class Histogram {
+  readonly type = 'histogram';
+  private series = new Map<string, HistogramSeries>();
+
+  constructor(
+    readonly name: string,
+    readonly help: string,
+    readonly buckets: number[] = DURATION_BUCKETS,
+  ) {
+    registry.push(this);
+  }
+
+  observe(labels: Labels, value: number): void {
+    if (!Number.isFinite(value)) return;
+    const key = labelKey(labels);
+    let series = this.series.get(key);
+    if (!series) {
+      series = { counts: new Array<number>(this.buckets.length).fill(0), sum: 0, count: 0 };
+      this.series.set(key, series);
+    }
+    for (let i = 0; i < this.buckets.length; i++) {
+      if (value <= this.buckets[i]!) series.counts[i]!++;
+    }
+    series.sum += value;
+    series.count++;
+  }
+
+  /** Starts a wall-clock timer; calling the returned function observes and returns elapsed seconds */
+  startTimer(labels: Labels = {}): () => number {
+    const start = process.hrtime.bigint();
+    return () => {
+      const seconds = Number(process.hrtime.bigint() - start) / 1e9;
+      this.observe(labels, seconds);
+      return seconds;
+    };
+  }
+
+  render(): string[] {
+    const lines: string[] = [];
+    for (const [key, series] of this.series) {
+      const sep = key ? ',' : '';
+      this.buckets.forEach((le, i) => {
+        lines.push(`${this.name}_bucket{${key}${sep}le="${le}"} ${series.counts[i]}`);
+      });
+      lines.push(`${this.name}_bucket{${key}${sep}le="+Inf"} ${series.count}`);
+      lines.push(`${withLabels(`${this.name}_sum`, key)} ${series.sum}`);
+      lines.push(`${withLabels(`${this.name}_count`, key)} ${series.count}`);
+    }
+    return lines;
+  }
+
+  snapshot(): SeriesSnapshot[] {
+    return Array.from(this.series, ([labels, s]) => ({ labels, count: s.count, sum: s.sum }));
+  }
+
+  reset(): void {
+    this.series.clear();
+  }
+}
+
+/** Times `fn` into `histogram` (observed on success and on failure) */
+export async function timed<T>(histogram: Histogram, labels: Labels, fn: () => Promise<T>): Promise<T> {
+  const end = histogram.startTimer(labels);
+  try {
+    return await fn();
+  } finally {
+    end();
+  }
+}
+
+export function renderMetrics(): string {
+  const lines: string[] = [];
+  for (const metric of registry) {
+    lines.push(`# HELP ${metric.name} ${metric.help}`);
+    lines.push(`# TYPE ${metric.name} ${metric.type}`);
+    lines.push(...metric.render());
+  }
+  return lines.join('\n') + '\n';
+}
+
+export function metricsSnapshot(): Record<string, { type: string; series: SeriesSnapshot[] }> {
+  return Object.fromEntries(
+    registry.map((m) => [m.name, { type: m.type, series: m.snapshot() }]),
+  );
+}
+
+export function resetMetrics(): void {
+  for (const metric of registry) metric.reset();
+}
+
+// ---------------------------------------------------------------------------
+// Pipeline metrics
+// ---------------------------------------------------------------------------
+
+export const s3TransferSeconds = new Histogram(
+  'clipmaker_s3_transfer_duration_seconds',
+  'S3 object transfer wall time by direction (download|upload)',
+);
+export const s3TransferBytes = new Counter(
+  'clipmaker_s3_transfer_bytes_total',
+  'Bytes transferred to/from S3 by direction (download|upload)',
+);
+export const ffprobeSeconds = new Histogram(
+  'clipmaker_ffprobe_duration_seconds',
+  'ffprobe wall time by probe (duration|audio)',
+);
+export const audioExtractSeconds = new Histogram(
+  'clipmaker_audio_extract_duration_seconds',
+  'Audio extraction wall time by mode (wav|chunks)',
+);
+export const sttChunkSeconds = new Histogram(
+  'clipmaker_stt_chunk_duration_seconds',
+  'Transcription wall time per audio chunk (including retries) by strategy',
+);
+export const sttAudioSeconds = new Counter(
+  'clipmaker_stt_audio_seconds_total',
+  'Seconds of audio transcribed by strategy',
+);
+export const llmRequestSeconds = new Histogram(
+  'clipmaker_llm_request_duration_seconds',
+  'LLMRouter.complete wall time by task, tier and cache hit',
+);
+export const llmCostKopecks = new Counter(
+  'clipmaker_llm_cost_kopecks_total',
+  'LLM spend in kopecks by task and tier',
+);
+export const renderSeconds = new Histogram(
+  'clipmaker_render_duration_seconds',
+  'FFmpeg clip render wall time by mode (single|group)',
+);
+export const renderedClips = new Counter(
+  'clipmaker_rendered_clips_total',
+  'Clips encoded by mode (single|group)',
+);
+export const thumbnailSeconds = new Histogram(
+  'clipmaker_thumbnail_duration_seconds',
+  'Thumbnail extraction wall time',
+);
+export const llmCacheRequests = new Counter(
+  'clipmaker_llm_cache_requests_total',
+  'LLM response cache lookups by result (hit|miss|coalesced|refresh)',
+);
+export const llmCacheSavedKopecks = new Counter(
+  'clipmaker_llm_cache_saved_kopecks_total',
+  'Provider cost avoided by LLM cache hits and coalesced requests',
+);
+export const sourceCacheRequests = new Counter(
+  'clipmaker_source_cache_requests_total',
+  'Node source cache acquires by result (hit|miss|coalesced)',
+);
+export const sourceCacheEvictions = new Counter(
+  'clipmaker_source_cache_evictions_total',
+  'Source files evicted from the node cache',
+);
+export const queueWaitSeconds = new Histogram(
+  'clipmaker_queue_wait_seconds',
+  'Time from enqueue (plus delay) to first processing attempt by queue',
+);
+export const jobSeconds = new Histogram(
+  'clipmaker_job_duration_seconds',
+  'Job processing wall time by queue and outcome',
+);
+
+/** Records queue wait and job duration for every job a BullMQ worker processes */
+export function instrumentWorker(worker: Worker): void {
+  const queue = worker.name;
+
+  worker.on('active', (job: Job) => {
+    // Retries include backoff delays; only the first attempt measures queueing
+    if (job.attemptsMade > 0 || !job.processedOn) return;
+    const readyAt = job.timestamp + (job.opts.delay ?? 0);
+    queueWaitSeconds.observe({ queue }, Math.max(0, job.processedOn - readyAt) / 1000);
+  });
+
+  const observeJob = (job: Job | undefined, status: 'completed' | 'failed') => {
+    if (!job?.processedOn) return;
+    const finishedOn = job.finishedOn ?? Date.now();
+    jobSeconds.observe({ queue, status }, Math.max(0, finishedOn - job.processedOn) / 1000);
+  };
+  worker.on('completed', (job) => observeJob(job, 'completed'));
+  worker.on('failed', (job) => observeJob(job, 'failed'));
+}
@@ -0,0 +1,92 @@
+import { createHash } from 'crypto';
+import path from 'path';
+import { generateCtaEndCard, FORMAT_DIMENSIONS, type ClipFormat, type CTA } from './ffmpeg';
+
+// One job per clip group; groups of one clip are plain 'render' jobs
+export const RENDER_BATCH_JOB_NAME = 'render-batch';
+
+// Clips closer than this are decoded in one pass; beyond it a seek is cheaper
+export const GROUP_MAX_GAP_SECONDS = 10;
+// Each clip in a group is a parallel x264 encode in the same ffmpeg process
+export const GROUP_MAX_CLIPS = 4;
+// split/asplit queue decoded frames for encoders that fall behind, so the span
+// bounds a group's memory. One max-length clip (180s) plus a short neighbour.
+export const GROUP_MAX_SPAN_SECONDS = 240;
+
+type TimeRange = { startTime: number; endTime: number };
+
+/**
+ * Groups clips into single-decode render passes.
+ * Clips are sorted by start time and merged while the next clip starts within
+ * GROUP_MAX_GAP_SECONDS of the group's end, the group has room, and the decoded
+ * span stays under GROUP_MAX_SPAN_SECONDS. Overlapping clips (common when the
+ * LLM picks adjacent moments) always share a decode.
+ */
+export function groupClipsForBatch<T extends TimeRange>(
+  clips: T[],
+  opts: { maxGapSeconds?: number; maxClips?: number; maxSpanSeconds?: number } = {},
+): T[][] {
+  const maxGap = opts.maxGapSeconds ?? GROUP_MAX_GAP_SECONDS;
+  const maxClips = opts.maxClips ?? GROUP_MAX_CLIPS;
+  const maxSpan = opts.maxSpanSeconds ?? GROUP_MAX_SPAN_SECONDS;
+
+  const sorted = [...clips].sort((a, b) => a.startTime - b.startTime);
+  const groups: T[][] = [];
+  let current: T[] = [];
+  let groupStart = 0;
+  let groupEnd = 0;
+
+  for (const clip of sorted) {
+    const fits =
+      current.length > 0 &&
+      current.length < maxClips &&
+      clip.startTime <= groupEnd + maxGap &&
+      Math.max(groupEnd, clip.endTime) - groupStart <= maxSpan;
+
+    if (fits) {
+      current.push(clip);
+      groupEnd = Math.max(groupEnd, clip.endTime);
+    } else {
+      if (current.length > 0) groups.push(current);
+      current = [clip];
+      groupStart = clip.startTime;
+      groupEnd = clip.endTime;
+    }
+  }
+  if (current.length > 0) groups.push(current);
+
+  return groups;
+}
+
+/**
+ * Per-batch cache of CTA end cards keyed by (text, format, duration).
+ * Identical cards are encoded once and concatenated onto every clip that uses them.
+ * Concurrent requests for the same card share one encode.
+ */
+export class CtaCardCache {
+  private cards = new Map<string, Promise<string>>();
+
+  constructor(private readonly dir: string) {}
+
+  get(cta: CTA, format: ClipFormat): Promise<string> {
+    const key = createHash('sha256')
+      .update(JSON.stringify([cta.text, format, cta.duration]))
+      .digest('hex')
+      .slice(0, 16);
+
+    const existing = this.cards.get(key);
+    if (existing) return existing;
+
+    const { width, height } = FORMAT_DIMENSIONS[format];
+    const cardPath = path.join(this.dir, `cta-${key}.mp4`);
+    const promise = generateCtaEndCard(cta, width, height, cardPath).then(() => cardPath);
+    // Failed encodes are not cached so the next clip retries
+    promise.catch(() => this.cards.delete(key));
+    this.cards.set(key, promise);
+    return promise;
+  }
+
+  get size(): number {
+    return this.cards.size;
+  }
+}
@@ -3,14 +3,18 @@ import { stat } from 'fs/promises';
 import { pipeline } from 'stream/promises';
 import { getObjectStream } from '@clipmaker/s3';
 import { createLogger } from './logger';
+import { s3TransferBytes, s3TransferSeconds } from './metrics';
 
 const logger = createLogger('s3-download');
 
 export async function downloadFromS3(s3Key: string, localPath: string): Promise<void> {
   logger.info({ event: 's3_download_start', key: s3Key });
+  const endTimer = s3TransferSeconds.startTimer({ direction: 'download' });
   const readable = await getObjectStream(s3Key);
   const writable = createWriteStream(localPath);
   await pipeline(readable, writable);
+  const durationSeconds = endTimer();
   const { size } = await stat(localPath);
-  logger.info({ event: 's3_download_complete', key: s3Key, path: localPath, sizeBytes: size });
+  s3TransferBytes.inc({ direction: 'download' }, size);
+  logger.info({ event: 's3_download_complete', key: s3Key, path: localPath, sizeBytes: size, durationSeconds });
 }
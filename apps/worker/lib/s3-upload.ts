@@ -0,0 +1,16 @@
+import type { Readable } from 'stream';
+import { uploadStream, type UploadStreamOptions, type UploadStreamResult } from '@clipmaker/s3';
+import { s3TransferBytes, s3TransferSeconds } from './metrics';
+
+/** uploadStream with transfer time/bytes recorded in the worker metrics */
+export async function uploadToS3(
+  key: string,
+  source: string | Readable,
+  options: UploadStreamOptions,
+): Promise<UploadStreamResult> {
+  const endTimer = s3TransferSeconds.startTimer({ direction: 'upload' });
+  const result = await uploadStream(key, source, options);
+  endTimer();
+  s3TransferBytes.inc({ direction: 'upload' }, result.sizeBytes);
+  return result;
+}
@@ -0,0 +1,415 @@
+/**
+ * Source Video Cache -- node-local, content-addressed cache of S3 source files
+ *
+ * Render jobs for the same video (one per clip) and the STT job all need the
+ * same source file. Instead of pulling it from S3 into a fresh tmpdir per job,
+ * workers acquire a shared local copy. The cache directory and its byte budget
+ * are shared by every worker process on the node (e.g. role-split STT and
+ * render processes):
+ * - objects/<sha256(key)><ext>  cached files (source keys are immutable)
+ * - locks/<sha256>.lock         held while a file is downloaded or evicted
+ * - refs/<sha256>/<owner>-<n>   one marker per hold; owner = "<pid>-<random>"
+ *
+ * - Concurrent acquires in one process share one in-flight download; a process
+ *   that finds another process downloading waits for it instead of re-downloading
+ * - A held file is never evicted: eviction takes the file's lock and skips it if
+ *   any live process has a marker. Acquirers write their marker before checking
+ *   the lock, so a file found present cannot be deleted underneath them
+ * - Unheld files are evicted oldest-first (acquires touch mtime) once the
+ *   node-wide total exceeds the budget
+ * - Markers, locks and partial downloads of dead processes are ignored and pruned
+ *
+ * The directory must only be shared by processes in one PID namespace (same
+ * host or pod), since liveness is checked by pid.
+ */
+
+import { createHash, randomBytes } from 'crypto';
+import { mkdir, open, readFile, readdir, rename, rmdir, stat, unlink, utimes, writeFile } from 'fs/promises';
+import path from 'path';
+import os from 'os';
+import { setTimeout as sleep } from 'timers/promises';
+import { downloadFromS3 } from './s3-download';
+import { createLogger } from './logger';
+import { sourceCacheEvictions, sourceCacheRequests } from './metrics';
+
+const logger = createLogger('source-cache');
+
+const DEFAULT_CACHE_DIR = path.join(os.tmpdir(), 'clipmaker-source-cache');
+const DEFAULT_MAX_BYTES = 20 * 1024 * 1024 * 1024; // 20GB per node
+const LOCK_POLL_MS = 100;
+
+type HeldEntry = {
+  key: string;
+  path: string;
+  markerPath: string;
+  refs: number;
+};
+
+type InflightLoad = {
+  promise: Promise<HeldEntry>;
+  waiters: number;
+};
+
+export type SourceHandle = {
+  path: string;
+  release: () => void;
+};
+
+export type SourceCacheStats = {
+  hits: number;
+  misses: number;
+  inflightHits: number;
+  /** Acquires that waited for another process's download or eviction */
+  waits: number;
+  evictions: number;
+  /** Node-wide, as of the last scan */
+  entries: number;
+  bytes: number;
+  maxBytes: number;
+};
+
+export class SourceCache {
+  private held = new Map<string, HeldEntry>();
+  private inflight = new Map<string, InflightLoad>();
+  private ready: Promise<void> | null = null;
+  // Marker removal and eviction scans run one at a time, in order
+  private maintenance: Promise<void> = Promise.resolve();
+  private readonly owner = `${process.pid}-${randomBytes(4).toString('hex')}`;
+  private markerSeq = 0;
+  private readonly objectsDir: string;
+  private readonly locksDir: string;
+  private readonly refsDir: string;
+
+  private hits = 0;
+  private misses = 0;
+  private inflightHits = 0;
+  private waits = 0;
+  private evictions = 0;
+  private lastScan = { entries: 0, bytes: 0 };
+
+  constructor(
+    private readonly dir: string = DEFAULT_CACHE_DIR,
+    private readonly maxBytes: number = DEFAULT_MAX_BYTES,
+    private readonly download: (s3Key: string, localPath: string) => Promise<void> = downloadFromS3,
+  ) {
+    this.objectsDir = path.join(dir, 'objects');
+    this.locksDir = path.join(dir, 'locks');
+    this.refsDir = path.join(dir, 'refs');
+  }
+
+  /**
+   * Acquire a local path for an S3 source key. The caller MUST call release()
+   * once every process reading the file has exited (typically in `finally`).
+   */
+  async acquire(s3Key: string): Promise<SourceHandle> {
+    await this.init();
+
+    const key = createHash('sha256').update(s3Key).digest('hex');
+    // Refs are taken synchronously with the lookup (or when the load lands),
+    // so a concurrent release() can never drop the marker before handoff
+    const entry = await this.lookupOrLoad(s3Key, key);
+
+    let released = false;
+    return {
+      path: entry.path,
+      release: () => {
+        if (released) return;
+        released = true;
+        this.release(entry);
+      },
+    };
+  }
+
+  getStats(): SourceCacheStats {
+    return {
+      hits: this.hits,
+      misses: this.misses,
+      inflightHits: this.inflightHits,
+      waits: this.waits,
+      evictions: this.evictions,
+      entries: this.lastScan.entries,
+      bytes: this.lastScan.bytes,
+      maxBytes: this.maxBytes,
+    };
+  }
+
+  private init(): Promise<void> {
+    if (!this.ready) {
+      this.ready = (async () => {
+        await mkdir(this.dir, { recursive: true });
+        await Promise.all([this.objectsDir, this.locksDir, this.refsDir].map((d) => mkdir(d, { recursive: true })));
+      })();
+    }
+    return this.ready;
+  }
+
+  private async lookupOrLoad(s3Key: string, key: string): Promise<HeldEntry> {
+    const held = this.held.get(key);
+    if (held) {
+      held.refs++;
+      this.hits++;
+      sourceCacheRequests.inc({ result: 'hit' });
+      logger.debug({ event: 'source_cache_hit', key: s3Key });
+      return held;
+    }
+
+    const pending = this.inflight.get(key);
+    if (pending) {
+      pending.waiters++;
+      this.inflightHits++;
+      sourceCacheRequests.inc({ result: 'coalesced' });
+      logger.debug({ event: 'source_cache_inflight_hit', key: s3Key });
+      return pending.promise;
+    }
+
+    const load: InflightLoad = {
+      promise: this.load(s3Key, key).finally(() => {
+        this.inflight.delete(key);
+      }),
+      waiters: 1,
+    };
+    this.inflight.set(key, load);
+    return load.promise;
+  }
+
+  private async load(s3Key: string, key: string): Promise<HeldEntry> {
+    const objectPath = path.join(this.objectsDir, `${key}${path.extname(s3Key) || '.mp4'}`);
+
+    // Marker first: from here on no process may evict the object
+    const markerPath = path.join(this.refsDir, key, `${this.owner}-${this.markerSeq++}`);
+    await writeMarker(markerPath);
+
+    let downloaded = false;
+    try {
+      let waited = false;
+      for (;;) {
+        if (await this.isLocked(key)) {
+          // Another process is downloading or evicting this file
+          if (!waited) this.waits++;
+          waited = true;
+          await sleep(LOCK_POLL_MS);
+          continue;
+        }
+        if (await exists(objectPath)) {
+          const now = new Date();
+          await utimes(objectPath, now, now);
+          break;
+        }
+        if (await this.tryLock(key)) {
+          try {
+            await this.fetch(s3Key, objectPath);
+            downloaded = true;
+          } finally {
+            await this.unlock(key);
+          }
+          break;
+        }
+      }
+    } catch (error) {
+      await unlink(markerPath).catch(() => {});
+      throw error;
+    }
+
+    if (downloaded) {
+      this.misses++;
+      sourceCacheRequests.inc({ result: 'miss' });
+    } else {
+      this.hits++;
+      sourceCacheRequests.inc({ result: 'hit' });
+      logger.debug({ event: 'source_cache_hit', key: s3Key });
+    }
+
+    // Every acquirer that joined this load holds a ref from the start
+    const waiters = this.inflight.get(key)?.waiters ?? 1;
+    const entry: HeldEntry = { key, path: objectPath, markerPath, refs: waiters };
+    this.held.set(key, entry);
+
+    if (downloaded) await this.maintain(() => this.evict());
+    return entry;
+  }
+
+  private async fetch(s3Key: string, objectPath: string): Promise<void> {
+    const partialPath = `${objectPath}.partial-${this.owner}`;
+    try {
+      await this.download(s3Key, partialPath);
+      await rename(partialPath, objectPath);
+    } catch (error) {
+      await unlink(partialPath).catch(() => {});
+      throw error;
+    }
+
+    const { size } = await stat(objectPath);
+    logger.info({ event: 'source_cache_stored', key: s3Key, sizeBytes: size });
+  }
+
+  private release(entry: HeldEntry): void {
+    entry.refs--;
+    if (entry.refs > 0) return;
+
+    this.held.delete(entry.key);
+    void this.maintain(async () => {
+      await unlink(entry.markerPath).catch(() => {});
+      await rmdir(path.dirname(entry.markerPath)).catch(() => {}); // fails while other markers remain
+      await this.evict();
+    });
+  }
+
+  private maintain(task: () => Promise<void>): Promise<void> {
+    this.maintenance = this.maintenance.then(task).catch((err) => {
+      logger.warn({ event: 'source_cache_maintenance_failed', error: String(err) });
+    });
+    return this.maintenance;
+  }
+
+  /**
+   * Evict unheld files, oldest first, until the node-wide total is within budget.
+   * A file larger than the whole budget is kept while held and dropped once free.
+   */
+  private async evict(): Promise<void> {
+    const objects: Array<{ key: string; path: string; size: number; mtimeMs: number }> = [];
+    for (const name of await readdir(this.objectsDir)) {
+      const filePath = path.join(this.objectsDir, name);
+      const info = await stat(filePath).catch(() => null);
+      if (!info) continue;
+
+      const partialOwner = /\.partial-(\d+)-/.exec(name);
+      if (partialOwner) {
+        if (!isProcessAlive(Number(partialOwner[1]))) await unlink(filePath).catch(() => {});
+        continue;
+      }
+      objects.push({ key: name.slice(0, 64), path: filePath, size: info.size, mtimeMs: info.mtimeMs });
+    }
+
+    let total = objects.reduce((sum, o) => sum + o.size, 0);
+    let entries = objects.length;
+    objects.sort((a, b) => a.mtimeMs - b.mtimeMs);
+
+    for (const object of objects) {
+      if (total <= this.maxBytes) break;
+      if (this.held.has(object.key) || this.inflight.has(object.key)) continue;
+      if (!(await this.tryLock(object.key))) continue;
+
+      try {
+        if (await this.hasLiveRefs(object.key)) continue;
+        await unlink(object.path);
+        total -= object.size;
+        entries--;
+        this.evictions++;
+        sourceCacheEvictions.inc();
+        logger.info({ event: 'source_cache_evicted', path: object.path, sizeBytes: object.size, cacheBytes: total });
+      } catch (err) {
+        logger.warn({ event: 'source_cache_unlink_failed', path: object.path, error: String(err) });
+      } finally {
+        await this.unlock(object.key);
+      }
+    }
+
+    this.lastScan = { entries, bytes: total };
+  }
+
+  /** True if any live process holds `key`; prunes markers of dead processes */
+  private async hasLiveRefs(key: string): Promise<boolean> {
+    const markers = await readdir(path.join(this.refsDir, key)).catch(() => [] as string[]);
+    let live = false;
+    for (const marker of markers) {
+      if (isProcessAlive(parseInt(marker, 10))) {
+        live = true;
+      } else {
+        await unlink(path.join(this.refsDir, key, marker)).catch(() => {});
+      }
+    }
+    return live;
+  }
+
+  private lockPath(key: string): string {
+    return path.join(this.locksDir, `${key}.lock`);
+  }
+
+  private async tryLock(key: string): Promise<boolean> {
+    try {
+      const handle = await open(this.lockPath(key), 'wx');
+      await handle.writeFile(this.owner);
+      await handle.close();
+      return true;
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code !== 'EEXIST') throw error;
+      return false;
+    }
+  }
+
+  /** A lock whose owner died is removed and reported as free */
+  private async isLocked(key: string): Promise<boolean> {
+    let owner: string;
+    try {
+      owner = await readFile(this.lockPath(key), 'utf-8');
+    } catch {
+      return false;
+    }
+    // Empty: the owner is between create and write
+    const pid = parseInt(owner, 10);
+    if (!owner || isProcessAlive(pid)) return true;
+
+    logger.warn({ event: 'source_cache_stale_lock', key, owner });
+    await unlink(this.lockPath(key)).catch(() => {});
+    return false;
+  }
+
+  private async unlock(key: string): Promise<void> {
+    await unlink(this.lockPath(key)).catch(() => {});
+  }
+}
+
+/** Creates the marker; retries if a concurrent release removed the (then empty) directory */
+async function writeMarker(markerPath: string): Promise<void> {
+  for (;;) {
+    await mkdir(path.dirname(markerPath), { recursive: true });
+    try {
+      await writeFile(markerPath, '');
+      return;
+    } catch (error) {
+      if ((error as NodeJS.ErrnoException).code !== 'ENOENT') throw error;
+    }
+  }
+}
+
+async function exists(filePath: string): Promise<boolean> {
+  return stat(filePath).then(() => true, () => false);
+}
+
+function isProcessAlive(pid: number): boolean {
+  if (!Number.isInteger(pid) || pid <= 0) return false;
+  try {
+    process.kill(pid, 0);
+    return true;
+  } catch (error) {
+    // EPERM: process exists but belongs to another user
+    return (error as NodeJS.ErrnoException).code === 'EPERM';
+  }
+}
+
+// --- Process-wide singleton ---
+
+let sourceCache: SourceCache | null = null;
+
+function getSourceCache(): SourceCache {
+  if (!sourceCache) {
+    const maxBytes = parseInt(process.env.SOURCE_CACHE_MAX_BYTES ?? '', 10);
+    sourceCache = new SourceCache(
+      process.env.SOURCE_CACHE_DIR || DEFAULT_CACHE_DIR,
+      Number.isFinite(maxBytes) && maxBytes > 0 ? maxBytes : DEFAULT_MAX_BYTES,
+    );
+  }
+  return sourceCache;
+}
+
+/**
+ * Acquire a cached local copy of an S3 source video.
+ * Always pair with `handle.release()` in a `finally` block.
+ */
+export function acquireSource(s3Key: string): Promise<SourceHandle> {
+  return getSourceCache().acquire(s3Key);
+}
+
+export function getSourceCacheStats(): SourceCacheStats {
+  return getSourceCache().getStats();
+}
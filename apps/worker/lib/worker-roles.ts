@@ -0,0 +1,40 @@
+/** One role per worker module in workers/ */
+export const WORKER_ROLES = ['stt', 'llm', 'render', 'publish', 'stats', 'billing', 'download'] as const;
+export type WorkerRole = (typeof WORKER_ROLES)[number];
+
+/**
+ * Shorthands for node pools:
+ * - cpu: ffmpeg-bound queues (render, STT chunking) -- size these nodes for cores
+ * - io:  network/DB-bound queues that should not share an event loop with renders
+ */
+const ROLE_GROUPS: Record<string, readonly WorkerRole[]> = {
+  all: WORKER_ROLES,
+  cpu: ['stt', 'render'],
+  io: ['llm', 'publish', 'stats', 'billing', 'download'],
+};
+
+/**
+ * Parses a comma-separated role list (WORKER_ROLES env), e.g. "render", "io", "stt,llm".
+ * Empty/unset means every role. Unknown names throw so a typo cannot start an idle node.
+ */
+export function resolveWorkerRoles(spec: string | undefined): WorkerRole[] {
+  const tokens = (spec ?? '')
+    .split(',')
+    .map((t) => t.trim().toLowerCase())
+    .filter(Boolean);
+  if (tokens.length === 0) return [...WORKER_ROLES];
+
+  const selected = new Set<WorkerRole>();
+  for (const token of tokens) {
+    const group = ROLE_GROUPS[token];
+    if (group) {
+      group.forEach((role) => selected.add(role));
+    } else if ((WORKER_ROLES as readonly string[]).includes(token)) {
+      selected.add(token as WorkerRole);
+    } else {
+      const known = [...Object.keys(ROLE_GROUPS), ...WORKER_ROLES].join(', ');
+      throw new Error(`Unknown worker role "${token}" (expected one of: ${known})`);
+    }
+  }
+  return WORKER_ROLES.filter((role) => selected.has(role));
+}
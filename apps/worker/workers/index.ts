@@ -4,27 +4,97 @@ import { resolve } from 'path';
 // Load .env from monorepo root (cwd is apps/worker/ when run by turbo)
 config({ path: resolve(process.cwd(), '../../.env') });
 
+import type { Server } from 'http';
+import type { Worker } from 'bullmq';
+import { pruneFinishedVideoJobs } from '@clipmaker/queue';
 import { createLogger } from '../lib/logger';
+import { instrumentWorker } from '../lib/metrics';
+import { startMetricsServer } from '../lib/metrics-server';
+import { resolveWorkerRoles, type WorkerRole } from '../lib/worker-roles';
+import { AdaptiveConcurrency, FFMPEG_QUEUE_PROFILES } from '../lib/adaptive-concurrency';
 
 const logger = createLogger('worker-main');
 
+// Prometheus endpoint for per-stage timings; 0 disables
+const METRICS_PORT = parseInt(process.env.WORKER_METRICS_PORT || '9464', 10);
+
+// How long SIGTERM waits for active jobs before exiting anyway (their locks
+// expire and BullMQ hands them to another node as stalled)
+const DRAIN_TIMEOUT_MS = parseInt(process.env.WORKER_DRAIN_TIMEOUT_MS || '300000', 10);
+
+type WorkerModule = { default?: Worker; worker?: Worker };
+
+// Importing a module creates its Worker, i.e. starts consuming that queue
+const WORKER_MODULES: Record<WorkerRole, () => Promise<WorkerModule>> = {
+  stt: () => import('./stt'),
+  llm: () => import('./llm-analyze'),
+  render: () => import('./video-render'),
+  publish: () => import('./publish'),
+  stats: () => import('./stats-collector'),
+  billing: () => import('./billing-cron'),
+  download: () => import('./download'),
+};
+
 async function main() {
-  logger.info({ event: 'workers_starting' });
-
-  // Import workers to register them
-  await import('./stt');
-  await import('./llm-analyze');
-  await import('./video-render');
-  await import('./publish');
-  await import('./stats-collector');
-  await import('./billing-cron');
-  await import('./download');
-
-  logger.info({ event: 'workers_started', workers: ['stt', 'llm', 'video', 'publish', 'stats', 'billing-cron', 'download'] });
-
-  // Graceful shutdown
-  const shutdown = async () => {
-    logger.info({ event: 'workers_shutting_down' });
+  const roles = resolveWorkerRoles(process.env.WORKER_ROLES);
+  logger.info({ event: 'workers_starting', roles });
+
+  const workers: Worker[] = [];
+  const schedulers: AdaptiveConcurrency[] = [];
+
+  for (const role of roles) {
+    const mod = await WORKER_MODULES[role]();
+    const worker = mod.default ?? mod.worker;
+    if (!worker) continue;
+    workers.push(worker);
+    instrumentWorker(worker);
+    pruneFinishedVideoJobs(worker);
+
+    const profile = FFMPEG_QUEUE_PROFILES[worker.name];
+    if (profile) {
+      const scheduler = new AdaptiveConcurrency(worker, profile);
+      scheduler.start();
+      schedulers.push(scheduler);
+    }
+  }
+
+  let metricsServer: Server | undefined;
+  if (METRICS_PORT > 0) {
+    metricsServer = startMetricsServer(METRICS_PORT);
+  }
+
+  logger.info({
+    event: 'workers_started',
+    roles,
+    concurrency: Object.fromEntries(workers.map((w) => [w.name, w.concurrency])),
+  });
+
+  // Graceful shutdown: stop fetching, let active jobs finish, then exit.
+  // A second signal exits immediately.
+  let shuttingDown = false;
+  const shutdown = async (signal: NodeJS.Signals) => {
+    if (shuttingDown) {
+      logger.warn({ event: 'workers_forced_exit', signal });
+      process.exit(1);
+    }
+    shuttingDown = true;
+    logger.info({ event: 'workers_shutting_down', signal, drainTimeoutMs: DRAIN_TIMEOUT_MS });
+
+    setTimeout(() => {
+      logger.warn({ event: 'workers_drain_timeout', drainTimeoutMs: DRAIN_TIMEOUT_MS });
+      process.exit(1);
+    }, DRAIN_TIMEOUT_MS).unref();
+
+    schedulers.forEach((s) => s.stop());
+    const results = await Promise.allSettled(workers.map((w) => w.close()));
+    results.forEach((result, i) => {
+      if (result.status === 'rejected') {
+        logger.error({ event: 'worker_close_failed', queue: workers[i]!.name, error: String(result.reason) });
+      }
+    });
+    metricsServer?.close();
+
+    logger.info({ event: 'workers_stopped' });
     process.exit(0);
   };
 
@@ -1,12 +1,15 @@
 import { Worker } from 'bullmq';
 import pMap from 'p-map';
 import type { LLMJobData, TranscriptSegment, ViralityScore, ByokKeys } from '@clipmaker/types';
+import { buildSegmentIndex, clipSubtitlesFromIndex } from '@clipmaker/types';
 import { QUEUE_NAMES, DEFAULT_JOB_OPTIONS } from '@clipmaker/queue';
 import { createQueue, getRedisConnection } from '@clipmaker/queue/src/queues';
-import { prisma, type Prisma } from '@clipmaker/db';
-import { LLMRouter } from '../lib/llm-router';
+import { prisma, Prisma } from '@clipmaker/db';
+import { LLMRouter, type LLMCacheMode } from '../lib/llm-router';
+import { createLLMResponseCacheFromEnv } from '../lib/llm-cache';
 import { createLogger } from '../lib/logger';
 import { peekByokKey, clearByokKeys } from '../lib/byok-cache';
+import { groupClipsForBatch, RENDER_BATCH_JOB_NAME } from '../lib/render-batch';
 import {
   SYSTEM_PROMPT as MOMENT_SELECTION_PROMPT,
   buildUserMessage as buildMomentSelectionInput,
@@ -60,12 +63,21 @@ const router = new LLMRouter(
     openai: process.env.OPENAI_API_KEY,
     openrouter: process.env.OPENROUTER_API_KEY,
   },
+  // Job retries re-send identical prompts: serve them from Redis (opt-in, see llm-cache)
+  createLLMResponseCacheFromEnv(),
 );
 
+/** Cache only responses that parse; a malformed answer must not be replayed */
+function parsesAs(schema: { safeParse: (data: unknown) => { success: boolean } }) {
+  return (content: string) => schema.safeParse(safeJsonParse(content)).success;
+}
+
 // --- Main Handler ---
 
 async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
   const { videoId, strategy } = jobData;
+  // A reprocess asks for new moments: never replay cached answers (fresh ones replace them)
+  const cache: LLMCacheMode = jobData.reprocess ? 'refresh' : 'default';
 
   // C3: Validate job input with Zod instead of unsafe cast
   const inputResult = MomentSelectionInputSchema.safeParse(jobData.input);
@@ -78,6 +90,7 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
   const fullText = truncateTranscript(rawFullText, MAX_TRANSCRIPT_TOKENS);
 
   let totalLlmCostKopecks = 0;
+  let totalLlmSavedKopecks = 0;
 
   // Update progress: LLM analysis starts at 50% (STT was 0-50%)
   await prisma.video.update({
@@ -126,6 +139,8 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
     .map((s) => TranscriptSegmentSchema.safeParse(s))
     .filter((r): r is { success: true; data: TranscriptSegment } => r.success)
     .map((r) => r.data);
+  // Time-sorted index: per-moment subtitle lookup is O(log n) instead of a full scan
+  const segmentIndex = buildSegmentIndex(segments);
 
   // 1b. Early exit: empty/short transcript
   const wordCount = fullText.trim().split(/\s+/).filter(Boolean).length;
@@ -145,7 +160,7 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
     }];
   } else {
     // 2. Select moments via LLM
-    const context = { task: 'moment_selection' as const, strategy, tokenCount, planId };
+    const context = { task: 'moment_selection' as const, strategy, tokenCount, planId, userId: user.id };
 
     const response = await router.complete(
       context,
@@ -153,10 +168,11 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
         { role: 'system', content: MOMENT_SELECTION_PROMPT },
         { role: 'user', content: buildMomentSelectionInput(fullText, videoDurationSeconds) },
       ],
-      { jsonMode: true, temperature: 0.7 },
+      { jsonMode: true, temperature: 0.7, cache, cacheIf: parsesAs(MomentResponseSchema) },
       byokKeys,
     );
     totalLlmCostKopecks += response.costKopecks;
+    totalLlmSavedKopecks += response.savedKopecks;
 
     let parsed = MomentResponseSchema.safeParse(safeJsonParse(response.content));
 
@@ -175,10 +191,12 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
           { role: 'system', content: MOMENT_SELECTION_PROMPT },
           { role: 'user', content: buildMomentSelectionInput(fullText, videoDurationSeconds) },
         ],
-        { jsonMode: true, temperature: 0.5 },
+        // Retry must reach the provider: never replay a cached answer here
+        { jsonMode: true, temperature: 0.5, cache: 'refresh', cacheIf: parsesAs(MomentResponseSchema) },
         byokKeys,
       );
       totalLlmCostKopecks += retryResponse.costKopecks;
+      totalLlmSavedKopecks += retryResponse.savedKopecks;
       parsed = MomentResponseSchema.safeParse(safeJsonParse(retryResponse.content));
 
       if (!parsed.success) {
@@ -239,20 +257,19 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
       }
 
       // Extract subtitle segments for this moment
-      const clipSegments = segments
-        .filter((s) => s.start >= moment.start && s.end <= moment.end)
-        .map((s) => ({ start: s.start - moment.start, end: s.end - moment.start, text: s.text }));
+      const clipSegments = clipSubtitlesFromIndex(segmentIndex, moment.start, moment.end);
 
       const momentText = clipSegments.map((s) => s.text).join(' ') || moment.title;
 
       // Run scoring + title + CTA in parallel
       const [scoreResult, titleResult, ctaResult] = await Promise.all([
-        scoreVirality(strategy, momentText, moment, planId, byokKeys),
-        generateTitle(strategy, momentText, moment, byokKeys),
-        generateCta(strategy, momentText, byokKeys),
+        scoreVirality(strategy, momentText, moment, planId, user.id, cache, byokKeys),
+        generateTitle(strategy, momentText, moment, user.id, cache, byokKeys),
+        generateCta(strategy, momentText, user.id, cache, byokKeys),
       ]);
 
       totalLlmCostKopecks += scoreResult.costKopecks + titleResult.costKopecks + ctaResult.costKopecks;
+      totalLlmSavedKopecks += scoreResult.savedKopecks + titleResult.savedKopecks + ctaResult.savedKopecks;
 
       return {
         moment,
@@ -291,7 +308,10 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
           endTime: item.moment.end,
           duration: item.moment.end - item.moment.start,
           viralityScore: item.viralityScore as unknown as Prisma.JsonObject,
-          subtitleSegments: item.subtitleSegments as unknown as Prisma.JsonArray,
+          // null = subtitles reference the transcript range [startTime, endTime];
+          // the text is not duplicated per clip until the user edits it. Transcript
+          // edits therefore also apply to these clips (see resolveClipSubtitles)
+          subtitleSegments: Prisma.DbNull,
           cta: item.cta ? (item.cta as unknown as Prisma.JsonObject) : undefined,
           format: 'portrait',
           status: 'pending',
@@ -314,27 +334,38 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
     startTime: number;
     endTime: number;
     format: string;
-    subtitleSegments: unknown;
     cta: unknown;
   }>;
 
   const renderQueue = createQueue(QUEUE_NAMES.VIDEO_RENDER);
+  // Clips store a transcript-range reference; the render job still needs the text,
+  // taken from the already-resolved segments (same order as createdClips)
+  const renderClips = createdClips.map((clip, i) => ({
+    clipId: clip.id,
+    startTime: clip.startTime,
+    endTime: clip.endTime,
+    format: clip.format,
+    subtitleSegments: clipsToCreate[i]!.subtitleSegments,
+    cta: clip.cta,
+  }));
+
+  // Nearby clips share one decode (render-batch job); each group is its own job
+  // so groups render in parallel across worker slots and retry independently
+  const watermark = planId === 'free';
   await renderQueue.addBulk(
-    createdClips.map((clip) => ({
-      name: 'render',
-      data: {
-        clipId: clip.id,
-        videoId: video.id,
-        sourceFilePath: video.filePath,
-        startTime: clip.startTime,
-        endTime: clip.endTime,
-        format: clip.format,
-        subtitleSegments: clip.subtitleSegments,
-        cta: clip.cta,
-        watermark: planId === 'free',
-      },
-      opts: DEFAULT_JOB_OPTIONS,
-    })),
+    groupClipsForBatch(renderClips).map((group) =>
+      group.length === 1
+        ? {
+            name: 'render',
+            data: { ...group[0]!, videoId: video.id, sourceFilePath: video.filePath, watermark },
+            opts: DEFAULT_JOB_OPTIONS,
+          }
+        : {
+            name: RENDER_BATCH_JOB_NAME,
+            data: { videoId: video.id, sourceFilePath: video.filePath, watermark, clips: group },
+            opts: DEFAULT_JOB_OPTIONS,
+          },
+    ),
   );
 
   // BYOK: Clean up cached keys after pipeline completes
@@ -349,6 +380,8 @@ async function handleMomentSelection(jobData: LLMJobData): Promise<void> {
     videoId,
     clips: clipsToCreate.length,
     costKopecks: totalLlmCostKopecks,
+    cacheSavedKopecks: totalLlmSavedKopecks,
+    llmCache: router.getCacheStats(),
     usedByok: !!byokKeys,
   });
 }
@@ -370,16 +403,18 @@ async function scoreVirality(
   momentText: string,
   moment: MomentCandidate,
   planId: string,
+  userId: string,
+  cache: LLMCacheMode,
   byokKeys?: ByokKeys,
-): Promise<{ score: ViralityScore; costKopecks: number }> {
-  const context = { task: 'virality_scoring' as const, strategy, planId };
+): Promise<{ score: ViralityScore; costKopecks: number; savedKopecks: number }> {
+  const context = { task: 'virality_scoring' as const, strategy, planId, userId };
   const response = await router.complete(
     context,
     [
       { role: 'system', content: VIRALITY_SCORING_PROMPT },
       { role: 'user', content: buildScoringInput(momentText) },
     ],
-    { jsonMode: true, temperature: 0.3 },
+    { jsonMode: true, temperature: 0.3, cache, cacheIf: parsesAs(ViralityResponseSchema) },
     byokKeys,
   );
 
@@ -397,36 +432,39 @@ async function scoreVirality(
         tips: [],
       },
       costKopecks: response.costKopecks,
+      savedKopecks: response.savedKopecks,
     };
   }
 
   const score = parsed.data;
   score.total = score.hook + score.engagement + score.flow + score.trend;
 
-  return { score, costKopecks: response.costKopecks };
+  return { score, costKopecks: response.costKopecks, savedKopecks: response.savedKopecks };
 }
 
 async function generateTitle(
   strategy: 'ru' | 'global',
   momentText: string,
   moment: MomentCandidate,
+  userId: string,
+  cache: LLMCacheMode,
   byokKeys?: ByokKeys,
-): Promise<{ title: string; costKopecks: number }> {
-  const context = { task: 'title_generation' as const, strategy };
+): Promise<{ title: string; costKopecks: number; savedKopecks: number }> {
+  const context = { task: 'title_generation' as const, strategy, userId };
   const response = await router.complete(
     context,
     [
       { role: 'system', content: TITLE_GENERATION_PROMPT },
       { role: 'user', content: buildTitleInput(momentText) },
     ],
-    { jsonMode: true, temperature: 0.8 },
+    { jsonMode: true, temperature: 0.8, cache, cacheIf: parsesAs(TitleResponseSchema) },
     byokKeys,
   );
 
   const parsed = TitleResponseSchema.safeParse(safeJsonParse(response.content));
 
   if (!parsed.success) {
-    return { title: moment.title.slice(0, 60), costKopecks: response.costKopecks };
+    return { title: moment.title.slice(0, 60), costKopecks: response.costKopecks, savedKopecks: response.savedKopecks };
   }
 
   let title = parsed.data.title;
@@ -434,32 +472,38 @@ async function generateTitle(
     title = title.slice(0, 57) + '...';
   }
 
-  return { title, costKopecks: response.costKopecks };
+  return { title, costKopecks: response.costKopecks, savedKopecks: response.savedKopecks };
 }
 
 async function generateCta(
   strategy: 'ru' | 'global',
   momentText: string,
+  userId: string,
+  cache: LLMCacheMode,
   byokKeys?: ByokKeys,
-): Promise<{ cta: { text: string; position: 'end' | 'overlay'; duration: number } | null; costKopecks: number }> {
-  const context = { task: 'cta_suggestion' as const, strategy };
+): Promise<{
+  cta: { text: string; position: 'end' | 'overlay'; duration: number } | null;
+  costKopecks: number;
+  savedKopecks: number;
+}> {
+  const context = { task: 'cta_suggestion' as const, strategy, userId };
   const response = await router.complete(
     context,
     [
       { role: 'system', content: CTA_SUGGESTION_PROMPT },
       { role: 'user', content: buildCtaInput(momentText) },
     ],
-    { jsonMode: true, temperature: 0.6 },
+    { jsonMode: true, temperature: 0.6, cache, cacheIf: parsesAs(CtaResponseSchema) },
     byokKeys,
   );
 
   const parsed = CtaResponseSchema.safeParse(safeJsonParse(response.content));
 
   if (!parsed.success) {
-    return { cta: null, costKopecks: response.costKopecks };
+    return { cta: null, costKopecks: response.costKopecks, savedKopecks: response.savedKopecks };
   }
 
-  return { cta: parsed.data, costKopecks: response.costKopecks };
+  return { cta: parsed.data, costKopecks: response.costKopecks, savedKopecks: response.savedKopecks };
 }
 
 // --- Worker ---
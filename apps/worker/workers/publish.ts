@@ -8,6 +8,7 @@ import { prisma } from '@clipmaker/db';
 import { decryptToken, encryptToken } from '@clipmaker/crypto';
 import { getPlatformProvider } from '../lib/providers';
 import { createLogger } from '../lib/logger';
+import { applyRollupDelta, rollupDay } from '../lib/analytics-rollup';
 
 const logger = createLogger('worker-publish');
 
@@ -126,6 +127,7 @@ const worker = new Worker<PublishJobData>(
     // Step 1: Fetch publication; handle orphaned/already-processed
     const publication = await prisma.publication.findUnique({
       where: { id: publicationId },
+      include: { clip: { select: { video: { select: { teamId: true } } } } },
     });
 
     if (!publication) {
@@ -211,14 +213,28 @@ const worker = new Worker<PublishJobData>(
       });
 
       // Step 7: Success — update publication (optimistic concurrency: only if still 'publishing')
-      const updated = await prisma.publication.updateMany({
-        where: { id: publicationId, status: 'publishing' },
-        data: {
-          status: 'published',
-          platformPostId: result.platformPostId,
-          platformUrl: result.platformUrl,
-          publishedAt: new Date(),
-        },
+      // and count it in today's analytics rollup in the same transaction
+      const publishedAt = new Date();
+      const updated = await prisma.$transaction(async (tx) => {
+        const marked = await tx.publication.updateMany({
+          where: { id: publicationId, status: 'publishing' },
+          data: {
+            status: 'published',
+            platformPostId: result.platformPostId,
+            platformUrl: result.platformUrl,
+            publishedAt,
+          },
+        });
+        if (marked.count > 0) {
+          await applyRollupDelta(
+            tx,
+            { userId: publication.userId, teamId: publication.clip.video.teamId },
+            publication.platform,
+            rollupDay(publishedAt),
+            { views: 0, likes: 0, shares: 0, published: 1 },
+          );
+        }
+        return marked;
       });
 
       if (updated.count === 0) {
@@ -6,6 +6,7 @@ import { prisma } from '@clipmaker/db';
 import { decryptToken } from '@clipmaker/crypto';
 import { getPlatformProvider } from '../lib/providers';
 import { createLogger } from '../lib/logger';
+import { applyRollupDelta, rollupDay, statsDelta } from '../lib/analytics-rollup';
 
 const logger = createLogger('worker-stats');
 
@@ -19,6 +20,7 @@ const worker = new Worker<StatsCollectJobData>(
     // Fetch publication to verify it still exists and is published
     const publication = await prisma.publication.findUnique({
       where: { id: publicationId },
+      include: { clip: { select: { video: { select: { teamId: true } } } } },
     });
 
     if (!publication) {
@@ -65,18 +67,47 @@ const worker = new Worker<StatsCollectJobData>(
       return;
     }
 
-    // Handle nullable likes/shares — only update if non-null
-    await prisma.publication.update({
-      where: { id: publicationId },
-      data: {
-        views: stats.views,
-        ...(stats.likes !== null && stats.likes !== undefined ? { likes: stats.likes } : {}),
-        ...(stats.shares !== null && stats.shares !== undefined ? { shares: stats.shares } : {}),
-        lastStatsSync: new Date(),
-      },
+    // Update the publication and the analytics rollups atomically. The row lock makes
+    // the delta (new - stored) exact even if two syncs of this publication overlap.
+    const delta = await prisma.$transaction(async (tx) => {
+      const [current] = await tx.$queryRaw<
+        Array<{ views: number; likes: number; shares: number; status: string }>
+      >`
+        SELECT views, likes, shares, status::text AS status
+        FROM publications
+        WHERE id = ${publicationId}::uuid
+        FOR UPDATE
+      `;
+      if (!current || current.status !== 'published') return null;
+
+      // Handle nullable likes/shares — only update if non-null
+      await tx.publication.update({
+        where: { id: publicationId },
+        data: {
+          views: stats.views,
+          ...(stats.likes !== null && stats.likes !== undefined ? { likes: stats.likes } : {}),
+          ...(stats.shares !== null && stats.shares !== undefined ? { shares: stats.shares } : {}),
+          lastStatsSync: new Date(),
+        },
+      });
+
+      const delta = statsDelta(current, stats);
+      await applyRollupDelta(
+        tx,
+        { userId: publication.userId, teamId: publication.clip.video.teamId },
+        publication.platform,
+        rollupDay(),
+        delta,
+      );
+      return delta;
     });
 
-    logger.info({ event: 'stats_collect_complete', publicationId, platform, ...stats });
+    if (!delta) {
+      logger.info({ event: 'stats_skip_not_published', publicationId });
+      return;
+    }
+
+    logger.info({ event: 'stats_collect_complete', publicationId, platform, ...stats, delta });
   },
   {
     connection: getRedisConnection(),
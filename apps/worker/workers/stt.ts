@@ -3,7 +3,6 @@ import { createReadStream } from 'fs';
 import { mkdtemp, rm } from 'fs/promises';
 import path from 'path';
 import os from 'os';
-import pMap from 'p-map';
 import type { STTJobData, TranscriptSegment } from '@clipmaker/types';
 import type { Prisma } from '@prisma/client';
 type JsonArray = Prisma.JsonArray;
@@ -11,15 +10,19 @@ import { QUEUE_NAMES, DEFAULT_JOB_OPTIONS } from '@clipmaker/queue';
 import { createQueue, getRedisConnection } from '@clipmaker/queue/src/queues';
 import { prisma } from '@clipmaker/db';
 import { createLogger } from '../lib/logger';
-import { ffprobeGetDuration, extractAudio } from '../lib/ffmpeg';
-import { downloadFromS3 } from '../lib/s3-download';
-import { splitAudio, CHUNK_DURATION } from '../lib/audio-chunker';
+import { ffprobeGetDuration } from '../lib/ffmpeg';
+import { acquireSource, type SourceHandle } from '../lib/source-cache';
+import { mapAudioChunks, chooseCutPoints, detectSilences, type Silence } from '../lib/audio-chunker';
 import { createSTTClient, getSTTConfig } from '../lib/stt-client';
 import { retryWithBackoff } from '../lib/retry';
 import { peekByokKey } from '../lib/byok-cache';
+import { sttChunkSeconds, sttAudioSeconds, timed } from '../lib/metrics';
 
 const logger = createLogger('worker-stt');
 
+// Snap chunk boundaries to silence (extra audio-only analysis pass before chunking)
+const SNAP_TO_SILENCE = process.env.STT_SNAP_TO_SILENCE === 'true';
+
 type WhisperSegment = {
   start: number;
   end: number;
@@ -31,9 +34,10 @@ type WhisperSegment = {
 const worker = new Worker<STTJobData>(
   QUEUE_NAMES.STT,
   async (job) => {
-    const { videoId, strategy, language } = job.data;
+    const { videoId, strategy, language, reprocess } = job.data;
     const ALLOWED_LANGUAGES = ['ru', 'en', 'auto'];
     let tmpDir: string | undefined;
+    let source: SourceHandle | undefined;
 
     logger.info({ event: 'stt_start', videoId, strategy, language });
 
@@ -50,11 +54,11 @@ const worker = new Worker<STTJobData>(
       const user = await prisma.user.findUnique({ where: { id: video.userId } });
       if (!user) throw new Error('User not found');
 
-      // 2. Download video from S3 (use DB filePath, not job payload)
+      // 2. Acquire source video via node-local cache (use DB filePath, not job payload).
+      // Render jobs for this video later hit the same cached copy.
       tmpDir = await mkdtemp(path.join(os.tmpdir(), 'stt-'));
-      const ext = path.extname(video.filePath) || '.mp4';
-      const videoPath = path.join(tmpDir, `source${ext}`);
-      await downloadFromS3(video.filePath, videoPath);
+      source = await acquireSource(video.filePath);
+      const videoPath = source.path;
 
       // 3. Probe duration
       const durationSeconds = await ffprobeGetDuration(videoPath);
@@ -75,15 +79,17 @@ const worker = new Worker<STTJobData>(
 
       const transcribeDuration = transcribeMinutes * 60;
 
-      // 5. Extract audio (WAV 16kHz mono)
-      const audioPath = path.join(tmpDir, 'audio.wav');
-      await extractAudio(videoPath, audioPath, transcribeDuration);
-
-      // 6. Chunk audio if needed
-      const chunks = await splitAudio(audioPath, tmpDir, transcribeDuration);
-      logger.info({ event: 'stt_chunks', videoId, count: chunks.length });
+      // 5. Plan chunk boundaries (optionally snapped to silence)
+      const audioDuration = Math.min(transcribeDuration, durationSeconds);
+      let silences: Silence[] = [];
+      if (SNAP_TO_SILENCE) {
+        silences = await detectSilences(videoPath, audioDuration);
+      }
+      const cutPoints = chooseCutPoints(audioDuration, silences);
+      const expectedChunks = cutPoints.length + 1;
+      logger.info({ event: 'stt_chunks', videoId, count: expectedChunks, snapped: SNAP_TO_SILENCE });
 
-      // 7. Transcribe chunks in parallel (concurrency 3, max 6 STT calls total with worker concurrency 2)
+      // 6. STT client
       const sttConfig = getSTTConfig(strategy);
 
       // BYOK: Check Redis for user's OpenAI key (Global strategy only)
@@ -105,13 +111,19 @@ const worker = new Worker<STTJobData>(
         data: { processingProgress: 0, processingStage: 'transcribing' },
       });
 
+      // 7. Single ffmpeg pass source → MP3 chunks; each chunk is handed to the
+      // transcription pool as soon as it is written (no intermediate WAV).
+      // Transcribe chunks in parallel (concurrency 2 per job)
       let completedChunks = 0;
-      const chunkResults = await pMap(
-        chunks,
+      const chunkResults = await mapAudioChunks(
+        videoPath,
+        tmpDir,
+        audioDuration,
+        cutPoints,
         async (chunk) => {
           // Cloud.ru doesn't support verbose_json — use json directly for ru strategy
           const responseFormat = strategy === 'ru' ? 'json' as const : 'verbose_json' as const;
-          const response = await retryWithBackoff(
+          const response = await timed(sttChunkSeconds, { strategy }, () => retryWithBackoff(
             async () => {
               return await client.audio.transcriptions.create({
                 model: sttConfig.model,
@@ -122,7 +134,8 @@ const worker = new Worker<STTJobData>(
               });
             },
             { maxRetries: 2, baseDelayMs: 2000 },
-          );
+          ));
+          sttAudioSeconds.inc({ strategy }, chunk.durationSeconds);
 
           // Filter silence before mapping (need raw Whisper fields)
           // json format returns only { text }, verbose_json returns { segments }
@@ -134,7 +147,7 @@ const worker = new Worker<STTJobData>(
 
           // Track chunk progress (STT = 0-50%)
           completedChunks++;
-          const progress = Math.round((completedChunks / chunks.length) * 50);
+          const progress = Math.min(50, Math.round((completedChunks / expectedChunks) * 50));
           await prisma.video.update({
             where: { id: videoId },
             data: { processingProgress: progress },
@@ -143,10 +156,9 @@ const worker = new Worker<STTJobData>(
 
           // If json format (no segments), create a single segment from full text
           if (rawSegments.length === 0 && response.text?.trim()) {
-            const chunkDuration = Math.min(CHUNK_DURATION, transcribeDuration - chunk.offsetSeconds);
             return [{
               start: chunk.offsetSeconds,
-              end: chunk.offsetSeconds + chunkDuration,
+              end: chunk.offsetSeconds + chunk.durationSeconds,
               text: response.text.trim(),
               confidence: 0.85,
             }] as TranscriptSegment[];
@@ -164,6 +176,7 @@ const worker = new Worker<STTJobData>(
         },
         { concurrency: 2 },
       );
+      source.release();
 
       // Flatten and sort by start time (chunks may complete out of order)
       const allSegments = chunkResults.flat().sort((a, b) => a.start - b.start);
@@ -188,6 +201,17 @@ const worker = new Worker<STTJobData>(
             videoId: video.id,
             language,
             segments: allSegments as unknown as JsonArray,
+            segmentRows: {
+              createMany: {
+                data: allSegments.map((s, idx) => ({
+                  idx,
+                  startTime: s.start,
+                  endTime: s.end,
+                  text: s.text,
+                  confidence: s.confidence,
+                })),
+              },
+            },
             fullText,
             tokenCount,
             sttModel: sttConfig.model,
@@ -224,6 +248,7 @@ const worker = new Worker<STTJobData>(
         videoId: video.id,
         task: 'moment_selection' as const,
         strategy,
+        ...(reprocess && { reprocess: true }),
         input: {
           fullText,
           tokenCount,
@@ -247,7 +272,8 @@ const worker = new Worker<STTJobData>(
       // The on('failed') handler marks failed only after all retries are exhausted.
       throw error;
     } finally {
-      // 10. Cleanup temp files
+      // 10. Release cached source + cleanup temp files
+      source?.release();
       if (tmpDir) {
         try {
           await rm(tmpDir, { recursive: true, force: true });
@@ -259,6 +285,7 @@ const worker = new Worker<STTJobData>(
   },
   {
     connection: getRedisConnection(),
+    // Initial value; resized from host capacity by AdaptiveConcurrency (workers/index.ts)
     concurrency: 2,
   },
 );
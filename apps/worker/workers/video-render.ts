@@ -1,26 +1,19 @@
 import { Worker, UnrecoverableError } from 'bullmq';
 import type { Job } from 'bullmq';
-import { mkdtemp, rm, writeFile, readFile, unlink, rename } from 'fs/promises';
+import { mkdtemp, rm } from 'fs/promises';
 import path from 'path';
 import os from 'os';
 import { z } from 'zod';
-import type { VideoRenderJobData } from '@clipmaker/types';
+import type { VideoRenderJobData, VideoRenderBatchJobData } from '@clipmaker/types';
 import { QUEUE_NAMES } from '@clipmaker/queue';
 import { getRedisConnection } from '@clipmaker/queue/src/queues';
 import { prisma } from '@clipmaker/db';
-import { putObject } from '@clipmaker/s3';
 import { clipPath, thumbnailPath } from '@clipmaker/s3';
 import { createLogger } from '../lib/logger';
-import { downloadFromS3 } from '../lib/s3-download';
-import {
-  renderClip,
-  generateSubtitleFile,
-  buildFilterChain,
-  generateCtaEndCard,
-  concatClipAndCta,
-  generateThumbnail,
-  FORMAT_DIMENSIONS,
-} from '../lib/ffmpeg';
+import { acquireSource, getSourceCacheStats, type SourceHandle } from '../lib/source-cache';
+import { renderClip, renderClipGroup, ffprobeHasAudio, type ClipFormat, type CTA } from '../lib/ffmpeg';
+import { prepareFilterChain, finishClipFiles } from '../lib/clip-render';
+import { groupClipsForBatch, CtaCardCache, RENDER_BATCH_JOB_NAME } from '../lib/render-batch';
 
 const logger = createLogger('worker-video-render');
 
@@ -43,23 +36,38 @@ const CTASchema = z.object({
   duration: z.number().int().min(3).max(5),
 });
 
-const VideoRenderJobSchema = z.object({
+const clipFields = {
   clipId: z.string().uuid(),
-  videoId: z.string().uuid(),
-  sourceFilePath: z.string().min(1).max(1024),
   startTime: z.number().min(0),
   endTime: z.number().min(0),
   format: z.enum(['portrait', 'square', 'landscape']),
   subtitleSegments: z.array(SubtitleSegmentSchema).max(500),
   cta: CTASchema.optional(),
+};
+
+function refineClipRange<T extends z.ZodType<{ startTime: number; endTime: number }>>(schema: T) {
+  return schema.refine(
+    (d) => d.endTime > d.startTime,
+    { message: 'endTime must be greater than startTime' },
+  ).refine(
+    (d) => d.endTime - d.startTime <= 180,
+    { message: 'Clip duration must not exceed 180 seconds' },
+  );
+}
+
+const VideoRenderJobSchema = refineClipRange(z.object({
+  ...clipFields,
+  videoId: z.string().uuid(),
+  sourceFilePath: z.string().min(1).max(1024),
   watermark: z.boolean(),
-}).refine(
-  (d) => d.endTime > d.startTime,
-  { message: 'endTime must be greater than startTime' },
-).refine(
-  (d) => d.endTime - d.startTime <= 180,
-  { message: 'Clip duration must not exceed 180 seconds' },
-);
+}));
+
+const VideoRenderBatchJobSchema = z.object({
+  videoId: z.string().uuid(),
+  sourceFilePath: z.string().min(1).max(1024),
+  watermark: z.boolean(),
+  clips: z.array(refineClipRange(z.object(clipFields))).min(1).max(100),
+});
 
 // ---------------------------------------------------------------------------
 // Helpers: video completion / failure checks
@@ -105,6 +113,49 @@ function safeProgress(job: Job, progress: number): void {
   job.updateProgress(progress).catch(() => {});
 }
 
+// ---------------------------------------------------------------------------
+// Helpers: per-clip render steps (shared by single and batch jobs)
+// ---------------------------------------------------------------------------
+
+type FinalizeClipInput = {
+  clipId: string;
+  videoId: string;
+  userId: string;
+  renderedPath: string;
+  tmpDir: string;
+  clipDuration: number;
+  format: ClipFormat;
+  cta?: CTA;
+  ctaCards: CtaCardCache;
+};
+
+/**
+ * Appends the CTA end card, generates the thumbnail, uploads both and marks the clip ready.
+ * Returns the S3 key of the uploaded clip.
+ */
+async function finalizeRenderedClip(input: FinalizeClipInput): Promise<string> {
+  const { clipId, videoId, userId } = input;
+  const s3ClipKey = clipPath(userId, videoId, clipId);
+
+  const s3ThumbnailKey = await finishClipFiles({
+    ...input,
+    clipKey: s3ClipKey,
+    thumbnailKey: thumbnailPath(userId, videoId, clipId),
+  });
+
+  // Update clip in DB: filePath, thumbnailPath, status='ready'
+  await prisma.clip.update({
+    where: { id: clipId },
+    data: {
+      filePath: s3ClipKey,
+      thumbnailPath: s3ThumbnailKey,
+      status: 'ready',
+    },
+  });
+
+  return s3ClipKey;
+}
+
 // ---------------------------------------------------------------------------
 // Main handler
 // ---------------------------------------------------------------------------
@@ -169,51 +220,28 @@ async function handleRenderJob(job: Job<VideoRenderJobData>): Promise<void> {
 
   // 5. Create temp directory
   const tmpDir = await mkdtemp(path.join(os.tmpdir(), 'clipmaker-render-'));
+  let source: SourceHandle | undefined;
 
   try {
-    // 5a. Build local paths
-    const clipDuration = data.endTime - data.startTime;
-    const sourceLocal = path.join(tmpDir, 'source.mp4');
-    const assFile = path.join(tmpDir, 'subtitles.ass');
     const renderedClip = path.join(tmpDir, `clip-${clip.id}.mp4`);
-    const thumbnailLocal = path.join(tmpDir, `thumb-${clip.id}.jpg`);
-
-    // 5b. Build S3 keys
-    const s3ClipKey = clipPath(userId, video.id, clip.id);
-    const s3ThumbnailKey = thumbnailPath(userId, video.id, clip.id);
 
-    // 6. Download source video from S3
+    // 6. Acquire source video (node-local cache, shared across clips of this video)
     safeProgress(job, 10);
-    logger.info({ event: 's3_download_start', s3Key: data.sourceFilePath });
-    await downloadFromS3(data.sourceFilePath, sourceLocal);
-    logger.info({ event: 's3_download_complete', localPath: sourceLocal });
-
-    // 7. Generate ASS subtitle file (if segments exist)
-    let assFilePath: string | null = null;
-    if (data.subtitleSegments.length > 0) {
-      const assContent = generateSubtitleFile(
-        data.subtitleSegments,
-        clipDuration,
-        data.format,
-      );
-      await writeFile(assFile, assContent, 'utf-8');
-      assFilePath = assFile;
-      logger.info({ event: 'ass_generated', segments: data.subtitleSegments.length });
-    }
+    source = await acquireSource(data.sourceFilePath);
+    logger.info({
+      event: 'source_acquired',
+      s3Key: data.sourceFilePath,
+      localPath: source.path,
+      cache: getSourceCacheStats(),
+    });
 
-    // 8. Build FFmpeg filter chain
-    const filterChain = buildFilterChain(
-      data.format,
-      assFilePath,
-      data.cta ?? null,
-      data.watermark,
-      clipDuration,
-    );
+    // 7-8. Generate ASS subtitle file + build FFmpeg filter chain
+    const filterChain = await prepareFilterChain(tmpDir, data, data.watermark);
 
     // 9. Render clip via FFmpeg
     safeProgress(job, 30);
     await renderClip({
-      inputPath: sourceLocal,
+      inputPath: source.path,
       outputPath: renderedClip,
       startTime: data.startTime,
       endTime: data.endTime,
@@ -222,87 +250,183 @@ async function handleRenderJob(job: Job<VideoRenderJobData>): Promise<void> {
     });
     logger.info({ event: 'ffmpeg_complete', clipId: clip.id });
 
-    // 9b. CTA end card (if cta.position === 'end': generate card and concat)
-    if (data.cta && data.cta.position === 'end') {
-      const { width, height } = FORMAT_DIMENSIONS[data.format];
-      const ctaCardPath = path.join(tmpDir, `cta-${clip.id}.mp4`);
-      const finalPath = path.join(tmpDir, `final-${clip.id}.mp4`);
+    // Source no longer needed — let the cache evict it if over budget
+    source.release();
 
-      await generateCtaEndCard(data.cta, width, height, ctaCardPath);
-      await concatClipAndCta(renderedClip, ctaCardPath, finalPath);
+    // 10-12. CTA end card, thumbnail, upload, mark ready
+    safeProgress(job, 70);
+    const s3ClipKey = await finalizeRenderedClip({
+      clipId: clip.id,
+      videoId: video.id,
+      userId,
+      renderedPath: renderedClip,
+      tmpDir,
+      clipDuration: data.endTime - data.startTime,
+      format: data.format,
+      cta: data.cta,
+      ctaCards: new CtaCardCache(tmpDir),
+    });
 
-      // Replace rendered clip with the final concatenated version
-      await unlink(renderedClip).catch(() => {});
-      await rename(finalPath, renderedClip);
-      await unlink(ctaCardPath).catch(() => {});
+    // 13. Check if all clips for this video are ready
+    safeProgress(job, 95);
+    await checkVideoCompletion(video.id);
 
-      logger.info({
-        event: 'cta_end_card_appended',
-        clipId: clip.id,
-        ctaDuration: data.cta.duration,
-      });
-    }
+    safeProgress(job, 100);
+    logger.info({ event: 'render_complete', clipId: clip.id, s3Path: s3ClipKey });
+  } catch (error) {
+    logger.error({
+      event: 'render_error',
+      clipId: data.clipId,
+      error: error instanceof Error ? error.message : error,
+      stack: error instanceof Error ? error.stack : undefined,
+    });
 
-    // 10. Generate thumbnail (non-fatal — proceed without if it fails)
-    safeProgress(job, 70);
-    const thumbnailTimeOffset = clipDuration * 0.25;
-    let thumbnailGenerated = false;
+    // Don't mark clip as failed here — let BullMQ retry first.
+    // The on('failed') handler marks failed only after all retries are exhausted.
+    throw error;
+  } finally {
+    // 14. Release cached source + cleanup temp files (non-fatal)
+    source?.release();
     try {
-      await generateThumbnail(renderedClip, thumbnailLocal, thumbnailTimeOffset);
-      thumbnailGenerated = true;
-      logger.info({ event: 'thumbnail_generated', clipId: clip.id });
-    } catch (thumbnailError) {
+      await rm(tmpDir, { recursive: true, force: true });
+      logger.debug({ event: 'tmpdir_cleaned', path: tmpDir });
+    } catch (cleanupError) {
       logger.warn({
-        event: 'thumbnail_failed',
-        clipId: clip.id,
-        error: thumbnailError instanceof Error ? thumbnailError.message : thumbnailError,
+        event: 'tmpdir_cleanup_failed',
+        path: tmpDir,
+        error: cleanupError instanceof Error ? cleanupError.message : cleanupError,
       });
     }
+  }
+}
 
-    // 11. Upload rendered clip + thumbnail to S3
-    // Note: readFile loads entire clip into memory. For clips up to 180s at 1080p,
-    // this is ~50-200MB per clip. With concurrency 3, peak ~600MB. Acceptable for
-    // 4GB+ worker containers. Streaming upload requires changes to @clipmaker/s3.
-    safeProgress(job, 80);
-    const clipBuffer = await readFile(renderedClip);
-    await putObject(s3ClipKey, clipBuffer, 'video/mp4');
-    logger.info({ event: 's3_upload_clip', key: s3ClipKey });
-
-    if (thumbnailGenerated) {
-      const thumbBuffer = await readFile(thumbnailLocal);
-      await putObject(s3ThumbnailKey, thumbBuffer, 'image/jpeg');
-      logger.info({ event: 's3_upload_thumbnail', key: s3ThumbnailKey });
-    }
+// ---------------------------------------------------------------------------
+// Batch handler: all clips of a video, one source decode per clip group
+// ---------------------------------------------------------------------------
 
-    // 12. Update clip in DB: filePath, thumbnailPath, status='ready'
-    safeProgress(job, 95);
-    await prisma.clip.update({
-      where: { id: clip.id },
-      data: {
-        filePath: s3ClipKey,
-        thumbnailPath: thumbnailGenerated ? s3ThumbnailKey : null,
-        status: 'ready',
-      },
+async function handleRenderBatchJob(job: Job<VideoRenderBatchJobData>): Promise<void> {
+  const jobData = job.data;
+  const clipIds = (jobData.clips ?? []).map((c) => c.clipId);
+  logger.info({ event: 'render_batch_start', videoId: jobData.videoId, clips: clipIds.length });
+
+  // 1. Validate job data with Zod
+  const parsed = VideoRenderBatchJobSchema.safeParse(jobData);
+  if (!parsed.success) {
+    logger.error({
+      event: 'render_batch_validation_failed',
+      videoId: jobData.videoId,
+      errors: parsed.error.issues,
     });
+    await prisma.clip.updateMany({
+      where: { id: { in: clipIds } },
+      data: { status: 'failed' },
+    }).catch(() => {});
+    throw new UnrecoverableError(`Invalid job data: ${parsed.error.message}`);
+  }
 
-    // 13. Check if all clips for this video are ready
-    await checkVideoCompletion(video.id);
+  const data = parsed.data;
+
+  // 2. Idempotency guard: only render clips that are pending or failed
+  // (a retry after a partial failure skips clips that already reached 'ready')
+  const dbClips = await prisma.clip.findMany({
+    where: { id: { in: clipIds }, videoId: data.videoId },
+    select: { id: true, status: true, userId: true },
+  });
+  const renderableIds = new Set(
+    dbClips.filter((c) => c.status === 'pending' || c.status === 'failed').map((c) => c.id),
+  );
+  const clips = data.clips.filter((c) => renderableIds.has(c.clipId));
+  const userId = dbClips[0]?.userId;
+
+  if (clips.length === 0 || !userId) {
+    logger.warn({ event: 'render_batch_skip', videoId: data.videoId, clips: dbClips.length });
+    return;
+  }
+
+  // 3. Set status to 'rendering'
+  const batchIds = clips.map((c) => c.clipId);
+  await prisma.clip.updateMany({
+    where: { id: { in: batchIds } },
+    data: { status: 'rendering' },
+  });
+
+  const tmpDir = await mkdtemp(path.join(os.tmpdir(), 'clipmaker-render-batch-'));
+  let source: SourceHandle | undefined;
+
+  try {
+    // 4. Acquire source once for the whole video
+    safeProgress(job, 5);
+    source = await acquireSource(data.sourceFilePath);
+    const hasAudio = await ffprobeHasAudio(source.path);
+    logger.info({
+      event: 'source_acquired',
+      s3Key: data.sourceFilePath,
+      localPath: source.path,
+      cache: getSourceCacheStats(),
+    });
+
+    // 5. Group nearby clips so each group is decoded once
+    const groups = groupClipsForBatch(clips);
+    const ctaCards = new CtaCardCache(tmpDir);
+    logger.info({ event: 'render_batch_groups', videoId: data.videoId, groups: groups.map((g) => g.length) });
+
+    let completed = 0;
+    for (const group of groups) {
+      const outputs = await Promise.all(
+        group.map(async (clip) => ({
+          outputPath: path.join(tmpDir, `clip-${clip.clipId}.mp4`),
+          startTime: clip.startTime,
+          endTime: clip.endTime,
+          filterChain: await prepareFilterChain(tmpDir, clip, data.watermark),
+        })),
+      );
+
+      await renderClipGroup({ inputPath: source.path, outputs, hasAudio });
+
+      for (const [i, clip] of group.entries()) {
+        await finalizeRenderedClip({
+          clipId: clip.clipId,
+          videoId: data.videoId,
+          userId,
+          renderedPath: outputs[i]!.outputPath,
+          tmpDir,
+          clipDuration: clip.endTime - clip.startTime,
+          format: clip.format,
+          cta: clip.cta,
+          ctaCards,
+        });
+        completed++;
+        safeProgress(job, 5 + Math.round((completed / clips.length) * 90));
+      }
+
+      // Per-clip statuses are already 'ready' — let the video complete as soon as possible
+      await checkVideoCompletion(data.videoId);
+    }
 
     safeProgress(job, 100);
-    logger.info({ event: 'render_complete', clipId: clip.id, s3Path: s3ClipKey });
+    logger.info({
+      event: 'render_batch_complete',
+      videoId: data.videoId,
+      clips: clips.length,
+      groups: groups.length,
+      ctaCards: ctaCards.size,
+    });
   } catch (error) {
     logger.error({
-      event: 'render_error',
-      clipId: data.clipId,
+      event: 'render_batch_error',
+      videoId: data.videoId,
       error: error instanceof Error ? error.message : error,
       stack: error instanceof Error ? error.stack : undefined,
     });
 
-    // Don't mark clip as failed here — let BullMQ retry first.
-    // The on('failed') handler marks failed only after all retries are exhausted.
+    // Return unfinished clips to 'pending' so the BullMQ retry picks them up
+    await prisma.clip.updateMany({
+      where: { id: { in: batchIds }, status: 'rendering' },
+      data: { status: 'pending' },
+    }).catch(() => {});
     throw error;
   } finally {
-    // 14. Cleanup temp files (non-fatal)
+    source?.release();
     try {
       await rm(tmpDir, { recursive: true, force: true });
       logger.debug({ event: 'tmpdir_cleaned', path: tmpDir });
@@ -320,47 +444,61 @@ async function handleRenderJob(job: Job<VideoRenderJobData>): Promise<void> {
 // Worker registration
 // ---------------------------------------------------------------------------
 
-const worker = new Worker<VideoRenderJobData>(
+// Off by default: node capacity is already bounded by AdaptiveConcurrency; set this
+// only to cap total starts across the fleet (e.g. a shared storage or egress budget)
+const RENDER_RATE_LIMIT_PER_MINUTE = parseInt(process.env.RENDER_RATE_LIMIT_PER_MINUTE || '0', 10);
+
+const worker = new Worker<VideoRenderJobData | VideoRenderBatchJobData>(
   QUEUE_NAMES.VIDEO_RENDER,
-  handleRenderJob,
+  (job) =>
+    job.name === RENDER_BATCH_JOB_NAME
+      ? handleRenderBatchJob(job as Job<VideoRenderBatchJobData>)
+      : handleRenderJob(job as Job<VideoRenderJobData>),
   {
     connection: getRedisConnection(),
+    // Initial value; resized from host capacity by AdaptiveConcurrency (workers/index.ts)
     concurrency: 3,
-    limiter: {
-      max: 5,
-      duration: 60_000,
-    },
+    // Queue-wide (all nodes) start rate; 0 disables
+    ...(RENDER_RATE_LIMIT_PER_MINUTE > 0 && {
+      limiter: {
+        max: RENDER_RATE_LIMIT_PER_MINUTE,
+        duration: 60_000,
+      },
+    }),
   },
 );
 
 worker.on('failed', async (job, err) => {
-  const clipId = job?.data?.clipId;
   const videoId = job?.data?.videoId;
+  const clipIds = job?.name === RENDER_BATCH_JOB_NAME
+    ? ((job.data as VideoRenderBatchJobData).clips ?? []).map((c) => c.clipId)
+    : [(job?.data as VideoRenderJobData | undefined)?.clipId].filter((id): id is string => !!id);
   logger.error({
     event: 'render_job_failed',
     jobId: job?.id,
-    clipId,
+    clipIds,
     videoId,
     error: err.message,
     attemptsMade: job?.attemptsMade,
   });
 
-  // Mark clip as failed and check video failure after ALL retries exhausted.
+  // Mark clips as failed and check video failure after ALL retries exhausted.
   // BullMQ's `attempts` defaults to 0 (no retries) if not set on the job.
   // DEFAULT_JOB_OPTIONS sets attempts=3, so attemptsMade will be 3 on final failure.
   const maxAttempts = job?.opts?.attempts ?? 0;
-  if (job && clipId && job.attemptsMade >= maxAttempts) {
+  if (job && clipIds.length > 0 && job.attemptsMade >= maxAttempts) {
     logger.error({
       event: 'render_job_exhausted',
       jobId: job.id,
-      clipId,
+      clipIds,
       videoId,
       attemptsMade: job.attemptsMade,
     });
 
-    // Ensure clip is marked failed (best effort)
-    await prisma.clip.update({
-      where: { id: clipId },
+    // Ensure unfinished clips are marked failed (best effort).
+    // Batch jobs may have rendered some clips before failing — keep those ready.
+    await prisma.clip.updateMany({
+      where: { id: { in: clipIds }, status: { not: 'ready' } },
       data: { status: 'failed' },
     }).catch(() => {});
 
@@ -1,4 +1,5 @@
 import type { LLMProviderConfig } from '@clipmaker/types';
+import { env } from './env';
 
 /** Maps native model IDs to OpenRouter model IDs */
 export const OPENROUTER_MODEL_MAP: Record<string, string> = {
@@ -17,7 +18,7 @@ export const LLM_PROVIDERS: Record<'ru' | 'global', LLMProviderConfig> = {
     tier1: { provider: 'cloudru', model: 't-tech/T-pro-it-2.1', costInput: 35, costOutput: 70 },
     tier2: { provider: 'cloudru', model: 'Qwen3-235B-A22B-Instruct-2507', costInput: 17, costOutput: 70 },
     tier3: { provider: 'cloudru', model: 'zai-org/GLM-4.6', costInput: 55, costOutput: 220 },
-    baseUrl: 'https://foundation-models.api.cloud.ru/v1',
+    baseUrl: env.CLOUDRU_BASE_URL,
     dataResidency: 'RU',
   },
   global: {
@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "clips" ALTER COLUMN "subtitle_segments" DROP NOT NULL;
@@ -0,0 +1,63 @@
+-- AlterTable
+ALTER TABLE "publications" ADD COLUMN "user_id" UUID;
+
+UPDATE "publications" p
+SET "user_id" = c."user_id"
+FROM "clips" c
+WHERE c."id" = p."clip_id";
+
+ALTER TABLE "publications" ALTER COLUMN "user_id" SET NOT NULL;
+
+-- CreateTable
+CREATE TABLE "analytics_user_daily" (
+    "user_id" UUID NOT NULL,
+    "day" DATE NOT NULL,
+    "platform" "PublicationPlatform" NOT NULL,
+    "views" INTEGER NOT NULL DEFAULT 0,
+    "likes" INTEGER NOT NULL DEFAULT 0,
+    "shares" INTEGER NOT NULL DEFAULT 0,
+    "published" INTEGER NOT NULL DEFAULT 0,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "analytics_user_daily_pkey" PRIMARY KEY ("user_id","day","platform")
+);
+
+-- CreateTable
+CREATE TABLE "analytics_team_daily" (
+    "team_id" UUID NOT NULL,
+    "day" DATE NOT NULL,
+    "platform" "PublicationPlatform" NOT NULL,
+    "views" INTEGER NOT NULL DEFAULT 0,
+    "likes" INTEGER NOT NULL DEFAULT 0,
+    "shares" INTEGER NOT NULL DEFAULT 0,
+    "published" INTEGER NOT NULL DEFAULT 0,
+    "updated_at" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "analytics_team_daily_pkey" PRIMARY KEY ("team_id","day","platform")
+);
+
+-- CreateIndex
+CREATE INDEX "publications_user_id_status_views_idx" ON "publications"("user_id", "status", "views" DESC);
+
+-- AddForeignKey
+ALTER TABLE "analytics_user_daily" ADD CONSTRAINT "analytics_user_daily_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "users"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- AddForeignKey
+ALTER TABLE "analytics_team_daily" ADD CONSTRAINT "analytics_team_daily_team_id_fkey" FOREIGN KEY ("team_id") REFERENCES "teams"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill: existing engagement is attributed to the publication day
+INSERT INTO "analytics_user_daily" ("user_id", "day", "platform", "views", "likes", "shares", "published", "updated_at")
+SELECT p."user_id", p."published_at"::date, p."platform",
+       SUM(p."views"), SUM(p."likes"), SUM(p."shares"), COUNT(*), CURRENT_TIMESTAMP
+FROM "publications" p
+WHERE p."status" = 'published' AND p."published_at" IS NOT NULL
+GROUP BY 1, 2, 3;
+
+INSERT INTO "analytics_team_daily" ("team_id", "day", "platform", "views", "likes", "shares", "published", "updated_at")
+SELECT v."team_id", p."published_at"::date, p."platform",
+       SUM(p."views"), SUM(p."likes"), SUM(p."shares"), COUNT(*), CURRENT_TIMESTAMP
+FROM "publications" p
+JOIN "clips" c ON c."id" = p."clip_id"
+JOIN "videos" v ON v."id" = c."video_id"
+WHERE p."status" = 'published' AND p."published_at" IS NOT NULL AND v."team_id" IS NOT NULL
+GROUP BY 1, 2, 3;
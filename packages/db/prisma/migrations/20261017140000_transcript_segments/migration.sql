@@ -0,0 +1,24 @@
+-- CreateTable
+CREATE TABLE "transcript_segments" (
+    "transcript_id" UUID NOT NULL,
+    "idx" INTEGER NOT NULL,
+    "start_time" DOUBLE PRECISION NOT NULL,
+    "end_time" DOUBLE PRECISION NOT NULL,
+    "text" TEXT NOT NULL,
+    "confidence" DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    CONSTRAINT "transcript_segments_pkey" PRIMARY KEY ("transcript_id","idx")
+);
+
+-- CreateIndex
+CREATE INDEX "transcript_segments_transcript_id_start_time_idx" ON "transcript_segments"("transcript_id", "start_time");
+
+-- AddForeignKey
+ALTER TABLE "transcript_segments" ADD CONSTRAINT "transcript_segments_transcript_id_fkey" FOREIGN KEY ("transcript_id") REFERENCES "transcripts"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill: idx is the 0-based array position used by transcript edits
+INSERT INTO "transcript_segments" ("transcript_id", "idx", "start_time", "end_time", "text", "confidence")
+SELECT t."id", (e.ord - 1)::int,
+       (e.value->>'start')::float8, (e.value->>'end')::float8,
+       COALESCE(e.value->>'text', ''), COALESCE((e.value->>'confidence')::float8, 0)
+FROM "transcripts" t, jsonb_array_elements(t."segments") WITH ORDINALITY AS e(value, ord);
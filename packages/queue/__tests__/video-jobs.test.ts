@@ -0,0 +1,241 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import { EventEmitter } from 'events';
+import type { Worker } from 'bullmq';
+
+/** In-memory Redis with the commands the video job index uses */
+const redis = vi.hoisted(() => {
+  const sets = new Map<string, Set<string>>();
+  const hashes = new Map<string, Record<string, string>>();
+  const strings = new Set<string>();
+  const ttls = new Map<string, number>();
+
+  const commands = {
+    sadd: async (key: string, ...members: string[]) => {
+      const set = sets.get(key) ?? new Set<string>();
+      members.forEach((m) => set.add(m));
+      sets.set(key, set);
+      return members.length;
+    },
+    srem: async (key: string, ...members: string[]) => {
+      const set = sets.get(key);
+      return members.filter((m) => set?.delete(m)).length;
+    },
+    smembers: async (key: string) => [...(sets.get(key) ?? [])],
+    expire: async (key: string, seconds: number) => {
+      ttls.set(key, seconds);
+      return 1;
+    },
+    exists: async (key: string) => (hashes.has(key) || strings.has(key) || sets.has(key) ? 1 : 0),
+    hexists: async (key: string, field: string) => (hashes.get(key)?.[field] !== undefined ? 1 : 0),
+  };
+  type CommandName = keyof typeof commands;
+
+  const client = {
+    ...commands,
+    pipeline() {
+      const queued: Array<() => Promise<unknown>> = [];
+      const pipeline = Object.fromEntries(
+        (Object.keys(commands) as CommandName[]).map((name) => [
+          name,
+          (...args: unknown[]) => {
+            queued.push(() => (commands[name] as (...a: unknown[]) => Promise<unknown>)(...args));
+            return pipeline;
+          },
+        ]),
+      ) as Record<CommandName, (...args: unknown[]) => unknown> & { exec(): Promise<Array<[null, unknown]>> };
+      pipeline.exec = async () => Promise.all(queued.map(async (run) => [null, await run()] as [null, unknown]));
+      return pipeline;
+    },
+  };
+
+  return {
+    sets,
+    hashes,
+    strings,
+    ttls,
+    client,
+    reset() {
+      sets.clear();
+      hashes.clear();
+      strings.clear();
+      ttls.clear();
+    },
+  };
+});
+
+const moveToFailed = vi.hoisted(() => vi.fn());
+
+vi.mock('bullmq', () => {
+  let nextId = 0;
+
+  class Queue {
+    readonly client = Promise.resolve(redis.client);
+
+    constructor(readonly name: string) {}
+
+    toKey(type: string): string {
+      return `bull:${this.name}:${type}`;
+    }
+
+    async add(name: string, data: unknown) {
+      const id = String(++nextId);
+      redis.hashes.set(this.toKey(id), { name, data: JSON.stringify(data) });
+      return { id, name, data };
+    }
+
+    async addBulk(jobs: Array<{ name: string; data: unknown }>) {
+      return Promise.all(jobs.map((job) => this.add(job.name, job.data)));
+    }
+
+    /** 0 when a worker holds the lock, like BullMQ's removeJob script */
+    async remove(id: string) {
+      const key = this.toKey(id);
+      if (redis.strings.has(`${key}:lock`)) return 0;
+      return redis.hashes.delete(key) ? 1 : 0;
+    }
+  }
+
+  class Job {
+    static async fromId(queue: Queue, id: string) {
+      const hash = redis.hashes.get(queue.toKey(id));
+      if (!hash) return undefined;
+      return {
+        id,
+        moveToFailed: async (...args: unknown[]) => {
+          moveToFailed(id, ...args);
+          hash.finishedOn = String(Date.now());
+        },
+      };
+    }
+  }
+
+  return { Queue, Job };
+});
+
+import { createQueue, cancelJobsByVideoId, pruneFinishedVideoJobs } from '../src/queues';
+
+const INDEX = (queue: string, videoId: string) => `bull:${queue}:videojobs:${videoId}`;
+const indexed = (queue: string, videoId: string) => [...(redis.sets.get(INDEX(queue, videoId)) ?? [])].sort();
+
+describe('video job index', () => {
+  beforeEach(() => {
+    redis.reset();
+    moveToFailed.mockReset();
+  });
+
+  it('add() indexes jobs that carry a videoId, with a TTL', async () => {
+    const queue = createQueue('stt');
+    const job = await queue.add('stt', { videoId: 'v1' });
+    await queue.add('collect', { platform: 'vk' });
+
+    expect(indexed('stt', 'v1')).toEqual([job.id]);
+    expect(redis.ttls.get(INDEX('stt', 'v1'))).toBeGreaterThan(0);
+    expect([...redis.sets.keys()]).toEqual([INDEX('stt', 'v1')]);
+  });
+
+  it('addBulk() groups ids per video', async () => {
+    const queue = createQueue('video-render');
+    const jobs = await queue.addBulk([
+      { name: 'render', data: { videoId: 'v1', clipId: 'a' } },
+      { name: 'render', data: { videoId: 'v2', clipId: 'b' } },
+      { name: 'render', data: { videoId: 'v1', clipId: 'c' } },
+    ]);
+
+    expect(indexed('video-render', 'v1')).toEqual([jobs[0]!.id, jobs[2]!.id].sort());
+    expect(indexed('video-render', 'v2')).toEqual([jobs[1]!.id]);
+  });
+});
+
+describe('cancelJobsByVideoId', () => {
+  beforeEach(() => {
+    redis.reset();
+    moveToFailed.mockReset();
+  });
+
+  it('removes pending jobs, fails active ones and prunes stale ids', async () => {
+    const queue = createQueue('video-render');
+    const [pending, active, finished, gone, other] = await queue.addBulk([
+      { name: 'render', data: { videoId: 'v1' } },
+      { name: 'render', data: { videoId: 'v1' } },
+      { name: 'render', data: { videoId: 'v1' } },
+      { name: 'render', data: { videoId: 'v1' } },
+      { name: 'render', data: { videoId: 'v2' } },
+    ]);
+    redis.strings.add(`${queue.toKey(active!.id!)}:lock`);
+    redis.hashes.get(queue.toKey(finished!.id!))!.finishedOn = '1';
+    redis.hashes.delete(queue.toKey(gone!.id!));
+
+    const cancelled = await cancelJobsByVideoId('v1', ['video-render']);
+
+    expect(cancelled).toBe(2);
+    expect(redis.hashes.has(queue.toKey(pending!.id!))).toBe(false);
+    expect(moveToFailed).toHaveBeenCalledTimes(1);
+    expect(moveToFailed).toHaveBeenCalledWith(active!.id, expect.any(Error), '0', false);
+    expect(indexed('video-render', 'v1')).toEqual([]);
+    expect(indexed('video-render', 'v2')).toEqual([other!.id]);
+  });
+
+  it('fails a pending job that a worker locked before it could be removed', async () => {
+    const queue = createQueue('stt');
+    const job = await queue.add('stt', { videoId: 'v1' });
+    const remove = queue.remove.bind(queue);
+    vi.spyOn(queue, 'remove').mockImplementationOnce(async (id: string) => {
+      redis.strings.add(`${queue.toKey(id)}:lock`);
+      return remove(id);
+    });
+
+    const cancelled = await cancelJobsByVideoId('v1', ['stt']);
+
+    expect(cancelled).toBe(1);
+    expect(moveToFailed).toHaveBeenCalledWith(job.id, expect.any(Error), '0', false);
+    expect(indexed('stt', 'v1')).toEqual([]);
+  });
+
+  it('sums across queues and returns 0 for an unknown video', async () => {
+    await createQueue('stt').add('stt', { videoId: 'v1' });
+    await createQueue('llm').add('analyze', { videoId: 'v1' });
+
+    expect(await cancelJobsByVideoId('nope', ['stt', 'llm'])).toBe(0);
+    expect(await cancelJobsByVideoId('v1', ['stt', 'llm'])).toBe(2);
+  });
+});
+
+describe('pruneFinishedVideoJobs', () => {
+  beforeEach(() => {
+    redis.reset();
+  });
+
+  function fakeWorker(name: string) {
+    const worker = Object.assign(new EventEmitter(), {
+      name,
+      client: Promise.resolve(redis.client),
+      toKey: (type: string) => `bull:${name}:${type}`,
+    });
+    pruneFinishedVideoJobs(worker as unknown as Worker);
+    return worker;
+  }
+
+  const flush = () => new Promise((r) => setTimeout(r, 0));
+
+  it('drops completed jobs and failed jobs with no attempts left', async () => {
+    await redis.client.sadd(INDEX('stt', 'v1'), '1', '2', '3');
+    const worker = fakeWorker('stt');
+    const job = (id: string, attemptsMade: number) => ({ id, data: { videoId: 'v1' }, attemptsMade, opts: { attempts: 3 } });
+
+    worker.emit('completed', job('1', 1));
+    worker.emit('failed', job('2', 1));
+    worker.emit('failed', job('3', 3));
+    await flush();
+
+    expect(indexed('stt', 'v1')).toEqual(['2']);
+  });
+
+  it('ignores jobs without a videoId', async () => {
+    const worker = fakeWorker('stats-collect');
+
+    worker.emit('completed', { id: '1', data: {}, attemptsMade: 1, opts: {} });
+    await flush();
+
+    expect(redis.sets.size).toBe(0);
+  });
+});
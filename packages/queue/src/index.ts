@@ -1,3 +1,3 @@
-export { createQueue, getQueue, cancelJobsByVideoId } from './queues';
+export { createQueue, getQueue, cancelJobsByVideoId, pruneFinishedVideoJobs } from './queues';
 export { QUEUE_NAMES, DEFAULT_JOB_OPTIONS } from './constants';
-export type { STTJobData, LLMJobData, VideoRenderJobData, PublishJobData, StatsCollectJobData, VideoDownloadJobData } from '@clipmaker/types';
+export type { STTJobData, LLMJobData, VideoRenderJobData, VideoRenderBatchJobData, PublishJobData, StatsCollectJobData, VideoDownloadJobData } from '@clipmaker/types';
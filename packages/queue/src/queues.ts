@@ -1,8 +1,59 @@
-import { Queue, type Job } from 'bullmq';
+import { Job, Queue, type Worker } from 'bullmq';
 import type { QueueName } from '@clipmaker/types';
 
 const queues = new Map<string, Queue>();
 
+/** Entries are pruned on finish and on cancel; the TTL bounds anything missed (crashed workers, removed jobs) */
+const VIDEO_JOB_INDEX_TTL_SECONDS = 7 * 24 * 60 * 60;
+
+/** Set of job ids enqueued for a video: bull:<queue>:videojobs:<videoId> */
+function videoJobsKey(queue: { toKey(type: string): string }, videoId: string): string {
+  return queue.toKey(`videojobs:${videoId}`);
+}
+
+function jobVideoId(job: { data?: unknown }): string | undefined {
+  const videoId = (job.data as { videoId?: unknown } | undefined)?.videoId;
+  return typeof videoId === 'string' ? videoId : undefined;
+}
+
+/**
+ * Queue that records every job carrying `data.videoId` in a per-video index set,
+ * so cancelJobsByVideoId touches only that video's jobs instead of the backlog.
+ * Covers add() and addBulk() for every producer that goes through createQueue.
+ */
+class VideoIndexedQueue extends Queue {
+  override async add(...args: Parameters<Queue['add']>): ReturnType<Queue['add']> {
+    const job = await super.add(...args);
+    await this.indexJobs([job]);
+    return job;
+  }
+
+  override async addBulk(...args: Parameters<Queue['addBulk']>): ReturnType<Queue['addBulk']> {
+    const jobs = await super.addBulk(...args);
+    await this.indexJobs(jobs);
+    return jobs;
+  }
+
+  private async indexJobs(jobs: Job[]): Promise<void> {
+    const byVideo = new Map<string, string[]>();
+    for (const job of jobs) {
+      const videoId = jobVideoId(job);
+      if (!videoId || !job.id) continue;
+      byVideo.set(videoId, [...(byVideo.get(videoId) ?? []), job.id]);
+    }
+    if (byVideo.size === 0) return;
+
+    const client = await this.client;
+    const pipeline = client.pipeline();
+    for (const [videoId, ids] of byVideo) {
+      const key = videoJobsKey(this, videoId);
+      pipeline.sadd(key, ...ids);
+      pipeline.expire(key, VIDEO_JOB_INDEX_TTL_SECONDS);
+    }
+    await pipeline.exec();
+  }
+}
+
 export function getRedisConnection() {
   const url = process.env.REDIS_URL || 'redis://localhost:6379';
   const parsed = new URL(url);
@@ -17,7 +68,7 @@ export function createQueue(name: QueueName): Queue {
   const existing = queues.get(name);
   if (existing) return existing;
 
-  const queue = new Queue(name, {
+  const queue = new VideoIndexedQueue(name, {
     connection: getRedisConnection(),
   });
 
@@ -33,35 +84,106 @@ export function getQueue(name: QueueName): Queue {
   return queue;
 }
 
+/**
+ * Splits a video's indexed jobs by state in two round trips (O(jobs of this video)):
+ * - pending (waiting / delayed / prioritized): no lock, not finished
+ * - active: lock key held by a worker
+ * Ids of jobs that no longer exist or already finished are dropped from the index.
+ * Job keys are only known after reading the index, so they are checked client-side
+ * in a pipeline rather than in a Lua script (Redis Cluster routes scripts by KEYS).
+ */
+async function classifyVideoJobs(queue: Queue, videoId: string): Promise<{ pending: string[]; active: string[] }> {
+  const client = await queue.client;
+  const key = videoJobsKey(queue, videoId);
+  const ids = await client.smembers(key);
+  const pending: string[] = [];
+  const active: string[] = [];
+  if (ids.length === 0) return { pending, active };
+
+  const pipeline = client.pipeline();
+  for (const id of ids) {
+    const jobKey = queue.toKey(id);
+    pipeline.exists(jobKey);
+    pipeline.hexists(jobKey, 'finishedOn');
+    pipeline.exists(`${jobKey}:lock`);
+  }
+  const results = (await pipeline.exec()) ?? [];
+  const flags = results.map(([err, value]) => {
+    if (err) throw err;
+    return value === 1;
+  });
+
+  const stale: string[] = [];
+  ids.forEach((id, i) => {
+    const [exists, finished, locked] = flags.slice(i * 3, i * 3 + 3);
+    if (!exists || finished) stale.push(id);
+    else if (locked) active.push(id);
+    else pending.push(id);
+  });
+  if (stale.length > 0) await client.srem(key, ...stale);
+
+  return { pending, active };
+}
+
 /**
  * Cancel all BullMQ jobs for a given videoId across specified queues.
  * - Waiting/delayed jobs: removed from queue
  * - Active jobs: moved to failed state so worker stops retrying
+ * Only the video's own jobs are read (via the videojobs index), so the cost does
+ * not depend on the size of the backlog. Queues are processed concurrently.
  * Returns total number of cancelled jobs.
  */
 export async function cancelJobsByVideoId(
   videoId: string,
   queueNames: QueueName[],
 ): Promise<number> {
-  let cancelled = 0;
+  const counts = await Promise.all(
+    queueNames.map(async (name) => {
+      const queue = getQueue(name);
+      const { pending, active } = await classifyVideoJobs(queue, videoId);
+      if (pending.length === 0 && active.length === 0) return 0;
 
-  for (const name of queueNames) {
-    const queue = getQueue(name);
-    const jobs: Job[] = await queue.getJobs(['waiting', 'delayed', 'active']);
+      // remove() returns 0 if a worker locked the job since classification: fail it instead
+      const removed = await Promise.all(pending.map((id) => queue.remove(id)));
+      const toFail = [...active, ...pending.filter((_, i) => removed[i] !== 1)];
 
-    for (const job of jobs) {
-      if (job.data?.videoId !== videoId) continue;
-
-      const state = await job.getState();
-      if (state === 'waiting' || state === 'delayed') {
-        await job.remove();
-        cancelled++;
-      } else if (state === 'active') {
-        await job.moveToFailed(new Error('Остановлено пользователем'), '0', false);
-        cancelled++;
-      }
-    }
-  }
+      const failed = await Promise.all(
+        toFail.map(async (id) => {
+          const job = await Job.fromId(queue, id);
+          if (!job) return false;
+          await job.moveToFailed(new Error('Остановлено пользователем'), '0', false);
+          return true;
+        }),
+      );
+
+      const client = await queue.client;
+      await client.srem(videoJobsKey(queue, videoId), ...pending, ...active);
+      return removed.filter((r) => r === 1).length + failed.filter(Boolean).length;
+    }),
+  );
 
-  return cancelled;
+  return counts.reduce((sum, n) => sum + n, 0);
+}
+
+/**
+ * Drops jobs from the videoId index once they finish for good (completed, or failed
+ * with no attempts left). Call once per Worker. Missed updates are harmless:
+ * cancelJobsByVideoId skips and prunes finished ids, and index sets expire.
+ */
+export function pruneFinishedVideoJobs(worker: Worker): void {
+  const prune = (job: Job | undefined) => {
+    const videoId = job && jobVideoId(job);
+    if (!job?.id || !videoId) return;
+    const jobId = job.id;
+    worker.client
+      .then((client) => client.srem(videoJobsKey(worker, videoId), jobId))
+      .catch(() => {
+        // Best effort -- see above
+      });
+  };
+
+  worker.on('completed', (job) => prune(job));
+  worker.on('failed', (job) => {
+    if (job && job.attemptsMade >= (job.opts.attempts ?? 1)) prune(job);
+  });
 }
@@ -0,0 +1,178 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import { Readable } from 'stream';
+import {
+  PutObjectCommand,
+  CreateMultipartUploadCommand,
+  UploadPartCommand,
+  CompleteMultipartUploadCommand,
+  AbortMultipartUploadCommand,
+} from '@aws-sdk/client-s3';
+
+const send = vi.fn();
+
+vi.mock('../src/client', () => ({
+  getS3Client: () => ({ send }),
+  getBucket: () => 'test-bucket',
+}));
+
+import { uploadStream } from '../src/upload';
+
+const MB = 1024 * 1024;
+
+/** Readable that yields `totalBytes` in `chunkBytes` chunks and counts what was read */
+function chunkedSource(totalBytes: number, chunkBytes = MB) {
+  const stats = { chunksRead: 0 };
+  const stream = Readable.from(
+    (function* () {
+      for (let offset = 0; offset < totalBytes; offset += chunkBytes) {
+        stats.chunksRead++;
+        yield Buffer.alloc(Math.min(chunkBytes, totalBytes - offset), stats.chunksRead);
+      }
+    })(),
+    { highWaterMark: 1 },
+  );
+  return { stream, stats };
+}
+
+function sentCommands<T>(type: new (...args: never[]) => T): T[] {
+  return send.mock.calls.map(([command]) => command).filter((c): c is T => c instanceof type);
+}
+
+const tick = (ms = 5) => new Promise((r) => setTimeout(r, ms));
+
+describe('uploadStream', () => {
+  beforeEach(() => {
+    send.mockReset();
+    send.mockImplementation(async (command: unknown) => {
+      if (command instanceof CreateMultipartUploadCommand) return { UploadId: 'upload-1' };
+      if (command instanceof UploadPartCommand) return { ETag: `"etag-${command.input.PartNumber}"` };
+      return {};
+    });
+  });
+
+  it('uses a single PUT for objects smaller than one part', async () => {
+    const { stream } = chunkedSource(3 * MB);
+
+    const result = await uploadStream('clips/a.mp4', stream, { contentType: 'video/mp4', partSize: 5 * MB });
+
+    expect(result).toEqual({ sizeBytes: 3 * MB, parts: 1 });
+    expect(send).toHaveBeenCalledTimes(1);
+    const [put] = sentCommands(PutObjectCommand);
+    expect(put!.input).toMatchObject({ Bucket: 'test-bucket', Key: 'clips/a.mp4', ContentType: 'video/mp4' });
+    expect((put!.input.Body as Buffer).length).toBe(3 * MB);
+    expect(sentCommands(CreateMultipartUploadCommand)).toHaveLength(0);
+  });
+
+  it('splits the source into partSize parts with a smaller last part', async () => {
+    const { stream } = chunkedSource(12 * MB + 100, 3 * MB);
+
+    const result = await uploadStream('clips/a.mp4', stream, { contentType: 'video/mp4', partSize: 5 * MB });
+
+    expect(result).toEqual({ sizeBytes: 12 * MB + 100, parts: 3 });
+    const parts = sentCommands(UploadPartCommand);
+    expect(parts.map((p) => p.input.PartNumber)).toEqual([1, 2, 3]);
+    expect(parts.map((p) => (p.input.Body as Buffer).length)).toEqual([5 * MB, 5 * MB, 2 * MB + 100]);
+    expect(parts.every((p) => p.input.UploadId === 'upload-1')).toBe(true);
+    expect(sentCommands(PutObjectCommand)).toHaveLength(0);
+  });
+
+  it('keeps at most `concurrency` parts in flight and stops reading while they upload', async () => {
+    const { stream, stats } = chunkedSource(40 * MB);
+    const pending: Array<() => void> = [];
+    let active = 0;
+    let maxActive = 0;
+    send.mockImplementation(async (command: unknown) => {
+      if (command instanceof CreateMultipartUploadCommand) return { UploadId: 'upload-1' };
+      if (command instanceof UploadPartCommand) {
+        active++;
+        maxActive = Math.max(maxActive, active);
+        await new Promise<void>((r) => pending.push(r));
+        active--;
+        return { ETag: `"etag-${command.input.PartNumber}"` };
+      }
+      return {};
+    });
+
+    let settled = false;
+    const upload = uploadStream('clips/a.mp4', stream, {
+      contentType: 'video/mp4',
+      partSize: 5 * MB,
+      concurrency: 2,
+    }).finally(() => {
+      settled = true;
+    });
+
+    await tick(20);
+    expect(active).toBe(2);
+    // Two 5-part buffers plus a small read-ahead, not the whole 40MB source
+    expect(stats.chunksRead).toBeLessThan(14);
+
+    while (!settled) {
+      pending.splice(0).forEach((resolve) => resolve());
+      await tick(1);
+    }
+    await expect(upload).resolves.toEqual({ sizeBytes: 40 * MB, parts: 8 });
+    expect(maxActive).toBe(2);
+  });
+
+  it('completes with parts sorted by number even when they finish out of order', async () => {
+    const { stream } = chunkedSource(15 * MB);
+    const pending: Array<() => void> = [];
+    send.mockImplementation(async (command: unknown) => {
+      if (command instanceof CreateMultipartUploadCommand) return { UploadId: 'upload-1' };
+      if (command instanceof UploadPartCommand) {
+        await new Promise<void>((r) => pending.push(r));
+        return { ETag: `"etag-${command.input.PartNumber}"` };
+      }
+      return {};
+    });
+
+    const upload = uploadStream('clips/a.mp4', stream, {
+      contentType: 'video/mp4',
+      partSize: 5 * MB,
+      concurrency: 3,
+    });
+    await tick(20);
+    expect(pending).toHaveLength(3);
+    pending.reverse().forEach((resolve) => resolve());
+    await upload;
+
+    const [complete] = sentCommands(CompleteMultipartUploadCommand);
+    expect(complete!.input.UploadId).toBe('upload-1');
+    expect(complete!.input.MultipartUpload!.Parts).toEqual([
+      { PartNumber: 1, ETag: '"etag-1"' },
+      { PartNumber: 2, ETag: '"etag-2"' },
+      { PartNumber: 3, ETag: '"etag-3"' },
+    ]);
+  });
+
+  it('aborts the multipart upload when a part fails', async () => {
+    const { stream } = chunkedSource(15 * MB);
+    send.mockImplementation(async (command: unknown) => {
+      if (command instanceof CreateMultipartUploadCommand) return { UploadId: 'upload-1' };
+      if (command instanceof UploadPartCommand) {
+        if (command.input.PartNumber === 2) throw Object.assign(new Error('Access Denied'), { name: 'AccessDenied' });
+        return { ETag: `"etag-${command.input.PartNumber}"` };
+      }
+      return {};
+    });
+
+    await expect(
+      uploadStream('clips/a.mp4', stream, { contentType: 'video/mp4', partSize: 5 * MB }),
+    ).rejects.toThrow('Access Denied');
+
+    const [abort] = sentCommands(AbortMultipartUploadCommand);
+    expect(abort!.input).toMatchObject({ Bucket: 'test-bucket', Key: 'clips/a.mp4', UploadId: 'upload-1' });
+    expect(sentCommands(CompleteMultipartUploadCommand)).toHaveLength(0);
+    // Abort is sent only after in-flight parts settled
+    expect(send.mock.calls[send.mock.calls.length - 1]![0]).toBe(abort);
+  });
+
+  it('rejects part sizes below the S3 minimum', async () => {
+    const { stream } = chunkedSource(MB);
+    await expect(
+      uploadStream('clips/a.mp4', stream, { contentType: 'video/mp4', partSize: MB }),
+    ).rejects.toThrow('partSize must be at least 5MB');
+    expect(send).not.toHaveBeenCalled();
+  });
+});
@@ -21,5 +21,9 @@ export type { MultipartUploadInit } from './multipart';
 // Operations
 export { headObject, getObjectBytes, getObjectStream, putObject, deleteObject } from './operations';
 
+// Streaming upload
+export { uploadStream } from './upload';
+export type { UploadStreamOptions, UploadStreamResult } from './upload';
+
 // Validation
 export { validateMagicBytes } from './validation';
@@ -6,6 +6,7 @@ import {
 } from '@aws-sdk/client-s3';
 import { getSignedUrl } from '@aws-sdk/s3-request-presigner';
 import { getS3Client, getBucket } from './client';
+import { withRetry } from './operations';
 
 export type MultipartUploadInit = {
   uploadId: string;
@@ -85,15 +86,17 @@ export async function completeMultipartUpload(
   }
 
   const s3 = getS3Client();
-  await s3.send(
-    new CompleteMultipartUploadCommand({
-      Bucket: getBucket(),
-      Key: key,
-      UploadId: uploadId,
-      MultipartUpload: {
-        Parts: sorted.map((p) => ({ PartNumber: p.partNumber, ETag: p.etag })),
-      },
-    }),
+  await withRetry(() =>
+    s3.send(
+      new CompleteMultipartUploadCommand({
+        Bucket: getBucket(),
+        Key: key,
+        UploadId: uploadId,
+        MultipartUpload: {
+          Parts: sorted.map((p) => ({ PartNumber: p.partNumber, ETag: p.etag })),
+        },
+      }),
+    ),
   );
 }
 
@@ -0,0 +1,164 @@
+import { createReadStream } from 'fs';
+import type { Readable } from 'stream';
+import {
+  PutObjectCommand,
+  CreateMultipartUploadCommand,
+  UploadPartCommand,
+} from '@aws-sdk/client-s3';
+import { getS3Client, getBucket } from './client';
+import { withRetry } from './operations';
+import { completeMultipartUpload, abortMultipartUpload } from './multipart';
+
+const S3_MIN_PART_SIZE = 5 * 1024 * 1024; // S3 API minimum for all parts but the last
+const DEFAULT_PART_SIZE = 8 * 1024 * 1024; // 8MB
+const DEFAULT_CONCURRENCY = 4;
+
+export type UploadStreamOptions = {
+  contentType: string;
+  /** Bytes per multipart part (min 5MB). Objects smaller than one part use a single PUT. */
+  partSize?: number;
+  /** Parts uploaded in parallel. Peak memory is ~(concurrency + 1) * partSize. */
+  concurrency?: number;
+};
+
+export type UploadStreamResult = {
+  sizeBytes: number;
+  parts: number;
+};
+
+/**
+ * Streams a file path or Readable to S3 with bounded memory.
+ * - Source smaller than one part: single PutObject
+ * - Otherwise: multipart upload, `concurrency` parts in flight, each part
+ *   retried on transient errors (same policy as the other S3 operations)
+ * The source is read only as fast as parts are uploaded (backpressure), so
+ * memory per upload is flat regardless of object size. A failed multipart
+ * upload is aborted (best effort) before the error is rethrown.
+ */
+export async function uploadStream(
+  key: string,
+  source: string | Readable,
+  options: UploadStreamOptions,
+): Promise<UploadStreamResult> {
+  const partSize = options.partSize ?? DEFAULT_PART_SIZE;
+  const concurrency = options.concurrency ?? DEFAULT_CONCURRENCY;
+  if (partSize < S3_MIN_PART_SIZE) throw new Error('partSize must be at least 5MB');
+  if (concurrency < 1) throw new Error('concurrency must be at least 1');
+
+  const s3 = getS3Client();
+  const bucket = getBucket();
+  const stream = typeof source === 'string'
+    ? createReadStream(source, { highWaterMark: Math.min(partSize, 1024 * 1024) })
+    : source;
+
+  let buffered: Buffer[] = [];
+  let bufferedBytes = 0;
+  let sizeBytes = 0;
+
+  const takePart = (size: number): Buffer => {
+    const all = Buffer.concat(buffered, bufferedBytes);
+    const part = all.subarray(0, size);
+    const rest = all.subarray(size);
+    buffered = rest.length > 0 ? [rest] : [];
+    bufferedBytes = rest.length;
+    return part;
+  };
+
+  let uploadId: string | undefined;
+  const parts: { partNumber: number; etag: string }[] = [];
+  const inflight = new Set<Promise<void>>();
+  let failure: unknown = null;
+  let partNumber = 1;
+
+  const startPart = (body: Buffer) => {
+    const number = partNumber++;
+    const task: Promise<void> = withRetry(() =>
+      s3.send(
+        new UploadPartCommand({
+          Bucket: bucket,
+          Key: key,
+          UploadId: uploadId,
+          PartNumber: number,
+          Body: body,
+        }),
+      ),
+    )
+      .then((resp) => {
+        if (!resp.ETag) throw new Error(`Missing ETag for part ${number}`);
+        parts.push({ partNumber: number, etag: resp.ETag });
+      })
+      .catch((error: unknown) => {
+        failure ??= error;
+      })
+      .finally(() => {
+        inflight.delete(task);
+      });
+    inflight.add(task);
+  };
+
+  try {
+    for await (const chunk of stream) {
+      const buf = Buffer.isBuffer(chunk) ? chunk : Buffer.from(chunk as string);
+      buffered.push(buf);
+      bufferedBytes += buf.length;
+      sizeBytes += buf.length;
+
+      while (bufferedBytes >= partSize) {
+        if (!uploadId) {
+          const createResp = await withRetry(() =>
+            s3.send(
+              new CreateMultipartUploadCommand({
+                Bucket: bucket,
+                Key: key,
+                ContentType: options.contentType,
+              }),
+            ),
+          );
+          uploadId = createResp.UploadId;
+          if (!uploadId) throw new Error('Failed to initiate multipart upload');
+        }
+
+        startPart(takePart(partSize));
+
+        // Backpressure: stop reading until a slot frees up
+        while (inflight.size >= concurrency) {
+          await Promise.race(inflight);
+        }
+        if (failure) throw failure;
+      }
+    }
+
+    // Small object: single PUT, no multipart overhead
+    if (!uploadId) {
+      const body = takePart(bufferedBytes);
+      await withRetry(() =>
+        s3.send(
+          new PutObjectCommand({
+            Bucket: bucket,
+            Key: key,
+            Body: body,
+            ContentType: options.contentType,
+          }),
+        ),
+      );
+      return { sizeBytes, parts: 1 };
+    }
+
+    if (bufferedBytes > 0) {
+      startPart(takePart(bufferedBytes));
+    }
+    await Promise.all(inflight);
+    if (failure) throw failure;
+
+    await completeMultipartUpload(key, uploadId, parts);
+    return { sizeBytes, parts: parts.length };
+  } catch (error) {
+    if (typeof source === 'string') stream.destroy();
+    if (uploadId) {
+      // Let in-flight parts settle so abort is not raced by late part uploads
+      await Promise.allSettled(inflight);
+      await abortMultipartUpload(key, uploadId);
+    }
+    throw error;
+  }
+}
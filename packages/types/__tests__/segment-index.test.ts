@@ -0,0 +1,64 @@
+import { describe, it, expect } from 'vitest';
+import {
+  buildSegmentIndex,
+  findOverlappingSegments,
+  findSegmentsWithin,
+  clipSubtitlesFromIndex,
+} from '../src/transcript';
+
+const seg = (start: number, end: number, text = `${start}-${end}`) => ({ start, end, text });
+
+describe('buildSegmentIndex', () => {
+  it('sorts unsorted input by start', () => {
+    const index = buildSegmentIndex([seg(10, 12), seg(0, 2), seg(5, 7)]);
+    expect(index.segments.map((s) => s.start)).toEqual([0, 5, 10]);
+  });
+
+  it('keeps the input array when already sorted', () => {
+    const segments = [seg(0, 2), seg(2, 4)];
+    expect(buildSegmentIndex(segments).segments).toBe(segments);
+  });
+});
+
+describe('findOverlappingSegments', () => {
+  const index = buildSegmentIndex([seg(0, 5), seg(5, 10), seg(10, 15), seg(15, 20)]);
+
+  it('returns segments overlapping the range', () => {
+    expect(findOverlappingSegments(index, 4, 11).map((s) => s.start)).toEqual([0, 5, 10]);
+  });
+
+  it('does not count touching boundaries as overlap', () => {
+    expect(findOverlappingSegments(index, 5, 10).map((s) => s.start)).toEqual([5]);
+  });
+
+  it('finds a long segment that started well before the range', () => {
+    const overlapping = buildSegmentIndex([seg(0, 100), seg(10, 12), seg(20, 22)]);
+    expect(findOverlappingSegments(overlapping, 50, 60).map((s) => s.start)).toEqual([0]);
+  });
+
+  it('returns nothing for an empty index', () => {
+    expect(findOverlappingSegments(buildSegmentIndex([]), 0, 10)).toEqual([]);
+  });
+});
+
+describe('findSegmentsWithin', () => {
+  const index = buildSegmentIndex([seg(0, 5), seg(5, 10), seg(10, 15), seg(15, 20)]);
+
+  it('returns only fully contained segments', () => {
+    expect(findSegmentsWithin(index, 4, 16).map((s) => s.start)).toEqual([5, 10]);
+  });
+
+  it('includes segments on the range boundaries', () => {
+    expect(findSegmentsWithin(index, 5, 15).map((s) => s.start)).toEqual([5, 10]);
+  });
+});
+
+describe('clipSubtitlesFromIndex', () => {
+  it('re-bases segment times to the clip start', () => {
+    const index = buildSegmentIndex([seg(100, 103, 'a'), seg(103, 106, 'b'), seg(106, 120, 'c')]);
+    expect(clipSubtitlesFromIndex(index, 100, 110)).toEqual([
+      { start: 0, end: 3, text: 'a' },
+      { start: 3, end: 6, text: 'b' },
+    ]);
+  });
+});
@@ -6,3 +6,4 @@ export * from './llm';
 export * from './queue';
 export * from './byok';
 export * from './team';
+export * from './transcript';
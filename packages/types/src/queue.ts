@@ -5,6 +5,8 @@ export type STTJobData = {
   filePath: string;
   strategy: 'ru' | 'global';
   language: string;
+  /** Set by video.reprocess; carried into the LLM job */
+  reprocess?: boolean;
 };
 
 export type LLMJobData = {
@@ -13,6 +15,8 @@ export type LLMJobData = {
   strategy: 'ru' | 'global';
   input: Record<string, unknown>;
   tier?: number;
+  /** Set by video.reprocess: bypass cached LLM responses so the user gets new moments */
+  reprocess?: boolean;
 };
 
 export type VideoRenderJobData = {
@@ -27,6 +31,19 @@ export type VideoRenderJobData = {
   watermark: boolean;
 };
 
+export type VideoRenderBatchClip = Pick<
+  VideoRenderJobData,
+  'clipId' | 'startTime' | 'endTime' | 'format' | 'subtitleSegments' | 'cta'
+>;
+
+/** One job per video: renders all clips with shared source decode and CTA end cards. */
+export type VideoRenderBatchJobData = {
+  videoId: string;
+  sourceFilePath: string;
+  watermark: boolean;
+  clips: VideoRenderBatchClip[];
+};
+
 export type PublishJobData = {
   clipId: string;
   publicationId: string;
@@ -0,0 +1,110 @@
+import type { TranscriptSegment } from './video';
+
+type TimedSegment = Pick<TranscriptSegment, 'start' | 'end'>;
+
+/**
+ * Time-sorted segment index for range queries over long transcripts.
+ * Starts/ends are packed into typed arrays; `maxEnds[i]` is the running max of
+ * `ends[0..i]`, which stays monotonic even when segments overlap, so both
+ * bounds of a range query are found by binary search: O(log n + k).
+ */
+export type SegmentIndex<T extends TimedSegment = TranscriptSegment> = {
+  segments: T[];
+  starts: Float64Array;
+  ends: Float64Array;
+  maxEnds: Float64Array;
+};
+
+export type TranscriptSegmentPage = {
+  segments: TranscriptSegment[];
+  /** Index of segments[0] in the full transcript (stable key for edits). */
+  offset: number;
+  total: number;
+  nextCursor: number | null;
+};
+
+export function buildSegmentIndex<T extends TimedSegment>(segments: T[]): SegmentIndex<T> {
+  let sorted = segments;
+  for (let i = 1; i < segments.length; i++) {
+    if (segments[i]!.start < segments[i - 1]!.start) {
+      sorted = [...segments].sort((a, b) => a.start - b.start);
+      break;
+    }
+  }
+
+  const n = sorted.length;
+  const starts = new Float64Array(n);
+  const ends = new Float64Array(n);
+  const maxEnds = new Float64Array(n);
+  let maxEnd = -Infinity;
+  for (let i = 0; i < n; i++) {
+    const seg = sorted[i]!;
+    starts[i] = seg.start;
+    ends[i] = seg.end;
+    maxEnd = Math.max(maxEnd, seg.end);
+    maxEnds[i] = maxEnd;
+  }
+
+  return { segments: sorted, starts, ends, maxEnds };
+}
+
+/** First index i with arr[i] >= value (or > value when `strict`), arr sorted ascending. */
+function lowerBound(arr: Float64Array, value: number, strict = false): number {
+  let lo = 0;
+  let hi = arr.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (strict ? arr[mid]! <= value : arr[mid]! < value) {
+      lo = mid + 1;
+    } else {
+      hi = mid;
+    }
+  }
+  return lo;
+}
+
+/** Segments that overlap [start, end] (touching at a single point does not count). */
+export function findOverlappingSegments<T extends TimedSegment>(
+  index: SegmentIndex<T>,
+  start: number,
+  end: number,
+): T[] {
+  const from = lowerBound(index.maxEnds, start, true);
+  const to = lowerBound(index.starts, end);
+  const result: T[] = [];
+  for (let i = from; i < to; i++) {
+    if (index.ends[i]! > start) result.push(index.segments[i]!);
+  }
+  return result;
+}
+
+/** Segments fully contained in [start, end]. */
+export function findSegmentsWithin<T extends TimedSegment>(
+  index: SegmentIndex<T>,
+  start: number,
+  end: number,
+): T[] {
+  const from = lowerBound(index.starts, start);
+  const to = lowerBound(index.starts, end, true);
+  const result: T[] = [];
+  for (let i = from; i < to; i++) {
+    if (index.ends[i]! <= end) result.push(index.segments[i]!);
+  }
+  return result;
+}
+
+/**
+ * Subtitle segments for a clip referencing the transcript range [start, end],
+ * re-based so times are relative to the clip start.
+ */
+export function clipSubtitlesFromIndex<T extends TimedSegment & { text: string }>(
+  index: SegmentIndex<T>,
+  start: number,
+  end: number,
+): Array<{ start: number; end: number; text: string }> {
+  return findSegmentsWithin(index, start, end).map((s) => ({
+    start: s.start - start,
+    end: s.end - start,
+    text: s.text,
+  }));
+}